@@ -0,0 +1,139 @@
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import Optional, Dict, Any
+
+from comms import InverterClient
+from objects import Inverter, HomeManager, ReadBlock, BlacklistEntry
+
+
+class DeviceCache:
+    """Keeps what the plugin learned about each device on disk, so it is known right away after a restart.
+
+    Entries are keyed by serial number. For inverters they hold the model, the supported registers, the read
+    plan and the last readings, so the first poll after a restart runs the read plan without probing. For
+    Home Managers they hold the Speedwire datagram layout and the last readings. The registers blacklisted
+    for each inverter model (see InverterClient.MODEL_BLACKLISTS) are kept as well, with their failure counts
+    and times so temporary entries still expire after a restart.
+
+    The cache is only an optimization: a missing or unreadable file just means the devices are probed again, and
+    so does an entry that doesn't match what this version of the plugin expects (e.g. one written before a field
+    was added to Inverter), which is dropped when it is restored.
+    """
+
+    SAVE_INTERVAL = 300
+    """Minimum time in seconds between two saves triggered by save_if_due()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.inverters: Dict[str, Dict[str, Any]] = dict()
+        self.home_managers: Dict[str, Dict[str, Any]] = dict()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict):
+            return
+
+        self.inverters = data.get('inverters', dict())
+        self.home_managers = data.get('homeManagers', dict())
+
+        for model, entries in data.get('modelBlacklists', dict()).items():
+            try:
+                if isinstance(entries, list):
+                    # Older caches only kept the addresses; give those registers a new chance right away
+                    entries = {address: {'failures': 1, 'lastFailure': 0.0} for address in entries}
+                blacklist = {int(address): BlacklistEntry(**entry) for address, entry in entries.items()}
+            except (AttributeError, TypeError, ValueError):
+                continue
+            InverterClient.MODEL_BLACKLISTS.setdefault(int(model), dict()).update(blacklist)
+
+    def save(self):
+        data = {
+            'inverters': self.inverters,
+            'homeManagers': self.home_managers,
+            'modelBlacklists': {
+                str(model): {str(address): asdict(entry) for address, entry in sorted(blacklist.items())}
+                for model, blacklist in InverterClient.MODEL_BLACKLISTS.items()
+            },
+        }
+
+        # Write to a temporary file first, so a crash while saving never leaves a truncated cache behind
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(temporary_path, self.path)
+
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def save_if_due(self):
+        if self._dirty and time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+            self.save()
+
+    def update_inverter(self, client: InverterClient, inverter: Inverter):
+        if inverter.serialNumber is None or client.read_plan is None:
+            return
+
+        self.inverters[str(inverter.serialNumber)] = {
+            'model': inverter.model,
+            'supportedRegisters': sorted(client.supported_registers),
+            'readPlan': [[block.address, block.size] for block in client.read_plan],
+            'readings': asdict(inverter),
+        }
+        self._dirty = True
+
+    def restore_inverter(self, serial_number: str, client: InverterClient) -> Optional[Inverter]:
+        """Gives the client the supported registers and read plan cached for the inverter with the given
+        serial number, and returns its last readings. Returns None if the inverter isn't cached."""
+        entry = self.inverters.get(serial_number)
+        if entry is None:
+            return None
+
+        try:
+            model = entry['model']
+            supported_registers = set(entry['supportedRegisters'])
+            read_plan = [ReadBlock(address, size) for address, size in entry['readPlan']]
+            inverter = Inverter(**entry['readings'])
+        except (KeyError, TypeError, ValueError):
+            # Written by another version of the plugin, or edited by hand: probe the inverter again
+            del self.inverters[serial_number]
+            self._dirty = True
+            return None
+
+        client.model = model
+        client.supported_registers = supported_registers
+        client.read_plan = read_plan
+
+        return inverter
+
+    def update_home_manager(self, home_manager: HomeManager, layout: Dict[str, int]):
+        if home_manager.serialNumber is None:
+            return
+
+        self.home_managers[str(home_manager.serialNumber)] = {
+            'layout': layout,
+            'readings': asdict(home_manager),
+        }
+        self._dirty = True
+
+    def restore_home_manager(self, serial_number: str) -> Optional[Dict[str, Any]]:
+        """Returns the Speedwire layout and last readings cached for the Home Manager with the given serial
+        number, as a dict with the 'layout' and 'homeManager' keys. Returns None if it isn't cached."""
+        entry = self.home_managers.get(serial_number)
+        if entry is None:
+            return None
+
+        try:
+            return {'layout': dict(entry['layout']), 'homeManager': HomeManager(**entry['readings'])}
+        except (KeyError, TypeError, ValueError):
+            del self.home_managers[serial_number]
+            self._dirty = True
+            return None
@@ -1,5 +1,9 @@
+import asyncio
+import ipaddress
+import resource
 import threading
-from typing import Optional, List, Any, Tuple
+import time
+from typing import Optional, List, Any, Tuple, Dict, Union, Set
 
 import socket
 import struct
@@ -7,13 +11,160 @@ import struct
 from pymodbus.client.sync import ModbusTcpClient as ModbusClient
 from pymodbus.payload import BinaryPayloadDecoder
 from pymodbus.constants import Endian
+from pymodbus.exceptions import ModbusException, ModbusIOException
+from pymodbus.factory import ClientDecoder
+from pymodbus.framer.socket_framer import ModbusSocketFramer
+from pymodbus.pdu import ModbusRequest, ModbusResponse, ExceptionResponse, ModbusExceptions
+from pymodbus.register_read_message import ReadInputRegistersRequest
 
-from objects import Inverter, HomeManager, ModbusRegister
+from objects import Inverter, HomeManager, ModbusRegister, OperatingState, DiscoveredInverter, ReadBlock, BlacklistEntry
+
+
+class DnsCache:
+    """Caches host name resolutions so reconnects don't hit the resolver every time.
+
+    Entries expire after `ttl` seconds. An entry can be dropped early with invalidate(), which the
+    connection pool does whenever a connection to the cached address fails.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[str, float]] = dict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        key = (host, port)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+
+        try:
+            address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        except socket.gaierror:
+            # Let the client try the raw host name and report the failure itself
+            return host
+
+        with self._lock:
+            self._entries[key] = (address, now + self.ttl)
+
+        return address
+
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class KeepAliveModbusClient(ModbusClient):
+    """ModbusTcpClient that connects to a cached address and enables TCP keepalive on its socket.
+
+    The TCP keepalive lets the OS detect a dead gateway on otherwise idle connections, instead of
+    waiting for the next poll to time out.
+    """
+
+    KEEPALIVE_IDLE = 60
+    KEEPALIVE_INTERVAL = 10
+    KEEPALIVE_COUNT = 3
+
+    def __init__(self, host: str, port: int, dns_cache: DnsCache, **kwargs):
+        super().__init__(host=host, port=port, **kwargs)
+        self.dns_cache = dns_cache
+
+    def connect(self) -> bool:
+        if self.socket:
+            return True
+
+        try:
+            self.socket = socket.create_connection(
+                (self.dns_cache.resolve(self.host, self.port), self.port),
+                timeout=self.timeout,
+                source_address=self.source_address
+            )
+        except socket.error:
+            self.dns_cache.invalidate(self.host, self.port)
+            self.close()
+            return False
+
+        self._configure_socket()
+        self._set_keepalive()
+        return True
+
+    def _set_keepalive(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        # Linux names the idle option TCP_KEEPIDLE, macOS names it TCP_KEEPALIVE
+        idle_option = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+        for option, value in [
+            (idle_option, self.KEEPALIVE_IDLE),
+            (getattr(socket, 'TCP_KEEPINTVL', None), self.KEEPALIVE_INTERVAL),
+            (getattr(socket, 'TCP_KEEPCNT', None), self.KEEPALIVE_COUNT),
+        ]:
+            if option is not None:
+                self.socket.setsockopt(socket.IPPROTO_TCP, option, value)
+
+
+class ModbusConnectionPool:
+    """Hands out one shared Modbus TCP connection per (host, port).
+
+    Devices behind the same SMA Data Manager or Cluster Controller share a single socket, which keeps
+    the plugin under the gateway's connection limit. The pymodbus transaction manager serializes
+    requests on a client, so a shared client can be used by several devices safely.
+
+    Connections are reference counted: acquire() and release() must be paired, and the socket is
+    closed when the last device releases it.
+    """
+
+    def __init__(self, dns_cache: Optional[DnsCache] = None):
+        self.dns_cache = dns_cache or DnsCache()
+        self._clients: Dict[Tuple[str, int], KeepAliveModbusClient] = dict()
+        self._ref_counts: Dict[Tuple[str, int], int] = dict()
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, port: int) -> KeepAliveModbusClient:
+        key = (host, port)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = KeepAliveModbusClient(host, port, self.dns_cache)
+                self._clients[key] = client
+                self._ref_counts[key] = 0
+
+            self._ref_counts[key] += 1
+            return client
+
+    def release(self, host: str, port: int):
+        key = (host, port)
+
+        with self._lock:
+            if key not in self._ref_counts:
+                return
+
+            self._ref_counts[key] -= 1
+            if self._ref_counts[key] > 0:
+                return
+
+            client = self._clients.pop(key)
+            del self._ref_counts[key]
+
+        client.close()
+
+    def close_all(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._ref_counts.clear()
+
+        for client in clients:
+            client.close()
 
 
 class InverterClient:
     REGISTERS: List[ModbusRegister] = [
         ModbusRegister(30057, 2, 'U32', 'RAW', 'serialNumber', None),           # Serial number
+        ModbusRegister(30053, 2, 'U32', 'RAW', 'model', None),                  # Device type (model)
         ModbusRegister(30775, 2, 'S32', 'FIX0', 'acPower', 'W'),                # AC Power (W)
         ModbusRegister(30977, 2, 'S32', 'FIX3', 'acCurrent', 'A'),              # AC Current (A)
         ModbusRegister(30783, 2, 'S32', 'FIX2', 'acVoltage', 'V'),              # AC Voltage (V)
@@ -25,38 +176,270 @@ class InverterClient:
         ModbusRegister(30525, 4, 'U64', 'FIX0', 'feedInTime', 'S'),             # Feed-In Time (S)
     ]
 
-    def __init__(self, host: str, port: int):
-        self.client = ModbusClient(host=host, port=port)
+    NAN_VALUES: Dict[str, int] = {
+        'S16': -0x8000,
+        'S32': -0x80000000,
+        'U16': 0xFFFF,
+        'U32': 0xFFFFFFFF,
+        'U64': 0xFFFFFFFFFFFFFFFF,
+    }
+    """Values SMA devices return, per data type, for registers that currently have no value."""
+
+    DEFAULT_UNIT_ID = 3
+    """Unit ID that SMA inverters answer on when they are addressed directly."""
+
+    MAX_BLOCK_GAP = 10
+    """Largest number of unused registers a read block may span to join two registers."""
+
+    MAX_BLOCK_SIZE = 125
+    """Largest number of registers a single Modbus read may return."""
+
+    BLACKLIST_FAILURES = 3
+    """Number of consecutive times a register must be found unsupported before it is blacklisted for good."""
+
+    BLACKLIST_TTL = 6 * 60 * 60
+    """Time in seconds after which a register blacklisted fewer than BLACKLIST_FAILURES times is read again."""
+
+    MODEL_BLACKLISTS: Dict[int, Dict[int, BlacklistEntry]] = dict()
+    """
+    Registers found to be unsupported, shared by all inverters of the same model.
+    keys: model (device type) numbers
+    values: BlacklistEntry objects, keyed by register address
+    """
+
+    def __init__(self, host: str, port: int, pool: ModbusConnectionPool, unit_id: int = DEFAULT_UNIT_ID,
+                 pipelining: bool = False):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.unit_id = unit_id
+        self.pipelining = pipelining
+        self.client: Optional[ModbusClient] = None
+        self.model: Optional[int] = None
+
+        self.supported_registers: Optional[Set[int]] = None
+        """Addresses of the registers this inverter implements, None until a poll has succeeded."""
+
+        self.read_plan: Optional[List[ReadBlock]] = None
+        """Blocks read on each poll, None until a poll has confirmed that every block can be read."""
+
+        self._requests: Optional[List[ModbusRequest]] = None
+        self._requests_plan: Optional[List[ReadBlock]] = None
+
+    @property
+    def endpoint(self) -> Tuple[str, int]:
+        """The (host, port) pair of the Modbus endpoint this inverter is reached through."""
+        return self.host, self.port
 
     def connect(self) -> bool:
+        if self.client is None:
+            self.client = self.pool.acquire(self.host, self.port)
         return self.client.connect()
 
     def close(self):
-        self.client.close()
+        """Releases this inverter's reference to the shared connection."""
+        if self.client is None:
+            return
+        self.pool.release(self.host, self.port)
+        self.client = None
 
     def reconnect(self) -> bool:
-        self.close()
-        return self.connect()
-    
-    def get_inverter_data(self) -> Optional[Inverter]:
-        # Check if client is connected
-        if not self.client.is_socket_open():
-            return None
+        if self.client is None:
+            return self.connect()
+
+        # The connection may be shared with other inverters behind the same gateway, so it is
+        # re-established in place instead of being released
+        self.client.close()
+        return self.client.connect()
+
+    def build_requests(self) -> List[ModbusRequest]:
+        """Builds the read requests for one poll of this inverter.
+
+        Until a poll has confirmed the read plan, the registers not blacklisted for the inverter's model
+        are read in blocks built by build_read_plan(). Once there is a read plan, the same request objects
+        are reused for every poll until the plan changes; the transaction manager gives them a new
+        transaction id each time they are sent.
+        """
+        if self.read_plan is not None and self._reprobe_due():
+            self.read_plan = None
+
+        if self.read_plan is not None and self._requests_plan is self.read_plan:
+            return self._requests
+
+        blocks = self.read_plan
+        if blocks is None:
+            unsupported = self.blacklisted_registers(self.model)
+            blocks = self.build_read_plan([register for register in self.REGISTERS if register.address not in unsupported])
+
+        requests = [ReadInputRegistersRequest(block.address, block.size, unit=self.unit_id) for block in blocks]
+        self._requests, self._requests_plan = requests, self.read_plan
+        return requests
+
+    def parse_responses(self, requests: List[ModbusRequest], responses: List[ModbusResponse]) -> Inverter:
+        """Decodes the responses to the requests returned by build_requests() into an Inverter.
+
+        A block rejected with an illegal address exception is bisected (see _bisect) to find the registers the
+        inverter doesn't implement. Those are blacklisted for the inverter's model, and the blocks that could be
+        read become the new read plan. A blacklisted register is read again once its entry expires (see
+        blacklisted_registers), and dropped from the blacklist if it can be read.
+
+        Raises ModbusException if any of the responses is any other error.
+        """
+        repaired = False
+        blocks: List[Tuple[ReadBlock, memoryview]] = list()
+
+        for request, received in zip(requests, responses):
+            block = ReadBlock(request.address, request.count)
+
+            if self._is_illegal_address(received):
+                blocks += self._bisect(block)
+                repaired = True
+                continue
+
+            if received.isError():
+                raise received if isinstance(received, ModbusException) else ModbusException(str(received))
+
+            blocks.append((block, received.payload))
+
+        if not blocks:
+            raise ModbusException(f"None of the registers could be read from unit {self.unit_id}")
 
         registers: List[Tuple[ModbusRegister, Any]] = list()
         for register in self.REGISTERS:
-            registers.append(self._read_register(register))
+            for block, payload in blocks:
+                if block.contains(register):
+                    # The payload holds the raw register bytes, two per register
+                    offset = 2 * (register.address - block.address)
+                    registers.append(self._read_register(register, payload[offset:offset + 2 * register.size]))
+                    break
+
+        inverter = Inverter.from_registers(registers)
+        inverter.operatingState = self.infer_operating_state(inverter)
+        if inverter.model is not None:
+            self.model = inverter.model
+
+        if repaired or self.read_plan is None:
+            self.read_plan = [block for block, _ in blocks]
+            self.supported_registers = {register.address for register, _ in registers}
+
+            if self.model is not None:
+                # Only the registers covered by this poll's requests were tested; the others keep their entries
+                requested = [ReadBlock(request.address, request.count) for request in requests]
+                probed = {register.address for register in self.REGISTERS
+                          if any(block.contains(register) for block in requested)}
+                self.update_blacklist(self.model, probed - self.supported_registers, probed & self.supported_registers)
+
+        return inverter
+
+    @classmethod
+    def blacklisted_registers(cls, model: Optional[int], now: Optional[float] = None) -> Set[int]:
+        """Returns the registers currently blacklisted for a model: those found unsupported BLACKLIST_FAILURES
+        times in a row, or less than BLACKLIST_TTL seconds ago."""
+        now = time.time() if now is None else now
+        return {
+            address for address, entry in cls.MODEL_BLACKLISTS.get(model, dict()).items()
+            if entry.failures >= cls.BLACKLIST_FAILURES or now - entry.lastFailure < cls.BLACKLIST_TTL
+        }
+
+    @classmethod
+    def update_blacklist(cls, model: int, unsupported: Set[int], supported: Set[int]):
+        """Records the registers of a model that were found unsupported, and drops the ones that could be read."""
+        now = time.time()
+        blacklist = cls.MODEL_BLACKLISTS.setdefault(model, dict())
+
+        for address in unsupported:
+            entry = blacklist.get(address)
+            if entry is None:
+                blacklist[address] = BlacklistEntry(1, now)
+            else:
+                entry.failures += 1
+                entry.lastFailure = now
+
+        for address in supported:
+            blacklist.pop(address, None)
+
+    def _reprobe_due(self) -> bool:
+        """Whether the read plan leaves out registers that are no longer blacklisted for the inverter's model,
+        so they must be tried again."""
+        if self.model is None or self.supported_registers is None:
+            return False
+
+        blacklisted = self.blacklisted_registers(self.model)
+        return any(
+            register.address not in self.supported_registers and register.address not in blacklisted
+            for register in self.REGISTERS
+        )
 
-        return Inverter.from_registers(registers)
+    def _bisect(self, block: ReadBlock) -> List[Tuple[ReadBlock, memoryview]]:
+        """Finds the parts of a block that can be read, after the block was rejected with an illegal address exception.
 
-    def _read_register(self, register: ModbusRegister):
-        received = self.client.read_input_registers(
-            address=register.address,
-            count=register.size,
-            unit=3
-        )
-        data = BinaryPayloadDecoder.fromRegisters(
-            received.registers,
+        The registers in the block are split in two halves, and each half is read as a block of its own. Halves that
+        are rejected again are bisected further, until the offending registers are isolated. Returns the blocks that
+        were read, with their values. Registers outside of them are not supported by the inverter.
+        """
+        registers = sorted([register for register in self.REGISTERS if block.contains(register)], key=lambda r: r.address)
+        if len(registers) <= 1:
+            return []
+
+        middle = len(registers) // 2
+        blocks: List[Tuple[ReadBlock, memoryview]] = list()
+
+        for half in (registers[:middle], registers[middle:]):
+            half_block = ReadBlock(half[0].address, half[-1].address + half[-1].size - half[0].address)
+            received = self.client.execute(ReadInputRegistersRequest(half_block.address, half_block.size, unit=self.unit_id))
+
+            if self._is_illegal_address(received):
+                blocks += self._bisect(half_block) if len(half) > 1 else []
+            elif received.isError():
+                raise received if isinstance(received, ModbusException) else ModbusException(str(received))
+            else:
+                blocks.append((half_block, received.payload))
+
+        return blocks
+
+    @classmethod
+    def build_read_plan(cls, registers: List[ModbusRegister]) -> List[ReadBlock]:
+        """Joins registers that are close to each other into blocks, so they can be read with one request."""
+        blocks: List[ReadBlock] = list()
+
+        for register in sorted(registers, key=lambda r: r.address):
+            if blocks:
+                block = blocks[-1]
+                end = max(block.address + block.size, register.address + register.size)
+                if register.address - (block.address + block.size) <= cls.MAX_BLOCK_GAP and \
+                        end - block.address <= cls.MAX_BLOCK_SIZE:
+                    block.size = end - block.address
+                    continue
+
+            blocks.append(ReadBlock(register.address, register.size))
+
+        return blocks
+
+    @staticmethod
+    def _is_illegal_address(received: ModbusResponse) -> bool:
+        return isinstance(received, ExceptionResponse) and received.exception_code == ModbusExceptions.IllegalAddress
+
+    @staticmethod
+    def infer_operating_state(inverter: Optional[Inverter]) -> str:
+        """Infers the operating state of an inverter from its last readings.
+
+        An inverter that didn't answer at all (None) or has no grid measurements is asleep. One that
+        reports grid measurements but isn't feeding in is on standby.
+        """
+        if inverter is None:
+            return OperatingState.ASLEEP
+
+        if inverter.acPower is None and inverter.acVoltage is None and inverter.gridFreq is None:
+            return OperatingState.ASLEEP
+
+        if inverter.acPower:
+            return OperatingState.PRODUCING
+
+        return OperatingState.STANDBY
+
+    def _read_register(self, register: ModbusRegister, payload: memoryview):
+        data = BinaryPayloadDecoder(
+            payload,
             byteorder=Endian.Big,
             wordorder=Endian.Big
         )
@@ -88,14 +471,16 @@ class InverterClient:
         else:
             data_decoded = data.decode_16bit_uint()
 
-        # When solar inverters are not generating, the output values are a fixed value.
-        # The following if compensates those values and turns them to zero
-        if data_decoded in [-2147483648, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF, 0x8000, 0xFFFF]:
-            data_decoded = 0
+        # When solar inverters are not generating, registers without a value hold a fixed NaN value
+        if data_decoded == self.NAN_VALUES.get(data_type):
+            return None
 
         return data_decoded
 
     def _unfix_data(self, data, fix: str):
+        if data is None:
+            return None
+
         if fix == "FIX3":
             data = float(data) / 1000
         elif fix == "FIX2":
@@ -106,6 +491,168 @@ class InverterClient:
         return data
 
 
+class GatewayPoller:
+    """Polls every inverter reached through one Modbus endpoint in a single pass.
+
+    An SMA Data Manager or Cluster Controller exposes many inverters on one IP address, each under its
+    own unit ID. The poller walks all of those unit IDs over the single connection shared through the
+    ModbusConnectionPool, so a large site needs one socket per gateway instead of one per inverter.
+
+    The result of a poll maps each device id to either its Inverter or the exception that ended its
+    read, so one unresponsive unit doesn't stop the others from being updated.
+
+    For gateways that accept pipelined Modbus/TCP requests, the requests for all the units are sent at
+    once with ModbusTcpClient.execute_many(), so the whole pass takes a single round trip. A unit whose
+    responses didn't all arrive is read again on its own.
+    """
+
+    def __init__(self, client: ModbusClient, pipelining: bool = False):
+        self.client = client
+        self.pipelining = pipelining
+
+    def poll(self, inverters: Dict[int, InverterClient]) -> Dict[int, Union[Inverter, Exception]]:
+        results: Dict[int, Union[Inverter, Exception]] = dict()
+
+        if not self.client.connect():
+            error = ModbusException(f"Failed to connect to {self.client}")
+            return {device_id: error for device_id in inverters.keys()}
+
+        requests = {device_id: inverter.build_requests() for device_id, inverter in inverters.items()}
+        responses: Dict[int, List[ModbusResponse]] = dict()
+        if self.pipelining:
+            try:
+                responses = self._execute_pipelined(requests)
+            except ModbusException:
+                responses = dict()
+
+            # A frame lost in the batch fails the units it belonged to, and the connection is dropped with the
+            # frames still in flight. Those units are read again on their own below, so only the units that
+            # fail again are marked as failed.
+            responses = {
+                device_id: batch for device_id, batch in responses.items()
+                if not any(isinstance(response, ModbusIOException) for response in batch)
+            }
+
+        for device_id, inverter in inverters.items():
+            try:
+                if device_id not in responses:
+                    responses[device_id] = [self.client.execute(request) for request in requests[device_id]]
+                results[device_id] = inverter.parse_responses(requests[device_id], responses[device_id])
+            except ModbusException as e:
+                results[device_id] = e
+
+        return results
+
+    def _execute_pipelined(self, requests: Dict[int, List[ModbusRequest]]) -> Dict[int, List[ModbusResponse]]:
+        flat_responses = iter(self.client.execute_many([request for batch in requests.values() for request in batch]))
+        return {
+            device_id: [next(flat_responses) for _ in batch]
+            for device_id, batch in requests.items()
+        }
+
+    @staticmethod
+    def group_by_endpoint(inverters: Dict[int, InverterClient]) -> Dict[Tuple[str, int], Dict[int, InverterClient]]:
+        """Groups inverters by the (host, port) endpoint they are reached through."""
+        groups: Dict[Tuple[str, int], Dict[int, InverterClient]] = dict()
+        for device_id, inverter in inverters.items():
+            groups.setdefault(inverter.endpoint, dict())[device_id] = inverter
+        return groups
+
+
+class InverterScanner:
+    """Scans subnets for SMA devices that answer on Modbus/TCP.
+
+    Every host is probed concurrently (up to `concurrency` at a time) with short timeouts, so hosts that
+    don't answer cost at most `connect_timeout` seconds. Each device that accepts the connection is
+    fingerprinted with a single block read of its nameplate registers, and the devices found are kept
+    in `cache`, keyed by (address, port), until they are found again or the scanner is discarded.
+    """
+
+    NAMEPLATE_ADDRESS = 30051
+    NAMEPLATE_SIZE = 8
+    """Device class (30051), model (30053), an unused register pair (30055) and serial number (30057)."""
+
+    MAX_CONCURRENCY = 64
+    """Default number of hosts probed at a time. Each probe holds a socket open."""
+
+    def __init__(self, port: int = 502, unit_id: int = InverterClient.DEFAULT_UNIT_ID,
+                 concurrency: Optional[int] = None, connect_timeout: float = 0.5, read_timeout: float = 1.0):
+        self.port = port
+        self.unit_id = unit_id
+        self.concurrency = concurrency or self.default_concurrency()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache: Dict[Tuple[str, int], DiscoveredInverter] = dict()
+
+    @classmethod
+    def default_concurrency(cls) -> int:
+        """Returns MAX_CONCURRENCY, lowered to half the process file descriptor limit so a scan leaves enough
+        descriptors for the plugin's own connections and files (macOS defaults to 256 per process)."""
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit == resource.RLIM_INFINITY:
+            return cls.MAX_CONCURRENCY
+        return max(1, min(cls.MAX_CONCURRENCY, soft_limit // 2))
+
+    def scan(self, subnets: List[str]) -> List[DiscoveredInverter]:
+        """Scans the given subnets (e.g. '192.168.1.0/24') and returns the SMA devices found.
+
+        Raises ValueError if a subnet is not a valid network.
+        """
+        hosts = [str(host) for subnet in subnets for host in ipaddress.ip_network(subnet.strip(), strict=False).hosts()]
+
+        found = asyncio.run(self._scan(hosts))
+        for inverter in found:
+            self.cache[(inverter.address, inverter.port)] = inverter
+
+        return found
+
+    async def _scan(self, hosts: List[str]) -> List[DiscoveredInverter]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*[self._probe(host, semaphore) for host in hosts])
+        return [result for result in results if result is not None]
+
+    async def _probe(self, host: str, semaphore: asyncio.Semaphore) -> Optional[DiscoveredInverter]:
+        async with semaphore:
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, self.port), self.connect_timeout)
+            except (OSError, asyncio.TimeoutError):
+                return None
+
+            try:
+                return await asyncio.wait_for(self._fingerprint(host, reader, writer), self.read_timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ModbusException):
+                return None
+            finally:
+                writer.close()
+
+    async def _fingerprint(self, host: str, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> Optional[DiscoveredInverter]:
+        framer = ModbusSocketFramer(ClientDecoder())
+
+        request = ReadInputRegistersRequest(self.NAMEPLATE_ADDRESS, self.NAMEPLATE_SIZE, unit=self.unit_id)
+        request.transaction_id = 1
+        writer.write(framer.buildPacket(request))
+        await writer.drain()
+
+        # The MBAP header ends with the number of bytes that follow it
+        header = await reader.readexactly(6)
+        body = await reader.readexactly(struct.unpack('>H', header[4:6])[0])
+
+        responses: List[ModbusResponse] = list()
+        framer.processIncomingPacket(header + body, responses.append, self.unit_id)
+        if not responses or responses[0].isError():
+            # Something answers Modbus on this host, but it isn't an SMA device
+            return None
+
+        data = BinaryPayloadDecoder(responses[0].payload, byteorder=Endian.Big, wordorder=Endian.Big)
+        device_class = data.decode_32bit_uint()
+        model = data.decode_32bit_uint()
+        data.skip_bytes(4)
+        serial_number = data.decode_32bit_uint()
+
+        return DiscoveredInverter(host, self.port, self.unit_id, device_class, model, serial_number)
+
+
 class HomeManagerClientThread(threading.Thread):
     """Thread that listens for HomeManager broadcasts and updates the HomeManager object
 
@@ -113,19 +660,24 @@ class HomeManagerClientThread(threading.Thread):
     However, it may take a few seconds for the HomeManager to be discovered and the object to be updated. It is recommended to use
     the home_manager_present_event to wait for the HomeManager to be discovered. After this event is set, it is
     guaranteed that the HomeManager object is not None and will have values present.
+
+    A layout and HomeManager object cached from a previous run can be given to the thread. The cached HomeManager is
+    returned by get_home_manager() until the first broadcast arrives, but it doesn't set home_manager_present_event.
     """
 
     MULTICAST_IP = "239.12.255.254"
     MULTICAST_PORT = 9522
 
-    home_manager_present_event = threading.Event()
-    stop_event = threading.Event()
-
-    def __init__(self, device_id: int) -> None:
+    def __init__(self, device_id: int, layout: Optional[Dict[str, int]] = None,
+                 home_manager: Optional[HomeManager] = None) -> None:
         super().__init__()
         self.device_id = device_id
         self._sock = None
-        self.home_manager: Optional[HomeManager] = None
+        self.home_manager: Optional[HomeManager] = home_manager
+        self.layout: Optional[Dict[str, int]] = layout
+
+        self.home_manager_present_event = threading.Event()
+        self.stop_event = threading.Event()
 
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -141,7 +693,10 @@ class HomeManagerClientThread(threading.Thread):
             if data[0:3] != b'SMA' or data[16:18].hex() != '6069':
                 continue
 
-            self.home_manager = HomeManager.from_data(data)
+            if self.layout is None:
+                self.layout = HomeManager.parse_layout(data)
+
+            self.home_manager = HomeManager.from_data(data, self.layout)
             self.home_manager_present_event.set()
 
     def get_home_manager(self) -> Optional[HomeManager]:
@@ -1,10 +1,18 @@
-from typing import Optional, Any, Tuple, List
+from typing import Optional, Any, Tuple, List, Dict
 from dataclasses import dataclass
 
 
+class OperatingState:
+    """Operating states of an inverter, as inferred by InverterClient.infer_operating_state()."""
+    PRODUCING = 'producing'
+    STANDBY = 'standby'
+    ASLEEP = 'asleep'
+
+
 @dataclass
 class Inverter:
     serialNumber: str = None
+    model: int = None
     acPower: int = None
     acCurrent: int = None
     acVoltage: int = None
@@ -14,6 +22,7 @@ class Inverter:
     feedInTime: int = None
     dailyYield: int = None
     totalYield: int = None
+    operatingState: str = None
 
     @classmethod
     def from_registers(cls, registers: List[Tuple['ModbusRegister', Any]]):
@@ -26,6 +35,29 @@ class Inverter:
         return inverter
 
 
+@dataclass
+class DiscoveredInverter:
+    """An SMA device found by a network scan, identified by its nameplate registers."""
+    address: str
+    port: int
+    unitId: int
+    deviceClass: int
+    model: int
+    serialNumber: int
+
+    DEVICE_CLASSES = {
+        8001: 'Solar Inverter',
+        8002: 'Wind Turbine Inverter',
+        8007: 'Battery Inverter',
+        8009: 'Hybrid Inverter',
+    }
+
+    @property
+    def label(self) -> str:
+        device_class = self.DEVICE_CLASSES.get(self.deviceClass, f'Device class {self.deviceClass}')
+        return f'{device_class} {self.serialNumber} ({self.address}:{self.port})'
+
+
 @dataclass
 class HomeManager:
     totalPowerFromGrid: float
@@ -36,19 +68,63 @@ class HomeManager:
     phase2PowerToGrid: float
     phase3PowerFromGrid: float
     phase3PowerToGrid: float
+    serialNumber: int = None
+
+    OBIS_CHANNELS = {
+        1: 'totalPowerFromGrid',
+        2: 'totalPowerToGrid',
+        21: 'phase1PowerFromGrid',
+        22: 'phase1PowerToGrid',
+        41: 'phase2PowerFromGrid',
+        42: 'phase2PowerToGrid',
+        61: 'phase3PowerFromGrid',
+        62: 'phase3PowerToGrid',
+    }
+    """OBIS channels of the current average active power values, by attribute name."""
+
+    DEFAULT_LAYOUT = {
+        'totalPowerFromGrid': 32,
+        'totalPowerToGrid': 52,
+        'phase1PowerFromGrid': 168,
+        'phase1PowerToGrid': 188,
+        'phase2PowerFromGrid': 312,
+        'phase2PowerToGrid': 332,
+        'phase3PowerFromGrid': 456,
+        'phase3PowerToGrid': 476,
+    }
+    """Offsets of the power values in a Sunny Home Manager 2.0 datagram, used until a layout is parsed."""
+
+    @classmethod
+    def from_data(cls, data: bytes, layout: Optional[Dict[str, int]] = None):
+        layout = layout or cls.DEFAULT_LAYOUT
+        values = {
+            name: int.from_bytes(data[offset:offset + 4], byteorder='big') / 10
+            for name, offset in layout.items()
+        }
+        return cls(serialNumber=int.from_bytes(data[20:24], byteorder='big'), **values)
 
     @classmethod
-    def from_data(cls, data: bytes):
-        return cls(
-            totalPowerFromGrid=int.from_bytes(data[34:36], byteorder='big') / 10,
-            totalPowerToGrid=int.from_bytes(data[54:56], byteorder='big') / 10,
-            phase1PowerFromGrid=int.from_bytes(data[170:172], byteorder='big') / 10,
-            phase1PowerToGrid=int.from_bytes(data[190:192], byteorder='big') / 10,
-            phase2PowerFromGrid=int.from_bytes(data[314:316], byteorder='big') / 10,
-            phase2PowerToGrid=int.from_bytes(data[334:336], byteorder='big') / 10,
-            phase3PowerFromGrid=int.from_bytes(data[458:460], byteorder='big') / 10,
-            phase3PowerToGrid=int.from_bytes(data[478:480], byteorder='big') / 10
-        )
+    def parse_layout(cls, data: bytes) -> Dict[str, int]:
+        """Finds the offset of each power value in a Speedwire datagram by walking its OBIS records.
+
+        Each record is a 4 byte header (channel, index, measurement type, tariff) followed by a value
+        whose length in bytes is the measurement type (4 for current values, 8 for counters). Values
+        missing from the datagram keep their DEFAULT_LAYOUT offset.
+        """
+        layout = dict(cls.DEFAULT_LAYOUT)
+
+        offset = 28
+        while offset + 4 <= len(data):
+            channel, measurement_type = data[offset + 1], data[offset + 2]
+            if data[offset:offset + 4] == b'\x00\x00\x00\x00':
+                break
+
+            if measurement_type == 4 and channel in cls.OBIS_CHANNELS:
+                layout[cls.OBIS_CHANNELS[channel]] = offset + 4
+
+            offset += 4 + (8 if measurement_type == 8 else 4)
+
+        return layout
 
 
 @dataclass
@@ -61,6 +137,25 @@ class LogicalMeter:
     solarConsumptionPercentage: float  # solarConsumption / totalProduction * 100
 
 
+@dataclass
+class ReadBlock:
+    """A contiguous range of registers read with a single request."""
+    address: int
+    size: int
+
+    def contains(self, register: 'ModbusRegister') -> bool:
+        return self.address <= register.address and register.address + register.size <= self.address + self.size
+
+
+@dataclass
+class BlacklistEntry:
+    """A register an inverter model rejected with an illegal address exception."""
+    failures: int
+    """Number of consecutive polls that found the register unsupported."""
+    lastFailure: float
+    """When the register was last found unsupported, as returned by time.time()."""
+
+
 @dataclass
 class ModbusRegister:
     """Represents a ModBus register."""
@@ -1,8 +1,11 @@
-from typing import Dict
+import datetime
+import time
+from typing import Dict, List, Optional, Tuple
 
 import indigo
 
-from comms import InverterClient, HomeManagerClientThread
+from cache import DeviceCache
+from comms import InverterClient, HomeManagerClientThread, ModbusConnectionPool, GatewayPoller, InverterScanner
 from objects import *
 from pymodbus.exceptions import ModbusException
 
@@ -16,11 +19,44 @@ class Plugin(indigo.PluginBase):
     values: Client objects (see comms.py)
     """
 
+    operating_states: Dict[int, str] = dict()
+    """
+    Stores the last inferred operating state of each inverter (see OperatingState).
+    keys: device ids
+    values: OperatingState values
+    """
+
+    next_poll_times: Dict[int, float] = dict()
+    """
+    Stores when asleep inverters are due to be probed again. Inverters missing from this dict are polled every cycle.
+    keys: device ids
+    values: timestamps as returned by time.time()
+    """
+
+    failed_polls: Dict[int, int] = dict()
+    """
+    Stores the number of consecutive polls each inverter failed to answer. Inverters missing from this dict answered the last poll.
+    keys: device ids
+    values: number of failed polls
+    """
+
+    sleep_failed_polls: int = 3
+    """Number of consecutive failed polls after which an inverter that stopped producing is considered asleep during the day."""
+
+    connection_pool: ModbusConnectionPool = ModbusConnectionPool()
+    """Shares one Modbus TCP connection between all inverters that use the same address and port."""
+
+    inverter_scanner: InverterScanner = InverterScanner()
+    """Scans the network for SMA inverters and caches the ones it finds, so they can be picked when configuring a device."""
+
     home_manager_thread: Optional[HomeManagerClientThread] = None
     """Represents a HomeManagerClientThread object used to communicate with an Home Manager unit.
     The first position holds the current device id.
     The second position holds the HomeManagerClientThread object."""
 
+    device_cache: Optional[DeviceCache] = None
+    """Persists what is known about each device (read plans, Speedwire layout, last readings) between plugin runs."""
+
     logicalMeter: Optional[LogicalMeter] = None
     """Represents a LogicalMeter object.
     This object stores two important values:
@@ -31,22 +67,32 @@ class Plugin(indigo.PluginBase):
     state_update_time: int = 10
     """Represents the time interval in seconds between each state update."""
 
+    sleep_probe_interval: int = 600
+    """Represents the time interval in seconds between probes of an asleep inverter during the night."""
+
     def __init__(self, pluginId: str, pluginDisplayName: str, pluginVersion: str, pluginPrefs: dict):
         super().__init__(pluginId, pluginDisplayName, pluginVersion, pluginPrefs)
         self.state_update_time = self._validate_state_update_time(pluginPrefs)
+        self.sleep_probe_interval = self._validate_sleep_probe_interval(pluginPrefs)
 
     def startup(self):
-        pass
+        self.device_cache = DeviceCache(f"{indigo.server.getInstallFolderPath()}/Preferences/Plugins/{self.pluginId}.cache.json")
+        self.device_cache.load()
 
     def shutdown(self):
         # Close connection to all inverters
         for client in self.inverters.values():
             client.close()
+        self.connection_pool.close_all()
+
+        if self.device_cache:
+            self.device_cache.save()
 
     def closedPrefsConfigUi(self, valuesDict: dict, userCancelled: bool) -> None:
         if not userCancelled:
 
             self.state_update_time = self._validate_state_update_time(valuesDict)
+            self.sleep_probe_interval = self._validate_sleep_probe_interval(valuesDict)
 
     def _validate_state_update_time(self, valuesDict: dict) -> int:
         try:
@@ -56,12 +102,45 @@ class Plugin(indigo.PluginBase):
             state_update_time = 10
         return state_update_time
 
+    def _validate_sleep_probe_interval(self, valuesDict: dict) -> int:
+        try:
+            sleep_probe_interval = int(valuesDict.get('sleepProbeInterval', 'invalid value'))
+        except ValueError:
+            self.logger.error(f"Invalid value for sleep probe interval: {valuesDict.get('sleepProbeInterval', None)}. Using default value of 600 seconds.")
+            sleep_probe_interval = 600
+        return sleep_probe_interval
+
+    @staticmethod
+    def _parse_unit_id(value) -> Optional[int]:
+        """Returns the Modbus unit ID in the given value, or None if it isn't an integer between 1 and 247."""
+        try:
+            unit_id = int(value)
+        except (TypeError, ValueError):
+            return None
+        return unit_id if 1 <= unit_id <= 247 else None
+
+    def _validate_unit_id(self, properties: dict) -> int:
+        unit_id = self._parse_unit_id(properties.get('inverterUnitId', InverterClient.DEFAULT_UNIT_ID))
+        if unit_id is None:
+            self.logger.error(f"Invalid value for Modbus unit ID: {properties.get('inverterUnitId', None)}. Using default value of {InverterClient.DEFAULT_UNIT_ID}.")
+            unit_id = InverterClient.DEFAULT_UNIT_ID
+        return unit_id
+
+    def validateDeviceConfigUi(self, valuesDict: dict, typeId: str, devId: int):
+        if typeId == 'smaIndigoInverter' and self._parse_unit_id(valuesDict.get('inverterUnitId')) is None:
+            errorsDict = indigo.Dict()
+            errorsDict['inverterUnitId'] = "The Modbus unit ID must be an integer between 1 and 247."
+            return False, valuesDict, errorsDict
+
+        return True, valuesDict
+
     def runConcurrentThread(self):
         try:
             while True:
                 self.fetch_inverters_data()
                 self.fetch_home_manager_data()
                 self.update_logic_meter()
+                self.device_cache.save_if_due()
                 self.sleep(self.state_update_time)
 
         except self.StopThread:
@@ -71,24 +150,45 @@ class Plugin(indigo.PluginBase):
         properties = dev.pluginProps
 
         if dev.deviceTypeId == 'smaIndigoInverter':
-            client = InverterClient(properties['inverterAddress'], int(properties['inverterPort']))
+            client = InverterClient(
+                properties['inverterAddress'],
+                int(properties['inverterPort']),
+                self.connection_pool,
+                self._validate_unit_id(properties),
+                properties.get('gatewayPipelining', False)
+            )
 
             if not client.connect():
+                client.close()
                 self.logger.error(f"Failed to establish communication to inverter: {dev.name}")
                 return
 
             self.inverters[dev.id] = client
 
+            # A cached inverter starts with its read plan and last known states, without probing
+            inverter = self.device_cache.restore_inverter(str(dev.states.get('serialNumber', '')), client)
+            if inverter is not None:
+                self.operating_states[dev.id] = inverter.operatingState
+                dev.updateStatesOnServer(self._inverter_states(inverter))
+
         elif dev.deviceTypeId == 'smaIndigoHomeManager':
             if self.home_manager_thread:
                 self.logger.error(f"Home Manager already exists. Only one Home Manager is allowed for now. Device '{dev.name}' will be ignored.")
                 return
 
-            self.home_manager_thread = HomeManagerClientThread(dev.id)
-            self.home_manager_thread.start()
+            cached = self.device_cache.restore_home_manager(str(dev.states.get('serialNumber', '')))
+            if cached is not None:
+                # The cached readings are shown until the first broadcast arrives, so there is no need to wait for it.
+                # A Home Manager that doesn't broadcast is caught by fetch_home_manager_data on the next cycle.
+                self.home_manager_thread = HomeManagerClientThread(dev.id, cached['layout'], cached['homeManager'])
+                self.home_manager_thread.start()
+                self._update_home_manager_states(cached['homeManager'])
+            else:
+                self.home_manager_thread = HomeManagerClientThread(dev.id)
+                self.home_manager_thread.start()
 
-            # Wait 5 seconds for the thread to get the Home Manager object
-            self.home_manager_thread.home_manager_present_event.wait(5)
+                # Wait 5 seconds for the thread to get the Home Manager object
+                self.home_manager_thread.home_manager_present_event.wait(5)
 
             home_manager = self.home_manager_thread.get_home_manager()
 
@@ -125,6 +225,9 @@ class Plugin(indigo.PluginBase):
             client = self.inverters.get(dev.id)
             client.close()
             del self.inverters[dev.id]
+            self.operating_states.pop(dev.id, None)
+            self.next_poll_times.pop(dev.id, None)
+            self.failed_polls.pop(dev.id, None)
 
         elif dev.deviceTypeId == "smaIndigoHomeManager" and self.home_manager_thread.device_id == dev.id:
             self.home_manager_thread.stop()
@@ -144,30 +247,128 @@ class Plugin(indigo.PluginBase):
 
     def fetch_inverters_data(self):
         """Fetches the data from all registered inverters and updates the states in indigo.
+        Inverters behind the same address and port are polled together over their shared connection.
+        Asleep inverters are only probed when they are due (see _next_sleep_probe_time).
         Will attempt to reconnect the inverter if a ConnectionError is found"""
-        for device_id, client in self.inverters.items():
-            try:
-                inverter = client.get_inverter_data()
-                indigo.devices[device_id].updateStatesOnServer([
-                    {'key': 'serialNumber', 'value': inverter.serialNumber, 'uiValue': inverter.serialNumber},
-                    {'key': 'acPower', 'value': inverter.acPower, 'uiValue': f'{inverter.acPower} W'},
-                    {'key': 'acCurrent', 'value': inverter.acCurrent, 'uiValue': f'{inverter.acCurrent} A'},
-                    {'key': 'acVoltage', 'value': inverter.acVoltage, 'uiValue': f'{inverter.acVoltage} V'},
-                    {'key': 'gridFreq', 'value': inverter.gridFreq, 'uiValue': f'{inverter.gridFreq} Hz'},
-                    {'key': 'deviceTemperature', 'value': inverter.deviceTemperature, 'uiValue': f'{inverter.deviceTemperature} \u00b0C'},
-                    {'key': 'totalOperationTime', 'value': inverter.totalOperationTime, 'uiValue': f'{inverter.totalOperationTime} s'},
-                    {'key': 'feedInTime', 'value': inverter.feedInTime, 'uiValue': f'{inverter.feedInTime} s'},
-                    {'key': 'dailyYield', 'value': inverter.dailyYield, 'uiValue': f'{inverter.dailyYield} Wh'},
-                    {'key': 'totalYield', 'value': inverter.totalYield, 'uiValue': f'{inverter.totalYield} Wh'},
-                ])
-
-            except ModbusException:
-                self.logger.error(f"Lost connection to inverter: {device_id}. Reconnecting...")
-                client.reconnect()
-
-            except AttributeError as e:
-                self.logger.error(f"Lost connection to inverter: {device_id}. Reconnecting...")
-                client.reconnect()
+        now = time.time()
+        due = {
+            device_id: client for device_id, client in self.inverters.items()
+            if self.next_poll_times.get(device_id, 0) <= now
+        }
+
+        for inverters in GatewayPoller.group_by_endpoint(due).values():
+            client = next(iter(inverters.values())).client
+            pipelining = all(inverter.pipelining for inverter in inverters.values())
+            results = GatewayPoller(client, pipelining).poll(inverters)
+            lost_connection = False
+
+            for device_id, inverter in results.items():
+                if isinstance(inverter, Exception):
+                    self.failed_polls[device_id] = self.failed_polls.get(device_id, 0) + 1
+                    if self._fell_asleep(device_id, now):
+                        self._update_operating_state(device_id, OperatingState.ASLEEP, now)
+                        continue
+
+                    self.logger.error(f"Lost connection to inverter: {device_id} ({inverter}). Reconnecting...")
+                    lost_connection = True
+                    continue
+
+                self.failed_polls.pop(device_id, None)
+                self._update_operating_state(device_id, inverter.operatingState, now)
+                self.device_cache.update_inverter(inverters[device_id], inverter)
+                indigo.devices[device_id].updateStatesOnServer(self._inverter_states(inverter))
+
+            # The connection is shared by every inverter in the group, so it only needs to be re-established once
+            if lost_connection:
+                next(iter(inverters.values())).reconnect()
+
+    def _fell_asleep(self, device_id: int, now: float) -> bool:
+        """Whether an inverter that failed to answer is asleep rather than unreachable.
+        Only an inverter that had stopped producing can fall asleep. At night a single failed poll is enough; during
+        the day, or when the sun times are unknown, it takes sleep_failed_polls in a row, so an outage after clouds
+        brought the inverter to standby is still reported and reconnected."""
+        if self.operating_states.get(device_id) not in (OperatingState.STANDBY, OperatingState.ASLEEP):
+            return False
+
+        sun_times = self._sun_times(now)
+        if sun_times is not None and not sun_times[0] <= now < sun_times[1]:
+            return True
+
+        return self.failed_polls.get(device_id, 0) >= self.sleep_failed_polls
+
+    def _inverter_states(self, inverter: Inverter) -> List[dict]:
+        """Builds the inverter device states from the readings of an inverter.
+        Registers without a value keep their last known state, except power and current,
+        which are zero whenever the inverter isn't feeding in"""
+        states = [
+            {'key': 'serialNumber', 'value': inverter.serialNumber, 'uiValue': inverter.serialNumber},
+            {'key': 'acPower', 'value': inverter.acPower or 0, 'uiValue': f'{inverter.acPower or 0} W'},
+            {'key': 'acCurrent', 'value': inverter.acCurrent or 0, 'uiValue': f'{inverter.acCurrent or 0} A'},
+            {'key': 'acVoltage', 'value': inverter.acVoltage, 'uiValue': f'{inverter.acVoltage} V'},
+            {'key': 'gridFreq', 'value': inverter.gridFreq, 'uiValue': f'{inverter.gridFreq} Hz'},
+            {'key': 'deviceTemperature', 'value': inverter.deviceTemperature, 'uiValue': f'{inverter.deviceTemperature} \u00b0C'},
+            {'key': 'totalOperationTime', 'value': inverter.totalOperationTime, 'uiValue': f'{inverter.totalOperationTime} s'},
+            {'key': 'feedInTime', 'value': inverter.feedInTime, 'uiValue': f'{inverter.feedInTime} s'},
+            {'key': 'dailyYield', 'value': inverter.dailyYield, 'uiValue': f'{inverter.dailyYield} Wh'},
+            {'key': 'totalYield', 'value': inverter.totalYield, 'uiValue': f'{inverter.totalYield} Wh'},
+            {'key': 'operatingState', 'value': inverter.operatingState},
+        ]
+        return [state for state in states if state['value'] is not None]
+
+    def _update_operating_state(self, device_id: int, operating_state: str, now: float):
+        """Records the operating state of an inverter and schedules its next poll accordingly."""
+        previous_state = self.operating_states.get(device_id)
+        self.operating_states[device_id] = operating_state
+
+        if operating_state == OperatingState.ASLEEP:
+            self.next_poll_times[device_id] = self._next_sleep_probe_time(now)
+        else:
+            self.next_poll_times.pop(device_id, None)
+
+        if operating_state == previous_state:
+            return
+
+        self.logger.info(f"Inverter {indigo.devices[device_id].name} is now {operating_state}.")
+
+        states = [{'key': 'operatingState', 'value': operating_state}]
+        if operating_state == OperatingState.ASLEEP:
+            states += [
+                {'key': 'acPower', 'value': 0, 'uiValue': '0 W'},
+                {'key': 'acCurrent', 'value': 0, 'uiValue': '0 A'},
+            ]
+        indigo.devices[device_id].updateStatesOnServer(states)
+
+    def _next_sleep_probe_time(self, now: float) -> float:
+        """Returns when an asleep inverter should be probed next.
+        At night asleep inverters are probed every sleep_probe_interval seconds, and the probe is brought
+        forward to sunrise. During the day they keep the normal update rate so they are picked up as soon as they wake."""
+        probe_time = now + self.sleep_probe_interval
+
+        sun_times = self._sun_times(now)
+        if sun_times is None:
+            # Without sun times (e.g. no location configured in Indigo) use the probe interval all day long
+            return probe_time
+
+        sunrise, sunset = sun_times
+        if sunrise <= now < sunset:
+            return now
+
+        if now < sunrise:
+            return min(probe_time, sunrise)
+
+        # After sunset, tomorrow's sunrise is close enough to today's plus one day
+        return min(probe_time, sunrise + 24 * 60 * 60)
+
+    @staticmethod
+    def _sun_times(now: float) -> Optional[Tuple[float, float]]:
+        """Returns the timestamps of the sunrise and sunset of the day of the given time,
+        or None if Indigo can't calculate them (e.g. no location is configured)."""
+        today = datetime.date.fromtimestamp(now)
+
+        try:
+            return indigo.server.calculateSunrise(today).timestamp(), indigo.server.calculateSunset(today).timestamp()
+        except Exception:
+            return None
 
     def fetch_home_manager_data(self):
         if not self.home_manager_thread:
@@ -175,14 +376,20 @@ class Plugin(indigo.PluginBase):
 
         home_manager = self.home_manager_thread.get_home_manager()
 
-        if home_manager is None:
+        # A Home Manager restored from the cache that hasn't broadcast since the thread started is lost as well
+        if home_manager is None or not self.home_manager_thread.home_manager_present_event.is_set():
             self.logger.error(f"Lost connection to Home Manager. Reconnecting...")
 
             self._restart_home_manager_client_thread()
 
             return
 
+        self.device_cache.update_home_manager(home_manager, self.home_manager_thread.layout)
+        self._update_home_manager_states(home_manager)
+
+    def _update_home_manager_states(self, home_manager: HomeManager):
         indigo.devices[self.home_manager_thread.device_id].updateStatesOnServer([
+            {'key': 'serialNumber', 'value': home_manager.serialNumber, 'uiValue': home_manager.serialNumber},
             {'key': 'totalPowerFromGrid', 'value': home_manager.totalPowerFromGrid, 'uiValue': f'{home_manager.totalPowerFromGrid} W'},
             {'key': 'totalPowerToGrid', 'value': home_manager.totalPowerToGrid, 'uiValue': f'{home_manager.totalPowerToGrid} W'},
             {'key': 'phase1PowerFromGrid', 'value': home_manager.phase1PowerFromGrid, 'uiValue': f'{home_manager.phase1PowerFromGrid} W'},
@@ -270,6 +477,44 @@ class Plugin(indigo.PluginBase):
 
         return True, valuesDict, indigo.Dict()
 
+    def discover_inverters(self):
+        """Scans the subnets configured in the plugin preferences for SMA inverters"""
+        subnets = [subnet for subnet in self.pluginPrefs.get('discoverySubnets', '').split(',') if subnet.strip()]
+        if not subnets:
+            self.logger.warning('No subnets configured for inverter discovery. Add them in the plugin preferences.')
+            return
+
+        self.logger.info(f'Scanning {", ".join(subnet.strip() for subnet in subnets)} for inverters...')
+        start = time.monotonic()
+        try:
+            found = self.inverter_scanner.scan(subnets)
+        except ValueError as e:
+            self.logger.error(f'Invalid subnet for inverter discovery: {e}')
+            return
+
+        self.logger.info(f'Found {len(found)} devices in {time.monotonic() - start:.1f} seconds')
+        for inverter in found:
+            self.logger.info(f'    - {inverter.label}')
+
+    def discovered_inverters_list(self, filter: str = "", valuesDict: dict = None, typeId: str = "", targetId: int = 0):
+        """Lists the inverters found by the last discovery scans, for the inverter device ConfigUI"""
+        return [
+            (f'{inverter.address}:{inverter.port}', inverter.label)
+            for inverter in self.inverter_scanner.cache.values()
+        ]
+
+    def use_discovered_inverter(self, valuesDict: dict, typeId: str, devId: int):
+        """Fills the inverter address and port with the inverter selected in the discovered inverters list"""
+        address, _, port = valuesDict.get('discoveredInverter', '').rpartition(':')
+        inverter = self.inverter_scanner.cache.get((address, int(port))) if port.isdigit() else None
+
+        if inverter is not None:
+            valuesDict['inverterAddress'] = inverter.address
+            valuesDict['inverterPort'] = str(inverter.port)
+            valuesDict['inverterUnitId'] = str(inverter.unitId)
+
+        return valuesDict
+
     def _restart_home_manager_client_thread(self):
         if not self.home_manager_thread:
             return False
@@ -277,7 +522,8 @@ class Plugin(indigo.PluginBase):
         self.home_manager_thread.stop()
         self.home_manager_thread.join()
 
-        self.home_manager_thread = HomeManagerClientThread(self.home_manager_thread.device_id)
+        # The datagram layout doesn't change with a reconnection, so the new thread can reuse it
+        self.home_manager_thread = HomeManagerClientThread(self.home_manager_thread.device_id, self.home_manager_thread.layout)
         self.home_manager_thread.start()
         self.home_manager_thread.home_manager_present_event.wait(5)
 
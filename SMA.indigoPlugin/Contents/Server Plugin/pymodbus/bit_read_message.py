@@ -13,6 +13,7 @@ from pymodbus.compat import byte2int
 
 class ReadBitsRequestBase(ModbusRequest):
     ''' Base class for Messages Requesting bit values '''
+    __slots__ = ('address', 'count')
 
     _rtu_frame_size = 8
 
@@ -62,6 +63,7 @@ class ReadBitsRequestBase(ModbusRequest):
 
 class ReadBitsResponseBase(ModbusResponse):
     ''' Base class for Messages responding to bit-reading values '''
+    __slots__ = ('bits', 'byte_count')
 
     _rtu_byte_count_pos = 2
 
@@ -129,6 +131,7 @@ class ReadCoilsRequest(ReadBitsRequestBase):
     coils. In the PDU Coils are addressed starting at zero. Therefore coils
     numbered 1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 1
 
     def __init__(self, address=None, count=None, **kwargs):
@@ -170,6 +173,7 @@ class ReadCoilsResponse(ReadBitsResponseBase):
     (toward the high order end of the byte). The Byte Count field specifies
     the quantity of complete bytes of data.
     '''
+    __slots__ = ()
     function_code = 1
 
     def __init__(self, values=None, **kwargs):
@@ -188,6 +192,7 @@ class ReadDiscreteInputsRequest(ReadBitsRequestBase):
     number of inputs. In the PDU Discrete Inputs are addressed starting at
     zero. Therefore Discrete inputs numbered 1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 2
 
     def __init__(self, address=None, count=None, **kwargs):
@@ -229,6 +234,7 @@ class ReadDiscreteInputsResponse(ReadBitsResponseBase):
     (toward the high order end of the byte). The Byte Count field specifies
     the quantity of complete bytes of data.
     '''
+    __slots__ = ()
     function_code = 2
 
     def __init__(self, values=None, **kwargs):
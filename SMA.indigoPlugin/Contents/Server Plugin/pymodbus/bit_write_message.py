@@ -37,6 +37,7 @@ class WriteSingleCoilRequest(ModbusRequest):
     0X0000 requests the coil to be off. All other values are illegal and
     will not affect the coil.
     '''
+    __slots__ = ('address', 'value')
     function_code = 5
     _rtu_frame_size = 8
 
@@ -103,6 +104,7 @@ class WriteSingleCoilResponse(ModbusResponse):
     The normal response is an echo of the request, returned after the coil
     state has been written.
     '''
+    __slots__ = ('address', 'value')
     function_code = 5
     _rtu_frame_size = 8
 
@@ -153,6 +155,7 @@ class WriteMultipleCoilsRequest(ModbusRequest):
     data field. A logical '1' in a bit position of the field requests the
     corresponding output to be ON. A logical '0' requests it to be OFF."
     '''
+    __slots__ = ('address', 'values', 'byte_count')
     function_code = 15
     _rtu_byte_count_pos = 6
     
@@ -227,6 +230,7 @@ class WriteMultipleCoilsResponse(ModbusResponse):
     The normal response returns the function code, starting address, and
     quantity of coils forced.
     '''
+    __slots__ = ('address', 'count')
     function_code = 15
     _rtu_frame_size = 8
 
@@ -7,8 +7,8 @@ import functools
 import ssl
 from pymodbus.exceptions import ConnectionException
 from pymodbus.client.asynchronous.mixins import AsyncModbusClientMixin
-from pymodbus.compat import byte2int
-from pymodbus.transaction import FifoTransactionManager
+from pymodbus.utilities import LazyHexlify
+from pymodbus.transaction import FifoTransactionManager, TransactionHooks
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -24,6 +24,8 @@ class BaseModbusAsyncClientProtocol(AsyncModbusClientMixin):
     #: Factory that created this instance.
     factory = None
     transport = None
+    #: Bytes received for the frame being decoded, for the transaction hooks.
+    _received_size = 0
 
     async def execute(self, request=None):
         """
@@ -32,7 +34,14 @@ class BaseModbusAsyncClientProtocol(AsyncModbusClientMixin):
         :return:
         """
         req = self._execute(request)
-        resp = await asyncio.wait_for(req, timeout=self._timeout)
+        try:
+            resp = await asyncio.wait_for(req, timeout=self._timeout)
+        except asyncio.TimeoutError:
+            hooks = self.transaction.hooks
+            if hooks.enabled:
+                hooks.emit(TransactionHooks.TIMEOUT, request.function_code,
+                           request.unit_id, request.transaction_id)
+            raise
         return resp
 
     def connection_made(self, transport):
@@ -137,8 +146,12 @@ class BaseModbusAsyncClientProtocol(AsyncModbusClientMixin):
         """
         request.transaction_id = self.transaction.getNextTID()
         packet = self.framer.buildPacket(request)
-        _logger.debug("send: " + " ".join([hex(byte2int(x)) for x in packet]))
+        _logger.debug("send: %s", LazyHexlify(packet))
         self.write_transport(packet)
+        hooks = self.transaction.hooks
+        if hooks.enabled:
+            hooks.emit(TransactionHooks.REQUEST_SENT, request.function_code,
+                       request.unit_id, request.transaction_id, len(packet))
         return self._buildResponse(request.transaction_id)
 
     def _dataReceived(self, data):
@@ -146,8 +159,19 @@ class BaseModbusAsyncClientProtocol(AsyncModbusClientMixin):
 
         :param data: The data returned from the server
         '''
-        _logger.debug("recv: " + " ".join([hex(byte2int(x)) for x in data]))
-        unit = self.framer.decode_data(data).get("unit", 0)
+        _logger.debug("recv: %s", LazyHexlify(data))
+        header = self.framer.decode_data(data)
+        unit = header.get("unit", 0)
+        hooks = self.transaction.hooks
+        if hooks.enabled:
+            if self.framer._buffer:
+                self._received_size += len(data)
+            else:
+                # Nothing buffered, so this chunk starts a new frame
+                self._received_size = len(data)
+                hooks.emit(TransactionHooks.FIRST_BYTE,
+                           header.get("fcode", 0), unit,
+                           header.get("tid", 0), len(data))
         self.framer.processIncomingPacket(data, self._handleResponse, unit=unit)
 
     def _handleResponse(self, reply, **kwargs):
@@ -160,9 +184,14 @@ class BaseModbusAsyncClientProtocol(AsyncModbusClientMixin):
             tid = reply.transaction_id
             handler = self.transaction.getTransaction(tid)
             if handler:
+                hooks = self.transaction.hooks
+                if hooks.enabled:
+                    hooks.emit(TransactionHooks.RESPONSE_DECODED,
+                               reply.function_code, reply.unit_id, tid,
+                               self._received_size)
                 self.resolve_future(handler, reply)
             else:
-                _logger.debug("Unrequested message: " + str(reply))
+                _logger.debug("Unrequested message: %s", reply)
 
     def _buildResponse(self, tid):
         """
@@ -1,5 +1,6 @@
 import socket
 import select
+import struct
 import serial
 import time
 import ssl
@@ -7,14 +8,17 @@ import sys
 from functools import partial
 from pymodbus.constants import Defaults
 from pymodbus.utilities import hexlify_packets, ModbusTransactionState
+from pymodbus.utilities import LazyHexlify
 from pymodbus.factory import ClientDecoder
 from pymodbus.exceptions import NotImplementedException, ParameterException
-from pymodbus.exceptions import ConnectionException
+from pymodbus.exceptions import ModbusException
+from pymodbus.exceptions import ConnectionException, ModbusIOException
 from pymodbus.transaction import FifoTransactionManager
 from pymodbus.transaction import DictTransactionManager
 from pymodbus.transaction import ModbusSocketFramer, ModbusBinaryFramer
 from pymodbus.transaction import ModbusAsciiFramer, ModbusRtuFramer
 from pymodbus.transaction import ModbusTlsFramer
+from pymodbus.transaction import TransactionHooks, _clock
 from pymodbus.client.common import ModbusClientMixin
 
 # --------------------------------------------------------------------------- #
@@ -45,6 +49,10 @@ class BaseModbusClient(ModbusClientMixin):
         self._debug = False
         self._debugfd = None
         self.broadcast_enable = kwargs.get('broadcast_enable', Defaults.broadcast_enable)
+        # Called by the next read with the size of the first chunk it
+        # receives, as soon as it arrives. Only the transports that can
+        # tell call it (see ModbusTcpClient._recv), and they reset it.
+        self.first_chunk_callback = None
 
     # ----------------------------------------------------------------------- #
     # Client interface
@@ -98,14 +106,16 @@ class BaseModbusClient(ModbusClientMixin):
     # ----------------------------------------------------------------------- #
     # Modbus client methods
     # ----------------------------------------------------------------------- #
-    def execute(self, request=None):
+    def execute(self, request=None, timeout=None):
         """
         :param request: The request to process
+        :param timeout: The time budget of the request over every try, in
+            seconds (default: the one of the transaction retry policy)
         :returns: The result of the request execution
         """
         if not self.connect():
             raise ConnectionException("Failed to connect[%s]" % (self.__str__()))
-        return self.transaction.execute(request)
+        return self.transaction.execute(request, timeout=timeout)
 
     # ----------------------------------------------------------------------- #
     # The magic methods
@@ -197,6 +207,8 @@ class ModbusTcpClient(BaseModbusClient):
         self.source_address = kwargs.get('source_address', ('', 0))
         self.socket = None
         self.timeout = kwargs.get('timeout',  Defaults.Timeout)
+        self._recv_buffer = bytearray(Defaults.ReadSize)
+        self._socket_timeout = None
         BaseModbusClient.__init__(self, framer(ClientDecoder(), self), **kwargs)
 
     def connect(self):
@@ -214,8 +226,19 @@ class ModbusTcpClient(BaseModbusClient):
             _logger.error('Connection to (%s, %s) '
                           'failed: %s' % (self.host, self.port, msg))
             self.close()
+        else:
+            self._configure_socket()
         return self.socket is not None
 
+    def _configure_socket(self):
+        """ Sets the options of a newly connected socket
+
+        Requests are small frames written in one go, so Nagle's algorithm
+        would only delay them.
+        """
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket_timeout = self.timeout
+
     def close(self):
         """ Closes the underlying socket connection
         """
@@ -252,39 +275,162 @@ class ModbusTcpClient(BaseModbusClient):
         # is received or timeout is expired.
         # If timeout expires returns the read data, also if its length is
         # less than the expected size.
-        self.socket.setblocking(0)
+        # The data is received straight into a buffer kept for the whole
+        # connection, and the socket timeout bounds each wait, so there is
+        # a single copy per call and no select() per chunk.
+        if size is not None and size > len(self._recv_buffer):
+            self._recv_buffer = bytearray(size)
+        buffer = memoryview(self._recv_buffer)
+        limit = len(buffer) if size is None else size
 
-        timeout = self.timeout
-
-        # If size isn't specified read 1 byte at a time.
-        if size is None:
-            recv_size = 1
-        else:
-            recv_size = size
-
-        data = []
         data_length = 0
-        time_ = time.time()
-        end = time_ + timeout
-        while recv_size > 0:
-            ready = select.select([self.socket], [], [], end - time_)
-            if ready[0]:
-                recv_data = self.socket.recv(recv_size)
-                data.append(recv_data)
-                data_length += len(recv_data)
-            time_ = time.time()
-
-            # If size isn't specified continue to read until timeout expires.
-            if size:
-                recv_size = size - data_length
-
-            # Timeout is reduced also if some data has been received in order
-            # to avoid infinite loops when there isn't an expected response
-            # size and the slave sends noisy data continuosly.
-            if time_ > end:
-                break
+        end = time.time() + self.timeout
+        try:
+            while data_length < limit:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    break
+                # The socket keeps the full timeout for the first chunk,
+                # which is usually the only one
+                if data_length and self._socket_timeout != remaining:
+                    self.socket.settimeout(remaining)
+                    self._socket_timeout = remaining
+                try:
+                    received = self.socket.recv_into(
+                        buffer[data_length:limit])
+                except socket.timeout:
+                    break
+                if not received:
+                    # The remote end closed the connection
+                    break
+                if not data_length and self.first_chunk_callback:
+                    callback, self.first_chunk_callback = \
+                        self.first_chunk_callback, None
+                    callback(received)
+                data_length += received
+
+                # If size isn't specified continue to read until timeout
+                # expires, growing the buffer as needed.
+                if size is None and data_length == limit:
+                    self._recv_buffer = bytearray(limit * 2)
+                    self._recv_buffer[:data_length] = buffer[:data_length]
+                    buffer = memoryview(self._recv_buffer)
+                    limit = len(buffer)
+        finally:
+            if self._socket_timeout != self.timeout and self.socket:
+                self.socket.settimeout(self.timeout)
+                self._socket_timeout = self.timeout
+
+        return bytes(buffer[:data_length])
+
+    def execute_many(self, requests):
+        """ Executes several requests in a single round trip
+
+        Every request gets its own transaction id and all the frames are
+        sent with a single write. The responses are then read as they
+        arrive and matched to their requests by transaction id, so this
+        only works with devices and gateways that accept pipelined
+        Modbus/TCP requests. Requests that get no response (or whose
+        response can't be decoded) get a ModbusIOException instead, like
+        with execute().
+
+        :param requests: The requests to process
+        :returns: The responses, in the same order as the requests
+        """
+        if not isinstance(self.framer, ModbusSocketFramer):
+            raise NotImplementedException(
+                "Pipelining needs transaction ids, which %s doesn't "
+                "have" % self.framer.__class__.__name__)
+        if not self.connect():
+            raise ConnectionException("Failed to connect[%s]" % (self.__str__()))
 
-        return b"".join(data)
+        requests = list(requests)
+        with self.transaction._transaction_lock:
+            packets = []
+            for request in requests:
+                request.transaction_id = self.transaction.getNextTID()
+                packets.append(self.framer.buildPacket(request))
+            self.framer.resetFrame()
+
+            last_exception = None
+            pending = set(request.transaction_id for request in requests)
+            units = list(set(request.unit_id for request in requests))
+            hooks = self.transaction.hooks
+            hooks = hooks if hooks.enabled else None
+            sizes = {}
+            try:
+                self.state = ModbusTransactionState.SENDING
+                self.socket.sendall(b''.join(packets))
+                if hooks is not None:
+                    for request, packet in zip(requests, packets):
+                        hooks.emit(TransactionHooks.REQUEST_SENT,
+                                   request.function_code, request.unit_id,
+                                   request.transaction_id, len(packet))
+                    by_tid = dict((request.transaction_id, request)
+                                  for request in requests)
+                self.state = ModbusTransactionState.WAITING_FOR_REPLY
+                while pending:
+                    # The transaction a response belongs to is only known
+                    # once its header is read, so the first byte is
+                    # reported then, with the time it arrived at
+                    arrival = []
+                    if hooks is not None:
+                        self.first_chunk_callback = \
+                            lambda size: arrival.append(_clock())
+                    # The MBAP header ends with the length of the rest of
+                    # the frame
+                    try:
+                        header = self._recv(6)
+                    finally:
+                        self.first_chunk_callback = None
+                    if len(header) != 6:
+                        raise ModbusIOException(
+                            "Incomplete message header received, expected "
+                            "6 bytes (%d received)" % len(header))
+                    tid, _, length = struct.unpack('>HHH', header)
+                    if hooks is not None and tid in by_tid:
+                        hooks.emit(TransactionHooks.FIRST_BYTE,
+                                   by_tid[tid].function_code,
+                                   by_tid[tid].unit_id, tid, 6,
+                                   arrival[0] if arrival else None)
+                        sizes[tid] = 6 + length
+                    body = self._recv(length)
+                    if len(body) != length:
+                        raise ModbusIOException(
+                            "Incomplete message received, expected %d bytes "
+                            "(%d received)" % (length, len(body)))
+                    self.framer.processIncomingPacket(
+                        header + body, self.transaction.addTransaction, units,
+                        single=True)
+                    pending.discard(tid)
+            except (socket.error, ModbusException, struct.error,
+                    IndexError, ValueError) as msg:
+                # A read or decode error. Whatever is left of the frames
+                # would be read as the response to the next request, so
+                # the connection is dropped
+                _logger.debug("Pipelined transaction failed. (%s) ", msg)
+                last_exception = msg
+                self.close()
+            self.state = ModbusTransactionState.TRANSACTION_COMPLETE
+
+            responses = []
+            for request in requests:
+                response = self.transaction.getTransaction(
+                    request.transaction_id)
+                if response is None:
+                    response = ModbusIOException(
+                        last_exception or "No Response received from the "
+                        "remote unit/Unable to decode response",
+                        request.function_code)
+                    event = TransactionHooks.TIMEOUT
+                else:
+                    event = TransactionHooks.RESPONSE_DECODED
+                if hooks is not None:
+                    hooks.emit(event, request.function_code, request.unit_id,
+                               request.transaction_id,
+                               sizes.get(request.transaction_id, 0))
+                responses.append(response)
+            return responses
 
     def is_socket_open(self):
         return True if self.socket is not None else False
@@ -641,9 +787,8 @@ class ModbusSerialClient(BaseModbusClient):
                 waitingbytes = self._in_waiting()
                 if waitingbytes:
                     result = self.socket.read(waitingbytes)
-                    if _logger.isEnabledFor(logging.WARNING):
-                        _logger.warning("Cleanup recv buffer before "
-                                        "send: " + hexlify_packets(result))
+                    _logger.warning("Cleanup recv buffer before "
+                                    "send: %s", LazyHexlify(result))
             except NotImplementedError:
                 pass
 
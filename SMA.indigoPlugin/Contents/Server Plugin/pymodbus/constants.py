@@ -45,6 +45,12 @@ class Defaults(Singleton):
        The default amount of time a client should wait for a request
        to be processed (3 seconds)
 
+    .. attribute:: MaxTransactions
+
+       The maximum number of transactions a transaction manager keeps
+       waiting for a response. Once it is reached, the oldest transaction
+       is dropped to make room for a new one. This defaults to 256.
+
     .. attribute:: Reconnects
 
        The default number of times a client should attempt to reconnect
@@ -120,6 +126,7 @@ class Defaults(Singleton):
     RetryOnInvalid      = False
     Timeout             = 3
     Reconnects          = 0
+    MaxTransactions     = 256
     TransactionId       = 0
     ProtocolId          = 0
     UnitId              = 0x00
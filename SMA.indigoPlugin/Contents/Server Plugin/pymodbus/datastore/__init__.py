@@ -1,4 +1,5 @@
 from pymodbus.datastore.store import ModbusSequentialDataBlock
+from pymodbus.datastore.store import ModbusSequentialBitDataBlock
 from pymodbus.datastore.store import ModbusSparseDataBlock
 from pymodbus.datastore.context import ModbusSlaveContext
 from pymodbus.datastore.context import ModbusServerContext
@@ -7,6 +8,7 @@ from pymodbus.datastore.context import ModbusServerContext
 # Exported symbols
 #---------------------------------------------------------------------------#
 __all__ = [
-    "ModbusSequentialDataBlock", "ModbusSparseDataBlock",
+    "ModbusSequentialDataBlock", "ModbusSequentialBitDataBlock",
+    "ModbusSparseDataBlock",
     "ModbusSlaveContext", "ModbusServerContext",
 ]
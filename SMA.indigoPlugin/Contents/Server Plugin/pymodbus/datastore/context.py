@@ -1,6 +1,7 @@
 from pymodbus.exceptions import ParameterException, NoSuchSlaveException
 from pymodbus.interfaces import IModbusSlaveContext
 from pymodbus.datastore.store import ModbusSequentialDataBlock
+from pymodbus.datastore.store import ModbusSequentialBitDataBlock
 from pymodbus.constants import Defaults
 from pymodbus.compat import iteritems, itervalues
 
@@ -32,10 +33,13 @@ class ModbusSlaveContext(IModbusSlaveContext):
             'ir' - Input Registers iniatializer
         '''
         self.store = dict()
-        self.store['d'] = kwargs.get('di', ModbusSequentialDataBlock.create())
-        self.store['c'] = kwargs.get('co', ModbusSequentialDataBlock.create())
-        self.store['i'] = kwargs.get('ir', ModbusSequentialDataBlock.create())
-        self.store['h'] = kwargs.get('hr', ModbusSequentialDataBlock.create())
+        for fx, key, block_class in (
+                ('d', 'di', ModbusSequentialBitDataBlock),
+                ('c', 'co', ModbusSequentialBitDataBlock),
+                ('i', 'ir', ModbusSequentialDataBlock),
+                ('h', 'hr', ModbusSequentialDataBlock)):
+            self.store[fx] = (kwargs[key] if key in kwargs
+                              else block_class.create())
         self.zero_mode = kwargs.get('zero_mode', Defaults.ZeroMode)
 
     def __str__(self):
@@ -60,8 +64,8 @@ class ModbusSlaveContext(IModbusSlaveContext):
         '''
         if not self.zero_mode:
             address = address + 1
-        _logger.debug("validate: fc-[%d] address-%d: count-%d" % (fx, address,
-                                                                  count))
+        _logger.debug("validate: fc-[%d] address-%d: count-%d", fx, address,
+                      count)
         return self.store[self.decode(fx)].validate(address, count)
 
     def getValues(self, fx, address, count=1):
@@ -74,8 +78,8 @@ class ModbusSlaveContext(IModbusSlaveContext):
         '''
         if not self.zero_mode:
             address = address + 1
-        _logger.debug("getValues fc-[%d] address-%d: count-%d" % (fx, address,
-                                                                  count))
+        _logger.debug("getValues fc-[%d] address-%d: count-%d", fx, address,
+                      count)
         return self.store[self.decode(fx)].getValues(address, count)
 
     def setValues(self, fx, address, values):
@@ -87,7 +91,7 @@ class ModbusSlaveContext(IModbusSlaveContext):
         '''
         if not self.zero_mode:
             address = address + 1
-        _logger.debug("setValues[%d] %d:%d" % (fx, address, len(values)))
+        _logger.debug("setValues[%d] %d:%d", fx, address, len(values))
         self.store[self.decode(fx)].setValues(address, values)
 
     def register(self, fc, fx, datablock=None):
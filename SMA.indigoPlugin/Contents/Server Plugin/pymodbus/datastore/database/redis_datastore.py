@@ -1,6 +1,6 @@
+import struct
 import redis
 from pymodbus.interfaces import IModbusSlaveContext
-from pymodbus.utilities import pack_bitstring, unpack_bitstring
 
 #---------------------------------------------------------------------------#
 # Logging
@@ -16,6 +16,16 @@ class RedisSlaveContext(IModbusSlaveContext):
     '''
     This is a modbus slave context using redis as a backing
     store.
+
+    Each data bank is stored in a single redis string, addressed with
+    GETRANGE and SETRANGE, so every request costs one command whatever
+    the number of values. Every value is a fixed size record starting
+    with a flag byte, which tells the values that were set from the zero
+    bytes redis pads the string with:
+
+    * discretes and coils: one byte, 0x02 for off and 0x03 for on
+    * registers: the flag byte 0x01 then the big-endian value, kept to
+      16 bits like on the wire (so -1 is stored as 0xFFFF)
     '''
 
     def __init__(self, **kwargs):
@@ -24,11 +34,12 @@ class RedisSlaveContext(IModbusSlaveContext):
         :param host: The host to connect to
         :param port: The port to connect to
         :param prefix: A prefix for the keys
+        :param client: An existing redis client to use instead
         '''
         host = kwargs.get('host', 'localhost')
         port = kwargs.get('port', 6379)
         self.prefix = kwargs.get('prefix', 'pymodbus')
-        self.client = kwargs.get('client', redis.Redis(host=host, port=port))
+        self.client = kwargs.get('client') or redis.Redis(host=host, port=port)
         self._build_mapping()
 
     def __str__(self):
@@ -40,7 +51,7 @@ class RedisSlaveContext(IModbusSlaveContext):
 
     def reset(self):
         ''' Resets all the datastores to their default values '''
-        self.client.flushall()
+        self.client.delete(*[self._get_prefix(key) for key in 'dchi'])
 
     def validate(self, fx, address, count=1):
         ''' Validates the request to make sure it is in range
@@ -51,7 +62,7 @@ class RedisSlaveContext(IModbusSlaveContext):
         :returns: True if the request in within range, False otherwise
         '''
         address = address + 1  # section 4.4 of specification
-        _logger.debug("validate[%d] %d:%d" % (fx, address, count))
+        _logger.debug("validate[%d] %d:%d", fx, address, count)
         return self._val_callbacks[self.decode(fx)](address, count)
 
     def getValues(self, fx, address, count=1):
@@ -63,7 +74,7 @@ class RedisSlaveContext(IModbusSlaveContext):
         :returns: The requested values from a:a+c
         '''
         address = address + 1  # section 4.4 of specification
-        _logger.debug("getValues[%d] %d:%d" % (fx, address, count))
+        _logger.debug("getValues[%d] %d:%d", fx, address, count)
         return self._get_callbacks[self.decode(fx)](address, count)
 
     def setValues(self, fx, address, values):
@@ -74,7 +85,7 @@ class RedisSlaveContext(IModbusSlaveContext):
         :param values: The new values to be set
         '''
         address = address + 1  # section 4.4 of specification
-        _logger.debug("setValues[%d] %d:%d" % (fx, address, len(values)))
+        _logger.debug("setValues[%d] %d:%d", fx, address, len(values))
         self._set_callbacks[self.decode(fx)](address, values)
 
     #--------------------------------------------------------------------------#
@@ -88,6 +99,21 @@ class RedisSlaveContext(IModbusSlaveContext):
         '''
         return "%s:%s" % (self.prefix, key)
 
+    def _get_range(self, key, offset, count, size):
+        ''' Reads the records of a range of values
+
+        :param key: The key prefix to use
+        :param offset: The address offset to start at
+        :param count: The number of values to read
+        :param size: The size of a record
+        :returns: The records, truncated at the end of the data bank
+        '''
+        if count <= 0:
+            return b''
+        start = offset * size
+        return self.client.getrange(self._get_prefix(key),
+                                    start, start + count * size - 1)
+
     def _build_mapping(self):
         '''
         A quick helper method to build the function
@@ -115,34 +141,19 @@ class RedisSlaveContext(IModbusSlaveContext):
     #--------------------------------------------------------------------------#
     # Redis discrete implementation
     #--------------------------------------------------------------------------#
-    _bit_size = 16
-    _bit_default = '\x00' * (_bit_size % 8)
-
-    def _get_bit_values(self, key, offset, count):
-        ''' This is a helper to abstract getting bit values
-
-        :param key: The key prefix to use
-        :param offset: The address offset to start at
-        :param count: The number of bits to read
-        '''
-        key = self._get_prefix(key)
-        s = divmod(offset, self._bit_size)[0]
-        e = divmod(offset + count, self._bit_size)[0]
-
-        request = ('%s:%s' % (key, v) for v in range(s, e + 1))
-        response = self.client.mget(request)
-        return response
+    _bit_size = 1
+    _bit_flag = 0x02
 
     def _val_bit(self, key, offset, count):
         ''' Validates that the given range is currently set in redis.
-        If any of the keys return None, then it is invalid.
+        If any of the bits is missing, then it is invalid.
 
         :param key: The key prefix to use
         :param offset: The address offset to start at
         :param count: The number of bits to read
         '''
-        response = self._get_bit_values(key, offset, count)
-        return True if None not in response else False
+        response = self._get_range(key, offset, count, self._bit_size)
+        return len(response) == count and b'\x00' not in response
 
     def _get_bit(self, key, offset, count):
         '''
@@ -151,11 +162,10 @@ class RedisSlaveContext(IModbusSlaveContext):
         :param offset: The address offset to start at
         :param count: The number of bits to read
         '''
-        response = self._get_bit_values(key, offset, count)
-        response = (r or self._bit_default for r in response)
-        result = ''.join(response)
-        result = unpack_bitstring(result)
-        return result[offset:offset + count]
+        response = bytearray(self._get_range(key, offset, count,
+                                             self._bit_size))
+        response.extend(b'\x00' * (count - len(response)))
+        return [bool(r & 0x01) for r in response]
 
     def _set_bit(self, key, offset, values):
         '''
@@ -164,65 +174,41 @@ class RedisSlaveContext(IModbusSlaveContext):
         :param offset: The address offset to start at
         :param values: The values to set
         '''
-        count = len(values)
-        s = divmod(offset, self._bit_size)[0]
-        e = divmod(offset + count, self._bit_size)[0]
-        value = pack_bitstring(values)
-
-        current = self._get_bit_values(key, offset, count)
-        current = (r or self._bit_default for r in current)
-        current = ''.join(current)
-        current = current[0:offset] + value.decode('utf-8') + current[offset + count:]
-        final = (current[s:s + self._bit_size] for s in range(0, count, self._bit_size))
-
-        key = self._get_prefix(key)
-        request = ('%s:%s' % (key, v) for v in range(s, e + 1))
-        request = dict(zip(request, final))
-        self.client.mset(request)
+        if not len(values):
+            return
+        value = bytearray(self._bit_flag | bool(v) for v in values)
+        self.client.setrange(self._get_prefix(key), offset * self._bit_size,
+                             bytes(value))
 
     #--------------------------------------------------------------------------#
     # Redis register implementation
     #--------------------------------------------------------------------------#
-    _reg_size = 16
-    _reg_default = '\x00' * (_reg_size % 8)
-
-    def _get_reg_values(self, key, offset, count):
-        ''' This is a helper to abstract getting register values
-
-        :param key: The key prefix to use
-        :param offset: The address offset to start at
-        :param count: The number of bits to read
-        '''
-        key = self._get_prefix(key)
-        #s = divmod(offset, self.__reg_size)[0]
-        #e = divmod(offset+count, self.__reg_size)[0]
-
-        #request  = ('%s:%s' % (key, v) for v in range(s, e + 1))
-        request = ('%s:%s' % (key, v) for v in range(offset, count + 1))
-        response = self.client.mget(request)
-        return response
+    _reg_record = struct.Struct('>BH')
+    _reg_size = _reg_record.size
+    _reg_flag = 0x01
 
     def _val_reg(self, key, offset, count):
         ''' Validates that the given range is currently set in redis.
-        If any of the keys return None, then it is invalid.
+        If any of the registers is missing, then it is invalid.
 
         :param key: The key prefix to use
         :param offset: The address offset to start at
-        :param count: The number of bits to read
+        :param count: The number of registers to read
         '''
-        response = self._get_reg_values(key, offset, count)
-        return None not in response
+        response = self._get_range(key, offset, count, self._reg_size)
+        return (len(response) == count * self._reg_size
+                and b'\x00' not in response[::self._reg_size])
 
     def _get_reg(self, key, offset, count):
         '''
 
         :param key: The key prefix to use
         :param offset: The address offset to start at
-        :param count: The number of bits to read
+        :param count: The number of registers to read
         '''
-        response = self._get_reg_values(key, offset, count)
-        response = [r or self._reg_default for r in response]
-        return response[offset:offset + count]
+        response = self._get_range(key, offset, count, self._reg_size)
+        response += b'\x00' * (count * self._reg_size - len(response))
+        return list(struct.unpack('>' + 'xH' * count, response))
 
     def _set_reg(self, key, offset, values):
         '''
@@ -231,13 +217,9 @@ class RedisSlaveContext(IModbusSlaveContext):
         :param offset: The address offset to start at
         :param values: The values to set
         '''
-        count = len(values)
-        #s = divmod(offset, self.__reg_size)
-        #e = divmod(offset+count, self.__reg_size)
-
-        #current = self.__get_reg_values(key, offset, count)
-
-        key = self._get_prefix(key)
-        request = ('%s:%s' % (key, v) for v in range(offset, count + 1))
-        request = dict(zip(request, values))
-        self.client.mset(request)
+        if not len(values):
+            return
+        pack = self._reg_record.pack
+        value = b''.join(pack(self._reg_flag, int(v) & 0xFFFF) for v in values)
+        self.client.setrange(self._get_prefix(key), offset * self._reg_size,
+                             value)
@@ -1,3 +1,5 @@
+import sqlite3
+import threading
 import sqlalchemy
 import sqlalchemy.types as sqltypes
 from sqlalchemy.sql import and_
@@ -21,16 +23,51 @@ class SqlSlaveContext(IModbusSlaveContext):
     """
     This creates a modbus data model with each data access
     stored in its own personal block
+
+    By default every access runs its own query. With a ``flush_interval``
+    the context caches the registers in memory instead: ranges of
+    registers are read through from the database the first time they are
+    accessed, and writes only update the cache. A background thread then
+    writes the registers changed since the last flush in a single
+    transaction every ``flush_interval`` seconds, so requests never wait
+    on a database write. Call flush() to write them right away and
+    close() to stop the thread. A cache miss still reads the database on
+    the request thread, but without holding up the other requests.
+
+    The cached mode needs a database every thread can see: with an
+    in-memory sqlite database (``sqlite://``) each thread gets a database
+    of its own, so the writer thread would write to an empty one. Use a
+    sqlite file or a database server instead.
     """
 
+    #: The number of registers read from the database at once on a miss
+    PAGE_SIZE = 256
+
     def __init__(self, *args, **kwargs):
         """ Initializes the datastores
 
-        :param kwargs: Each element is a ModbusDataBlock
+        :param table: The table name to use
+        :param database: The database uri to use
+        :param flush_interval: The time in seconds between two writes of
+            the cached changes (default: no cache)
         """
         self.table = kwargs.get('table', 'pymodbus')
         self.database = kwargs.get('database', 'sqlite:///pymodbus.db')
+        self.flush_interval = kwargs.get('flush_interval', None)
         self._db_create(self.table, self.database)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._generation = 0
+        self._cache = {}
+        self._loaded = set()
+        self._dirty = {}
+        self._stopped = threading.Event()
+        self._flusher = None
+        if self.flush_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_loop,
+                                             name="SqlSlaveContext flusher")
+            self._flusher.daemon = True
+            self._flusher.start()
 
     def __str__(self):
         """ Returns a string representation of the context
@@ -41,8 +78,44 @@ class SqlSlaveContext(IModbusSlaveContext):
 
     def reset(self):
         """ Resets all the datastores to their default values """
-        self._metadata.drop_all()
-        self._db_create(self.table, self.database)
+        # No flush may run while the table and its engine are replaced
+        with self._flush_lock:
+            with self._lock:
+                # Pages being read from the old table are thrown away
+                self._generation += 1
+                self._cache.clear()
+                self._loaded.clear()
+                self._dirty.clear()
+                self._metadata.drop_all()
+                self._db_create(self.table, self.database)
+
+    def flush(self):
+        """ Writes the cached changes to the database """
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return
+            rows = [{'type': type, 'index': index, 'value': value}
+                    for (type, index), value in dirty.items()]
+            try:
+                with self._engine.begin() as connection:
+                    self._upsert(connection, rows)
+            except Exception:
+                _logger.exception("Unable to write %d registers", len(rows))
+                with self._lock:
+                    # Keep the changes for the next flush, unless they were
+                    # written again meanwhile
+                    for key, value in dirty.items():
+                        self._dirty.setdefault(key, value)
+
+    def close(self):
+        """ Stops the background writer, writing the pending changes """
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
 
     def validate(self, fx, address, count=1):
         """ Validates the request to make sure it is in range
@@ -53,7 +126,9 @@ class SqlSlaveContext(IModbusSlaveContext):
         :returns: True if the request in within range, False otherwise
         """
         address = address + 1  # section 4.4 of specification
-        _logger.debug("validate[%d] %d:%d" % (fx, address, count))
+        _logger.debug("validate[%d] %d:%d", fx, address, count)
+        if self.flush_interval is not None:
+            return self._cached_validate(self.decode(fx), address, count)
         return self._validate(self.decode(fx), address, count)
 
     def getValues(self, fx, address, count=1):
@@ -65,7 +140,9 @@ class SqlSlaveContext(IModbusSlaveContext):
         :returns: The requested values from a:a+c
         """
         address = address + 1  # section 4.4 of specification
-        _logger.debug("get-values[%d] %d:%d" % (fx, address, count))
+        _logger.debug("get-values[%d] %d:%d", fx, address, count)
+        if self.flush_interval is not None:
+            return self._cached_get(self.decode(fx), address, count)
         return self._get(self.decode(fx), address, count)
 
     def setValues(self, fx, address, values, update=True):
@@ -74,11 +151,14 @@ class SqlSlaveContext(IModbusSlaveContext):
         :param fx: The function we are working with
         :param address: The starting address
         :param values: The new values to be set
-        :param update: Update existing register in the db
+        :param update: Update existing register in the db, instead of
+            inserting or overwriting them
         """
         address = address + 1  # section 4.4 of specification
-        _logger.debug("set-values[%d] %d:%d" % (fx, address, len(values)))
-        if update:
+        _logger.debug("set-values[%d] %d:%d", fx, address, len(values))
+        if self.flush_interval is not None:
+            self._cached_set(self.decode(fx), address, values, update)
+        elif update:
             self._update(self.decode(fx), address, values)
         else:
             self._set(self.decode(fx), address, values)
@@ -135,9 +215,40 @@ class SqlSlaveContext(IModbusSlaveContext):
             })
         return result
 
-    def _check(self, type, offset, values):
-        result = self._get(type, offset, count=1)
-        return False if len(result) > 0 else True
+    def _upsert(self, connection, rows):
+        """ Inserts registers, overwriting the ones that already exist
+
+        This is a single INSERT ... ON CONFLICT (or ON DUPLICATE KEY)
+        statement run for all the rows when the database supports it.
+
+        :param connection: The connection to use
+        :param rows: The type, index and value of each register
+        """
+        dialect = self._engine.dialect
+        quote = dialect.identifier_preparer.quote
+        table = dialect.identifier_preparer.format_table(self._table)
+        insert = "INSERT INTO %s (%s, %s, %s) VALUES (:type, :index, :value)" % (
+            table, quote('type'), quote('index'), quote('value'))
+        if ((dialect.name == 'sqlite' and sqlite3.sqlite_version_info >= (3, 24))
+                or dialect.name == 'postgresql'):
+            query = "%s ON CONFLICT (%s, %s) DO UPDATE SET %s = excluded.%s" % (
+                insert, quote('type'), quote('index'), quote('value'),
+                quote('value'))
+        elif dialect.name == 'mysql':
+            query = "%s ON DUPLICATE KEY UPDATE %s = VALUES(%s)" % (
+                insert, quote('value'), quote('value'))
+        else:
+            update = self._table.update().values(value=bindparam('x_value'))
+            update = update.where(and_(
+                self._table.c.type == bindparam('x_type'),
+                self._table.c.index == bindparam('x_index')))
+            missing = [row for row in rows if not connection.execute(
+                update, x_type=row['type'], x_index=row['index'],
+                x_value=row['value']).rowcount]
+            if missing:
+                connection.execute(self._table.insert(), missing)
+            return
+        connection.execute(sqlalchemy.text(query), rows)
 
     def _set(self, type, offset, values):
         """
@@ -146,13 +257,9 @@ class SqlSlaveContext(IModbusSlaveContext):
         :param offset: The address offset to start at
         :param values: The values to set
         """
-        if self._check(type, offset, values):
-            context = self._build_set(type, offset, values)
-            query = self._table.insert()
-            result = self._connection.execute(query, context)
-            return result.rowcount == len(values)
-        else:
-            return False
+        context = self._build_set(type, offset, values)
+        self._upsert(self._connection, context)
+        return True
 
     def _update(self, type, offset, values):
         """
@@ -182,3 +289,93 @@ class SqlSlaveContext(IModbusSlaveContext):
             self._table.c.index <= offset + count - 1))
         result = self._connection.execute(query).fetchall()
         return len(result) == count
+
+    # ----------------------------------------------------------------------- #
+    # Cache Helper Methods
+    # ----------------------------------------------------------------------- #
+    def _cached(self, type, offset, count, operation):
+        """ Runs an operation on the cached registers of a type, once the
+        pages holding a range of registers were read into the cache
+
+        The missing pages are read without holding the lock, so other
+        requests and the writer thread go on meanwhile.
+
+        :param type: The key prefix to use
+        :param offset: The address offset to start at
+        :param count: The number of registers in the range
+        :param operation: The function to call with the cache of the type
+        :returns: The result of the operation
+        """
+        size = self.PAGE_SIZE
+        while True:
+            with self._lock:
+                pages = [page for page in range(offset // size,
+                                                (offset + count - 1) // size + 1)
+                         if (type, page) not in self._loaded]
+                if not pages:
+                    return operation(self._cache.setdefault(type, {}))
+                generation, engine, table = (self._generation, self._engine,
+                                             self._table)
+            first, last = pages[0] * size, (pages[-1] + 1) * size
+            query = table.select(and_(table.c.type == type,
+                                      table.c.index >= first,
+                                      table.c.index < last))
+            with engine.connect() as connection:
+                rows = [(row.index, row.value)
+                        for row in connection.execute(query)]
+            with self._lock:
+                if generation != self._generation:
+                    # The context was reset while reading
+                    continue
+                cache = self._cache.setdefault(type, {})
+                for index, value in rows:
+                    # Cached values are more recent than the database, and
+                    # another request may have read the page meanwhile
+                    cache.setdefault(index, value)
+                self._loaded.update((type, page) for page in
+                                    range(pages[0], pages[-1] + 1))
+
+    def _cached_validate(self, type, offset, count):
+        """
+        :param type: The key prefix to use
+        :param offset: The address offset to start at
+        :param count: The number of bits to read
+        :returns: The result of the validation
+        """
+        return self._cached(type, offset, count, lambda cache: all(
+            index in cache for index in range(offset, offset + count)))
+
+    def _cached_get(self, type, offset, count):
+        """
+        :param type: The key prefix to use
+        :param offset: The address offset to start at
+        :param count: The number of bits to read
+        :returns: The resulting values
+        """
+        return self._cached(type, offset, count, lambda cache: [
+            cache[index] for index in range(offset, offset + count)
+            if index in cache])
+
+    def _cached_set(self, type, offset, values, update):
+        """
+        :param type: The key prefix to use
+        :param offset: The address offset to start at
+        :param values: The values to set
+        :param update: Only set the registers that already exist
+        """
+        def write(cache):
+            for index, value in enumerate(values, offset):
+                if not update or index in cache:
+                    cache[index] = value
+                    self._dirty[(type, index)] = value
+
+        if update:
+            self._cached(type, offset, len(values), write)
+        else:
+            with self._lock:
+                write(self._cache.setdefault(type, {}))
+
+    def _flush_loop(self):
+        """ Writes the cached changes every flush_interval seconds """
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
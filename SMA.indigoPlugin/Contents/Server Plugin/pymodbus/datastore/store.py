@@ -46,8 +46,18 @@ or a range read to fail.
 I have both methods implemented, and leave it up to the user to change
 based on their preference.
 """
+import sys
+from array import array
+from bisect import bisect_right
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # python2
+    from collections import MutableMapping
+
 from pymodbus.exceptions import NotImplementedException, ParameterException
-from pymodbus.compat import iteritems, iterkeys, itervalues, get_next
+from pymodbus.compat import iteritems, iterkeys, get_next
+from pymodbus.compat import IS_PYTHON3
+from pymodbus.utilities import pack_bitstring, unpack_bitstring
 
 #---------------------------------------------------------------------------#
 # Logging
@@ -56,6 +66,143 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
+#---------------------------------------------------------------------------#
+# Helpers
+#---------------------------------------------------------------------------#
+def _to_registers(values):
+    ''' Converts values to an array('H') of registers
+
+    :param values: The values to convert
+    :returns: The array, or the values as a list if they aren't all
+        unsigned 16 bit integers
+    '''
+    if isinstance(values, array) and values.typecode == 'H':
+        return values
+    try:
+        return array('H', values)
+    except (TypeError, OverflowError, ValueError):
+        return list(values)
+
+
+class _BitValues(object):
+    ''' A list-like view of the bits of a ModbusSequentialBitDataBlock
+
+    Reading it unpacks the bits, and setting an item or a slice writes
+    through to the packed bits of the block.
+    '''
+
+    __slots__ = ('_block',)
+
+    def __init__(self, block):
+        ''' Initializes the view
+
+        :param block: The block whose bits to view
+        '''
+        self._block = block
+
+    def __len__(self):
+        return self._block._count
+
+    def __iter__(self):
+        return iter(unpack_bitstring(self._block._bits)[:self._block._count])
+
+    def _index(self, index):
+        ''' Checks an index and makes it positive
+
+        :param index: The index of a bit
+        :returns: The positive index
+        '''
+        count = self._block._count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("bit index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        index = self._index(index)
+        return bool(self._block._bits[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, value):
+        block = self._block
+        if isinstance(index, slice):
+            indices = range(*index.indices(block._count))
+            values = list(value)
+            if len(values) != len(indices):
+                raise ValueError("the bits of a data block can't be "
+                                 "resized through a slice")
+            for index, value in zip(indices, values):
+                block.setValues(block.address + index, [value])
+        else:
+            block.setValues(block.address + self._index(index), [value])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, _BitValues)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class _SparseValues(MutableMapping):
+    ''' A dict-like view of the values of a ModbusSparseDataBlock
+
+    Reading it looks the addresses up in the ranges of the block, and
+    setting or deleting an address writes through to the block.
+    '''
+
+    __slots__ = ('_block',)
+
+    def __init__(self, block):
+        ''' Initializes the view
+
+        :param block: The block whose values to view
+        '''
+        self._block = block
+
+    def __len__(self):
+        return sum(len(values) for values in self._block._ranges)
+
+    def __iter__(self):
+        return (address for address, _ in self._block)
+
+    def __contains__(self, address):
+        return self._block._find(address) >= 0
+
+    def __getitem__(self, address):
+        block = self._block
+        index = block._find(address)
+        if index < 0:
+            raise KeyError(address)
+        return block._ranges[index][address - block._starts[index]]
+
+    def __setitem__(self, address, value):
+        self._block.setValues(address, [value])
+
+    def __delitem__(self, address):
+        block = self._block
+        index = block._find(address)
+        if index < 0:
+            raise KeyError(address)
+        start, values = block._starts[index], block._ranges[index]
+        offset = address - start
+        pieces = [(start, values[:offset]),
+                  (address + 1, values[offset + 1:])]
+        pieces = [piece for piece in pieces if len(piece[1])]
+        block._starts[index:index + 1] = [piece[0] for piece in pieces]
+        block._ranges[index:index + 1] = [piece[1] for piece in pieces]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
 #---------------------------------------------------------------------------#
 # Datablock Storage
 #---------------------------------------------------------------------------#
@@ -132,7 +279,13 @@ class BaseModbusDataBlock(object):
 
 
 class ModbusSequentialDataBlock(BaseModbusDataBlock):
-    ''' Creates a sequential modbus datastore '''
+    ''' Creates a sequential modbus datastore
+
+    Register values are kept in an array('H'), two bytes per register,
+    and on python3 `getValues` returns a memoryview of it instead of a
+    copy, which the register responses serialize directly. Values that
+    don't fit an unsigned 16 bit register are kept in a plain list.
+    '''
 
     def __init__(self, address, values):
         ''' Initializes the datastore
@@ -141,11 +294,14 @@ class ModbusSequentialDataBlock(BaseModbusDataBlock):
         :param values: Either a list or a dictionary of values
         '''
         self.address = address
-        if hasattr(values, '__iter__'):
-            self.values = list(values)
+        if not hasattr(values, '__iter__'):
+            values = [values]
+        elif isinstance(values, array):
+            values = array(values.typecode, values)
         else:
-            self.values = [values]
-        self.default_value = self.values[0].__class__()
+            values = list(values)
+        self.default_value = values[0].__class__()
+        self.values = _to_registers(values)
 
     @classmethod
     def create(klass):
@@ -154,7 +310,14 @@ class ModbusSequentialDataBlock(BaseModbusDataBlock):
 
         :returns: An initialized datastore
         '''
-        return klass(0x00, [0x00] * 65536)
+        return klass(0x00, array('H', [0x00]) * 65536)
+
+    def reset(self):
+        ''' Resets the datastore to the initialized default value '''
+        if isinstance(self.values, array):
+            self.values = array('H', [self.default_value]) * len(self.values)
+        else:
+            super(ModbusSequentialDataBlock, self).reset()
 
     def validate(self, address, count=1):
         ''' Checks to see if the request is in range
@@ -172,25 +335,150 @@ class ModbusSequentialDataBlock(BaseModbusDataBlock):
 
         :param address: The starting address
         :param count: The number of values to retrieve
-        :returns: The requested values from a:a+c
+        :returns: The requested values from a:a+c (a memoryview of the
+            registers on python3)
         '''
         start = address - self.address
+        if IS_PYTHON3 and isinstance(self.values, array):
+            return memoryview(self.values)[start:start + count]
         return self.values[start:start + count]
 
     def setValues(self, address, values):
         ''' Sets the requested values of the datastore
 
         :param address: The starting address
-        :param values: The new values to be set
+        :param values: The new values to be set, or the registers as
+            big endian bytes
         '''
-        if not isinstance(values, list):
-            values = [values]
         start = address - self.address
+        if isinstance(self.values, array):
+            if isinstance(values, (bytes, bytearray)) and IS_PYTHON3:
+                registers = array('H')
+                registers.frombytes(values)
+                if sys.byteorder == 'little':
+                    registers.byteswap()
+                values = registers
+            elif not isinstance(values, (list, tuple, array, memoryview)):
+                values = [values]
+            registers = _to_registers(values)
+            if isinstance(registers, array):
+                end = start + len(registers)
+                try:
+                    self.values[start:end] = registers
+                except BufferError:
+                    # Growing the array while a memoryview returned by
+                    # getValues is alive, so grow a copy instead
+                    self.values = array('H', self.values)
+                    self.values[start:end] = registers
+                return
+            self.values = list(self.values)
+        elif not isinstance(values, (list, array)):
+            values = [values]
         self.values[start:start + len(values)] = values
 
 
+class ModbusSequentialBitDataBlock(ModbusSequentialDataBlock):
+    ''' Creates a sequential modbus datastore for coils and discrete inputs
+
+    The bits are packed eight per byte, in the order they have on the
+    wire (the first bit is the least significant bit of the first byte),
+    which takes 64 times less memory than a list of booleans.
+    '''
+
+    def __init__(self, address, values):
+        ''' Initializes the datastore
+
+        :param address: The starting address of the datastore
+        :param values: Either a list or a dictionary of values
+        '''
+        self.address = address
+        self.default_value = False
+        self.values = values if hasattr(values, '__iter__') else [values]
+
+    @property
+    def values(self):
+        ''' The bits of the datastore, as a list-like view of booleans
+        that writes through to the block '''
+        return _BitValues(self)
+
+    @values.setter
+    def values(self, values):
+        values = list(values)
+        self._count = len(values)
+        self._bits = bytearray(pack_bitstring(values))
+
+    @classmethod
+    def create(klass):
+        ''' Factory method to create a datastore with the
+        full address space initialized to 0x00
+
+        :returns: An initialized datastore
+        '''
+        return klass(0x00, [False] * 65536)
+
+    def reset(self):
+        ''' Resets the datastore to the initialized default value '''
+        self._bits = bytearray(len(self._bits))
+
+    def validate(self, address, count=1):
+        ''' Checks to see if the request is in range
+
+        :param address: The starting address
+        :param count: The number of values to test for
+        :returns: True if the request in within range, False otherwise
+        '''
+        return (self.address <= address and
+                self.address + self._count >= address + count)
+
+    def getValues(self, address, count=1):
+        ''' Returns the requested values of the datastore
+
+        :param address: The starting address
+        :param count: The number of values to retrieve
+        :returns: The requested values from a:a+c
+        '''
+        start = address - self.address
+        count = min(count, self._count - start)
+        shift = start & 7
+        bits = unpack_bitstring(self._bits[start >> 3:(start + count + 7) >> 3])
+        return bits[shift:shift + count]
+
+    def setValues(self, address, values):
+        ''' Sets the requested values of the datastore
+
+        :param address: The starting address
+        :param values: The new values to be set
+        '''
+        if not isinstance(values, (list, tuple)):
+            values = list(values) if hasattr(values, '__iter__') else [values]
+        start = address - self.address
+        end = start + len(values)
+        if end > self._count:
+            self._bits.extend(bytearray(((end + 7) >> 3) - len(self._bits)))
+            self._count = end
+        bits = self._bits
+        if not start & 7:
+            # Whole bytes are packed at once
+            aligned = len(values) & ~7
+            bits[start >> 3:(start + aligned) >> 3] = pack_bitstring(
+                values[:aligned])
+            values = values[aligned:]
+            start += aligned
+        for index, value in enumerate(values, start):
+            if value:
+                bits[index >> 3] |= 1 << (index & 7)
+            else:
+                bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+
+
 class ModbusSparseDataBlock(BaseModbusDataBlock):
-    ''' Creates a sparse modbus datastore '''
+    ''' Creates a sparse modbus datastore
+
+    The populated addresses are kept as a sorted list of contiguous
+    ranges, each backed by an array('H') (or a list for values that don't
+    fit a register). Adjacent ranges are merged as they are written, so
+    validating a request is a bisect and reading it is a slice.
+    '''
 
     def __init__(self, values):
         ''' Initializes the datastore
@@ -201,13 +489,36 @@ class ModbusSparseDataBlock(BaseModbusDataBlock):
         :param values: Either a list or a dictionary of values
         '''
         if isinstance(values, dict):
-            self.values = values
+            if not values:
+                raise ParameterException("Values for datastore must not "
+                                         "be empty")
+            self.address = get_next(iterkeys(values))
+            self.default_value = values[self.address].__class__()
         elif hasattr(values, '__iter__'):
-            self.values = dict(enumerate(values))
+            values = list(values)
+            self.address = 0
+            self.default_value = values[0].__class__()
         else: raise ParameterException(
             "Values for datastore must be a list or dictionary")
-        self.default_value = get_next(itervalues(self.values)).__class__()
-        self.address = get_next(iterkeys(self.values))
+        self.values = values
+
+    @property
+    def values(self):
+        ''' The values of the datastore, as a dict-like view of address
+        to value that writes through to the block '''
+        return _SparseValues(self)
+
+    @values.setter
+    def values(self, values):
+        if isinstance(values, MutableMapping):
+            # A copy, as the values may be a view of this very block
+            values = dict(values.items())
+        self._starts = []
+        self._ranges = []
+        if isinstance(values, dict):
+            self.setValues(0, values)
+        else:
+            self.setValues(0, list(values))
 
     @classmethod
     def create(klass):
@@ -216,7 +527,24 @@ class ModbusSparseDataBlock(BaseModbusDataBlock):
 
         :returns: An initialized datastore
         '''
-        return klass([0x00] * 65536)
+        return klass(array('H', [0x00]) * 65536)
+
+    def reset(self):
+        ''' Resets the datastore to the initialized default value '''
+        self._ranges = [_to_registers([self.default_value] * len(values))
+                        for values in self._ranges]
+
+    def _find(self, address):
+        ''' Finds the range holding an address
+
+        :param address: The address to look for
+        :returns: The index of the range, or -1 if the address isn't set
+        '''
+        index = bisect_right(self._starts, address) - 1
+        if index >= 0 and (address - self._starts[index] <
+                           len(self._ranges[index])):
+            return index
+        return -1
 
     def validate(self, address, count=1):
         ''' Checks to see if the request is in range
@@ -227,17 +555,35 @@ class ModbusSparseDataBlock(BaseModbusDataBlock):
         '''
         if count == 0:
             return False
-        handle = set(range(address, address + count))
-        return handle.issubset(set(iterkeys(self.values)))
+        index = self._find(address)
+        return index >= 0 and (address + count <= self._starts[index] +
+                               len(self._ranges[index]))
 
     def getValues(self, address, count=1):
         ''' Returns the requested values of the datastore
 
         :param address: The starting address
         :param count: The number of values to retrieve
-        :returns: The requested values from a:a+c
+        :returns: The requested values from a:a+c (a memoryview of the
+            registers on python3)
         '''
-        return [self.values[i] for i in range(address, address + count)]
+        index = self._find(address)
+        if index < 0 or (address + count > self._starts[index] +
+                         len(self._ranges[index])):
+            # Not a single range, fail on the first missing address
+            values = []
+            for current in range(address, address + count):
+                index = self._find(current)
+                if index < 0:
+                    raise KeyError(current)
+                values.append(
+                    self._ranges[index][current - self._starts[index]])
+            return values
+        values = self._ranges[index]
+        start = address - self._starts[index]
+        if IS_PYTHON3 and isinstance(values, array):
+            return memoryview(values)[start:start + count]
+        return values[start:start + count]
 
     def setValues(self, address, values):
         ''' Sets the requested values of the datastore
@@ -246,10 +592,79 @@ class ModbusSparseDataBlock(BaseModbusDataBlock):
         :param values: The new values to be set
         '''
         if isinstance(values, dict):
-            for idx, val in iteritems(values):
-                self.values[idx] = val
+            # Write each run of consecutive addresses at once
+            run_start, run = None, []
+            for idx in sorted(values):
+                if run and idx != run_start + len(run):
+                    self._set_run(run_start, run)
+                    run = []
+                if not run:
+                    run_start = idx
+                run.append(values[idx])
+            if run:
+                self._set_run(run_start, run)
         else:
-            if not isinstance(values, list):
+            if not isinstance(values, (list, array)):
                 values = [values]
-            for idx, val in enumerate(values):
-                self.values[address + idx] = val
+            if len(values):
+                self._set_run(address, values)
+
+    def _set_run(self, address, values):
+        ''' Writes values to consecutive addresses, merging the ranges
+        they overlap or touch
+
+        :param address: The first address to write
+        :param values: The values to write
+        '''
+        starts, ranges = self._starts, self._ranges
+        end = address + len(values)
+        index = self._find(address)
+        if index >= 0 and end <= starts[index] + len(ranges[index]):
+            target = ranges[index]
+            offset = address - starts[index]
+            if isinstance(target, array):
+                registers = _to_registers(values)
+                if isinstance(registers, array):
+                    target[offset:offset + len(values)] = registers
+                    return
+                target = ranges[index] = list(target)
+            target[offset:offset + len(values)] = list(values)
+            return
+
+        # Ranges starting before the run and reaching it, then every range
+        # starting inside it or right after it
+        first = bisect_right(starts, address) - 1
+        if first < 0 or starts[first] + len(ranges[first]) < address:
+            first += 1
+        last = bisect_right(starts, end)
+        pieces = [values]
+        start = address
+        if first < last and starts[first] < address:
+            start = starts[first]
+            pieces.insert(0, ranges[first][:address - start])
+        if first < last:
+            tail = ranges[last - 1]
+            tail_end = starts[last - 1] + len(tail)
+            if tail_end > end:
+                pieces.append(tail[end - starts[last - 1]:])
+        merged = [_to_registers(piece) for piece in pieces]
+        if all(isinstance(piece, array) for piece in merged):
+            merged_values = array('H')
+            for piece in merged:
+                merged_values.extend(piece)
+        else:
+            merged_values = []
+            for piece in merged:
+                merged_values.extend(piece)
+        starts[first:last] = [start]
+        ranges[first:last] = [merged_values]
+
+    def __iter__(self):
+        ''' Iterater over the data block data
+
+        :returns: An iterator of the (address, value) pairs, in address
+            order
+        '''
+        for start, values in zip(self._starts, self._ranges):
+            for address, value in enumerate(values, start):
+                yield address, value
@@ -8,7 +8,9 @@ add them to the respective function lookup table (order doesn't matter, but
 it does help keep things organized).
 
 Regardless of how many functions are added to the lookup, O(1) behavior is
-kept as a result of a pre-computed lookup dictionary.
+kept as a result of a pre-computed lookup table. The tables are built once
+per decoder class and shared (read only) by all of its instances; a decoder
+only gets tables of its own when a custom function is registered on it.
 """
 
 from pymodbus.pdu import IllegalFunctionRequest
@@ -27,6 +29,11 @@ from pymodbus.register_read_message import *
 from pymodbus.register_write_message import *
 from pymodbus.compat import byte2int
 
+try:
+    from types import MappingProxyType
+except ImportError:  # python 2
+    MappingProxyType = dict
+
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -35,6 +42,27 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
+def _build_lookup(function_table, sub_function_table):
+    """ Builds the read only lookup tables of a decoder
+
+    :param function_table: The message classes, by function code
+    :param sub_function_table: The message classes, by sub function code
+    :returns: A tuple of the 256 entry function code table (None for the
+              unknown codes) and the sub function code tables
+    """
+    lookup = [None] * 256
+    for function in function_table:
+        lookup[function.function_code] = function
+
+    sub_lookup = {}
+    for function in sub_function_table:
+        sub_lookup.setdefault(function.function_code, {})[
+            function.sub_function_code] = function
+    sub_lookup = MappingProxyType(dict(
+        (code, MappingProxyType(table)) for code, table in sub_lookup.items()))
+    return tuple(lookup), sub_lookup
+
+
 # --------------------------------------------------------------------------- #
 # Server Decoder
 # --------------------------------------------------------------------------- #
@@ -84,15 +112,14 @@ class ServerDecoder(IModbusDecoder):
             GetClearModbusPlusRequest,
             ReadDeviceInformationRequest,
     ]
+    __lookup, __sub_lookup = _build_lookup(__function_table,
+                                           __sub_function_table)
 
     def __init__(self):
-        """ Initializes the client lookup tables
+        """ Initializes the server decoder
+
+        The lookup tables are shared by all the instances, so this is free
         """
-        functions = set(f.function_code for f in self.__function_table)
-        self.__lookup = dict([(f.function_code, f) for f in self.__function_table])
-        self.__sub_lookup = dict((f, {}) for f in functions)
-        for f in self.__sub_function_table:
-            self.__sub_lookup[f.function_code][f.sub_function_code] = f
 
     def decode(self, message):
         """ Wrapper to decode a request packet
@@ -112,7 +139,9 @@ class ServerDecoder(IModbusDecoder):
         :param function_code: The function code specified in a frame.
         :returns: The class of the PDU that has a matching `function_code`.
         """
-        return self.__lookup.get(function_code, ExceptionResponse)
+        if 0 <= function_code < 256:
+            return self.__lookup[function_code] or ExceptionResponse
+        return ExceptionResponse
 
     def _helper(self, data):
         """
@@ -124,21 +153,19 @@ class ServerDecoder(IModbusDecoder):
         :returns: The decoded request or illegal function request object
         """
         function_code = byte2int(data[0])
-        request = self.__lookup.get(function_code, lambda: None)()
-        if not request:
-            _logger.debug("Factory Request[%d]" % function_code)
+        request_class = self.__lookup[function_code]
+        if request_class is None:
+            _logger.debug("Factory Request[%d]", function_code)
             request = IllegalFunctionRequest(function_code)
         else:
-            fc_string = "%s: %s" % (
-                str(self.__lookup[function_code]).split('.')[-1].rstrip(
-                    "'>"),
-                function_code
-            )
-            _logger.debug("Factory Request[%s]" % fc_string)
+            _logger.debug("Factory Request[%s: %d]", request_class.__name__,
+                          function_code)
+            request = request_class()
         request.decode(data[1:])
 
-        if hasattr(request, 'sub_function_code'):
-            lookup = self.__sub_lookup.get(request.function_code, {})
+        # Only the diagnostic and MEI requests have sub functions
+        lookup = self.__sub_lookup.get(function_code)
+        if lookup is not None and hasattr(request, 'sub_function_code'):
             subtype = lookup.get(request.sub_function_code, None)
             if subtype: request.__class__ = subtype
 
@@ -157,12 +184,14 @@ class ServerDecoder(IModbusDecoder):
                                            "".format(
                 function.__class__.__name__
             ))
-        self.__lookup[function.function_code] = function
+        # Rebuild the tables for this instance only, the class tables are
+        # shared by every decoder
+        self.__function_table = self.__function_table + [function]
         if hasattr(function, "sub_function_code"):
-            if function.function_code not in self.__sub_lookup:
-                self.__sub_lookup[function.function_code] = dict()
-            self.__sub_lookup[function.function_code][
-                function.sub_function_code] = function
+            self.__sub_function_table = (self.__sub_function_table
+                                         + [function])
+        self.__lookup, self.__sub_lookup = _build_lookup(
+            self.__function_table, self.__sub_function_table)
 
 
 # --------------------------------------------------------------------------- #
@@ -214,16 +243,14 @@ class ClientDecoder(IModbusDecoder):
             GetClearModbusPlusResponse,
             ReadDeviceInformationResponse,
     ]
+    __lookup, __sub_lookup = _build_lookup(__function_table,
+                                           __sub_function_table)
 
     def __init__(self):
-        """ Initializes the client lookup tables
+        """ Initializes the client decoder
+
+        The lookup tables are shared by all the instances, so this is free
         """
-        functions = set(f.function_code for f in self.__function_table)
-        self.__lookup = dict([(f.function_code, f)
-                              for f in self.__function_table])
-        self.__sub_lookup = dict((f, {}) for f in functions)
-        for f in self.__sub_function_table:
-            self.__sub_lookup[f.function_code][f.sub_function_code] = f
 
     def lookupPduClass(self, function_code):
         """ Use `function_code` to determine the class of the PDU.
@@ -231,7 +258,9 @@ class ClientDecoder(IModbusDecoder):
         :param function_code: The function code specified in a frame.
         :returns: The class of the PDU that has a matching `function_code`.
         """
-        return self.__lookup.get(function_code, ExceptionResponse)
+        if 0 <= function_code < 256:
+            return self.__lookup[function_code] or ExceptionResponse
+        return ExceptionResponse
 
     def decode(self, message):
         """ Wrapper to decode a response packet
@@ -257,23 +286,24 @@ class ClientDecoder(IModbusDecoder):
         :param data: The response packet to decode
         :returns: The decoded request or an exception response object
         """
-        fc_string = function_code = byte2int(data[0])
-        if function_code in self.__lookup:
-            fc_string = "%s: %s" % (
-                str(self.__lookup[function_code]).split('.')[-1].rstrip("'>"),
-                function_code
-            )
-        _logger.debug("Factory Response[%s]" % fc_string)
-        response = self.__lookup.get(function_code, lambda: None)()
+        function_code = byte2int(data[0])
         if function_code > 0x80:
+            _logger.debug("Factory Response[%d]", function_code)
             code = function_code & 0x7f  # strip error portion
             response = ExceptionResponse(code, ecode.IllegalFunction)
-        if not response:
-            raise ModbusException("Unknown response %d" % function_code)
+        else:
+            response_class = self.__lookup[function_code]
+            if response_class is None:
+                _logger.debug("Factory Response[%d]", function_code)
+                raise ModbusException("Unknown response %d" % function_code)
+            _logger.debug("Factory Response[%s: %d]", response_class.__name__,
+                          function_code)
+            response = response_class()
         response.decode(data[1:])
 
-        if hasattr(response, 'sub_function_code'):
-            lookup = self.__sub_lookup.get(response.function_code, {})
+        # Only the diagnostic and MEI responses have sub functions
+        lookup = self.__sub_lookup.get(response.function_code)
+        if lookup is not None and hasattr(response, 'sub_function_code'):
             subtype = lookup.get(response.sub_function_code, None)
             if subtype: response.__class__ = subtype
 
@@ -294,12 +324,14 @@ class ClientDecoder(IModbusDecoder):
                                            "".format(
                 function.__class__.__name__
             ))
-        self.__lookup[function.function_code] = function
+        # Rebuild the tables for this instance only, the class tables are
+        # shared by every decoder
+        self.__function_table = self.__function_table + [function]
         if hasattr(function, "sub_function_code"):
-            if function.function_code not in self.__sub_lookup:
-                self.__sub_lookup[function.function_code] = dict()
-            self.__sub_lookup[function.function_code][
-                function.sub_function_code] = function
+            self.__sub_function_table = (self.__sub_function_table
+                                         + [function])
+        self.__lookup, self.__sub_lookup = _build_lookup(
+            self.__function_table, self.__sub_function_table)
 
 
 # --------------------------------------------------------------------------- #
@@ -11,6 +11,127 @@ SOCKET_FRAME_HEADER = BYTE_ORDER + 'HHH' + FRAME_HEADER
 # Function Code
 TLS_FRAME_HEADER = BYTE_ORDER + 'B'
 
+
+class ModbusFrameBuffer(object):
+    """
+    Receive buffer shared by the framers
+
+    Incoming data is appended to a growable bytearray and consumed frames
+    only move a read cursor forward, so a stream carrying many frames is
+    not copied again every time a frame is added or removed. The consumed
+    bytes are dropped once the cursor has moved past `compact_threshold`
+    bytes and past half of the underlying storage, which keeps the total
+    work linear in the number of bytes received.
+
+    Indexing, slicing and `find` are relative to the read cursor and
+    behave like they would on a bytes object holding the unread data.
+    Slices are copies, and so are the frames the framers hand to the
+    decoder: decoded messages keep views of their frame (e.g. the
+    register `payload`), and a view of the storage would both stop it
+    from being resized and change under the message once it is reused.
+    """
+
+    compact_threshold = 4096
+
+    def __init__(self):
+        """ Initializes an empty buffer """
+        self._data = bytearray()
+        self._start = 0
+
+    def append(self, data):
+        """ Adds received data at the end of the buffer
+
+        :param data: The received data
+        """
+        self._data += data
+
+    def advance(self, count):
+        """ Consumes bytes from the front of the buffer
+
+        :param count: The number of bytes to consume
+        """
+        self._start += count
+        if self._start >= len(self._data):
+            self.clear()
+        elif (self._start >= self.compact_threshold
+              and self._start * 2 >= len(self._data)):
+            del self._data[:self._start]
+            self._start = 0
+
+    def clear(self):
+        """ Drops all the buffered data """
+        del self._data[:]
+        self._start = 0
+
+    def find(self, sub, start=0):
+        """ Returns the lowest index of `sub` in the unread data
+
+        :param sub: The bytes to look for
+        :param start: The index to start looking at
+        :returns: The index found or -1
+        """
+        index = self._data.find(sub, self._start + start)
+        return index - self._start if index != -1 else -1
+
+    def unpack_from(self, fmt, offset=0):
+        """ Unpacks values straight from the buffer, without copying
+
+        :param fmt: The struct format (or a compiled `struct.Struct`)
+        :param offset: The offset in the unread data to start at
+        :returns: The tuple of unpacked values
+        """
+        if isinstance(fmt, struct.Struct):
+            return fmt.unpack_from(self._data, self._start + offset)
+        return struct.unpack_from(fmt, self._data, self._start + offset)
+
+    def view(self, start=0, end=None):
+        """ Returns a memoryview over part of the unread data
+
+        The buffer cannot grow or shrink while the view is alive, so it
+        must be released before data is added or consumed.
+
+        :param start: The index to start at
+        :param end: The index to stop at (defaults to the end of the data)
+        :returns: A memoryview of the data
+        """
+        end = len(self) if end is None else min(end, len(self))
+        return memoryview(self._data)[self._start + start:self._start + end]
+
+    def tobytes(self):
+        """ Returns a copy of the unread data
+
+        :returns: The unread data as bytes
+        """
+        return bytes(self._data[self._start:])
+
+    def __len__(self):
+        return len(self._data) - self._start
+
+    def __bool__(self):
+        return len(self._data) > self._start
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return iter(self.tobytes())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.tobytes()[index]
+            if stop <= start:
+                return b''
+            return bytes(self._data[self._start + start:self._start + stop])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("frame buffer index out of range")
+        position = self._start + index
+        # bytes() keeps the item type of a bytes object (str on python 2)
+        return bytes(self._data[position:position + 1])[0]
+
+
 class ModbusFramer(IModbusFramer):
     """
     Base Framer class
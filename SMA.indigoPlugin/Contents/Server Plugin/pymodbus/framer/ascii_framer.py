@@ -2,8 +2,9 @@ import struct
 from binascii import b2a_hex, a2b_hex
 
 from pymodbus.exceptions import ModbusIOException
-from pymodbus.utilities import checkLRC, computeLRC
-from pymodbus.framer import ModbusFramer, FRAME_HEADER, BYTE_ORDER
+from pymodbus.utilities import checkLRC, computeLRC, frame_history
+from pymodbus.framer import ModbusFramer, ModbusFrameBuffer
+from pymodbus.framer import FRAME_HEADER, BYTE_ORDER
 
 
 ASCII_FRAME_HEADER = BYTE_ORDER + FRAME_HEADER
@@ -39,7 +40,7 @@ class ModbusAsciiFramer(ModbusFramer):
 
         :param decoder: The decoder implementation to use
         """
-        self._buffer = b''
+        self._buffer = ModbusFrameBuffer()
         self._header = {'lrc': '0000', 'len': 0, 'uid': 0x00}
         self._hsize = 0x02
         self._start = b':'
@@ -66,7 +67,7 @@ class ModbusAsciiFramer(ModbusFramer):
         if start == -1:
             return False
         if start > 0:  # go ahead and skip old bad data
-            self._buffer = self._buffer[start:]
+            self._buffer.advance(start)
             start = 0
 
         end = self._buffer.find(self._end)
@@ -84,7 +85,7 @@ class ModbusAsciiFramer(ModbusFramer):
         it or determined that it contains an error. It also has to reset the
         current frame header handle
         """
-        self._buffer = self._buffer[self._header['len'] + 2:]
+        self._buffer.advance(self._header['len'] + 2)
         self._header = {'lrc': '0000', 'len': 0, 'uid': 0x00}
 
     def isFrameReady(self):
@@ -103,7 +104,7 @@ class ModbusAsciiFramer(ModbusFramer):
 
         :param message: The most recent packet
         """
-        self._buffer += message
+        self._buffer.append(message)
 
     def getFrame(self):
         """ Get the next frame from the buffer
@@ -125,7 +126,7 @@ class ModbusAsciiFramer(ModbusFramer):
         end of the message (python just doesn't have the resolution to
         check for millisecond delays).
         """
-        self._buffer = b''
+        self._buffer.clear()
         self._header = {'lrc': '0000', 'len': 0, 'uid': 0x00}
 
     def populateResult(self, result):
@@ -164,6 +165,8 @@ class ModbusAsciiFramer(ModbusFramer):
         if not isinstance(unit, (list, tuple)):
             unit = [unit]
         single = kwargs.get('single', False)
+        if frame_history.enabled:
+            frame_history.record('recv', data)
         self.addToFrame(data)
         while self.isFrameReady():
             if self.checkFrame():
@@ -176,8 +179,8 @@ class ModbusAsciiFramer(ModbusFramer):
                     self.advanceFrame()
                     callback(result)  # defer this
                 else:
-                    _logger.error("Not a valid unit id - {}, "
-                                  "ignoring!!".format(self._header['uid']))
+                    _logger.error("Not a valid unit id - %s, "
+                                  "ignoring!!", self._header['uid'])
                     self.resetFrame()
             else:
                 break
@@ -201,7 +204,10 @@ class ModbusAsciiFramer(ModbusFramer):
         packet.extend(b2a_hex(encoded))
         packet.extend(('%02x' % checksum).encode())
         packet.extend(self._end)
-        return bytes(packet).upper()
+        packet = bytes(packet).upper()
+        if frame_history.enabled:
+            frame_history.record('send', packet)
+        return packet
 
 
 # __END__
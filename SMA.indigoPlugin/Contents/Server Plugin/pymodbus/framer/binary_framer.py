@@ -1,7 +1,8 @@
 import struct
 from pymodbus.exceptions import ModbusIOException
-from pymodbus.utilities import checkCRC, computeCRC
-from pymodbus.framer import ModbusFramer, FRAME_HEADER, BYTE_ORDER
+from pymodbus.utilities import checkCRC, computeCRC, frame_history
+from pymodbus.framer import ModbusFramer, ModbusFrameBuffer
+from pymodbus.framer import FRAME_HEADER, BYTE_ORDER
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -46,7 +47,7 @@ class ModbusBinaryFramer(ModbusFramer):
 
         :param decoder: The decoder implementation to use
         """
-        self._buffer = b''
+        self._buffer = ModbusFrameBuffer()
         self._header = {'crc': 0x0000, 'len': 0, 'uid': 0x00}
         self._hsize = 0x01
         self._start = b'\x7b'  # {
@@ -74,15 +75,16 @@ class ModbusBinaryFramer(ModbusFramer):
         if start == -1:
             return False
         if start > 0:  # go ahead and skip old bad data
-            self._buffer = self._buffer[start:]
+            self._buffer.advance(start)
+            start = 0
 
         end = self._buffer.find(self._end)
         if end != -1:
             self._header['len'] = end
-            self._header['uid'] = struct.unpack('>B', self._buffer[1:2])[0]
-            self._header['crc'] = struct.unpack('>H', self._buffer[end - 2:end])[0]
-            data = self._buffer[start + 1:end - 2]
-            return checkCRC(data, self._header['crc'])
+            self._header['uid'], = self._buffer.unpack_from('>B', 1)
+            self._header['crc'], = self._buffer.unpack_from('>H', end - 2)
+            return checkCRC(self._buffer.view(start + 1, end - 2),
+                            self._header['crc'])
         return False
 
     def advanceFrame(self):
@@ -91,7 +93,7 @@ class ModbusBinaryFramer(ModbusFramer):
         it or determined that it contains an error. It also has to reset the
         current frame header handle
         """
-        self._buffer = self._buffer[self._header['len'] + 2:]
+        self._buffer.advance(self._header['len'] + 2)
         self._header = {'crc':0x0000, 'len':0, 'uid':0x00}
 
     def isFrameReady(self):
@@ -110,7 +112,7 @@ class ModbusBinaryFramer(ModbusFramer):
 
         :param message: The most recent packet
         """
-        self._buffer += message
+        self._buffer.append(message)
 
     def getFrame(self):
         """ Get the next frame from the buffer
@@ -157,6 +159,8 @@ class ModbusBinaryFramer(ModbusFramer):
         :param single: True or False (If True, ignore unit address validation)
 
         """
+        if frame_history.enabled:
+            frame_history.record('recv', data)
         self.addToFrame(data)
         if not isinstance(unit, (list, tuple)):
             unit = [unit]
@@ -171,8 +175,8 @@ class ModbusBinaryFramer(ModbusFramer):
                     self.advanceFrame()
                     callback(result)  # defer or push to a thread?
                 else:
-                    _logger.debug("Not a valid unit id - {}, "
-                                  "ignoring!!".format(self._header['uid']))
+                    _logger.debug("Not a valid unit id - %s, "
+                                  "ignoring!!", self._header['uid'])
                     self.resetFrame()
                     break
 
@@ -193,6 +197,8 @@ class ModbusBinaryFramer(ModbusFramer):
                              message.function_code) + data
         packet += struct.pack(">H", computeCRC(packet))
         packet = self._start + packet + self._end
+        if frame_history.enabled:
+            frame_history.record('send', packet)
         return packet
 
     def _preflight(self, data):
@@ -220,7 +226,7 @@ class ModbusBinaryFramer(ModbusFramer):
         end of the message (python just doesn't have the resolution to
         check for millisecond delays).
         """
-        self._buffer = b''
+        self._buffer.clear()
         self._header = {'crc': 0x0000, 'len': 0, 'uid': 0x00}
 
 
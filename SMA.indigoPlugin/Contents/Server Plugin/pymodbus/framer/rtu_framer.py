@@ -4,9 +4,11 @@ import time
 from pymodbus.exceptions import ModbusIOException
 from pymodbus.exceptions import InvalidMessageReceivedException
 from pymodbus.utilities import checkCRC, computeCRC
-from pymodbus.utilities import hexlify_packets, ModbusTransactionState
+from pymodbus.utilities import LazyHexlify, ModbusTransactionState
+from pymodbus.utilities import frame_history
 from pymodbus.compat import byte2int
-from pymodbus.framer import ModbusFramer, FRAME_HEADER, BYTE_ORDER
+from pymodbus.framer import ModbusFramer, ModbusFrameBuffer
+from pymodbus.framer import FRAME_HEADER, BYTE_ORDER
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -59,7 +61,7 @@ class ModbusRtuFramer(ModbusFramer):
 
         :param decoder: The decoder factory implementation to use
         """
-        self._buffer = b''
+        self._buffer = ModbusFrameBuffer()
         self._header = {'uid': 0x00, 'len': 0, 'crc': '0000'}
         self._hsize = 0x01
         self._end = b'\x0d\x0a'
@@ -88,10 +90,8 @@ class ModbusRtuFramer(ModbusFramer):
         try:
             self.populateHeader()
             frame_size = self._header['len']
-            data = self._buffer[:frame_size - 2]
-            crc = self._buffer[frame_size - 2:frame_size]
-            crc_val = (byte2int(crc[0]) << 8) + byte2int(crc[1])
-            if checkCRC(data, crc_val):
+            crc_val, = self._buffer.unpack_from('>H', frame_size - 2)
+            if checkCRC(self._buffer.view(0, frame_size - 2), crc_val):
                 return True
             else:
                 _logger.debug("CRC invalid, discarding header!!")
@@ -108,7 +108,7 @@ class ModbusRtuFramer(ModbusFramer):
         current frame header handle
         """
         try:
-            self._buffer = self._buffer[self._header['len']:]
+            self._buffer.advance(self._header['len'])
         except KeyError:
             #   Error response, no header len found
             self.resetFrame()
@@ -125,8 +125,8 @@ class ModbusRtuFramer(ModbusFramer):
         check for millisecond delays).
         """
         _logger.debug("Resetting frame - Current Frame in "
-                      "buffer - {}".format(hexlify_packets(self._buffer)))
-        self._buffer = b''
+                      "buffer - %s", LazyHexlify(self._buffer))
+        self._buffer.clear()
         self._header = {}
 
     def isFrameReady(self):
@@ -171,7 +171,7 @@ class ModbusRtuFramer(ModbusFramer):
 
         :param message: The most recent packet
         """
-        self._buffer += message
+        self._buffer.append(message)
 
     def getFrame(self):
         """
@@ -183,7 +183,7 @@ class ModbusRtuFramer(ModbusFramer):
         end = self._header['len'] - 2
         buffer = self._buffer[start:end]
         if end > 0:
-            _logger.debug("Getting Frame - {}".format(hexlify_packets(buffer)))
+            _logger.debug("Getting Frame - %s", LazyHexlify(buffer))
             return buffer
         return b''
 
@@ -224,6 +224,8 @@ class ModbusRtuFramer(ModbusFramer):
         """
         if not isinstance(unit, (list, tuple)):
             unit = [unit]
+        if frame_history.enabled:
+            frame_history.record('recv', data)
         self.addToFrame(data)
         single = kwargs.get("single", False)
         if self.isFrameReady():
@@ -231,14 +233,14 @@ class ModbusRtuFramer(ModbusFramer):
                 if self._validate_unit_id(unit, single):
                     self._process(callback)
                 else:
-                    _logger.debug("Not a valid unit id - {}, "
-                                  "ignoring!!".format(self._header['uid']))
+                    _logger.debug("Not a valid unit id - %s, "
+                                  "ignoring!!", self._header['uid'])
                     self.resetFrame()
             else:
                 _logger.debug("Frame check failed, ignoring!!")
                 self.resetFrame()
         else:
-            _logger.debug("Frame - [{}] not ready".format(data))
+            _logger.debug("Frame - [%s] not ready", data)
 
     def buildPacket(self, message):
         """
@@ -252,6 +254,8 @@ class ModbusRtuFramer(ModbusFramer):
                              message.function_code) + data
         packet += struct.pack(">H", computeCRC(packet))
         message.transaction_id = message.unit_id  # Ensure that transaction is actually the unit id for serial comms
+        if frame_history.enabled:
+            frame_history.record('send', packet)
         return packet
 
     def sendPacket(self, message):
@@ -265,18 +269,16 @@ class ModbusRtuFramer(ModbusFramer):
         while self.client.state != ModbusTransactionState.IDLE:
             if self.client.state == ModbusTransactionState.TRANSACTION_COMPLETE:
                 ts = round(time.time(), 6)
-                _logger.debug("Changing state to IDLE - Last Frame End - {}, "
-                              "Current Time stamp - {}".format(
-                    self.client.last_frame_end, ts)
-                )
+                _logger.debug("Changing state to IDLE - Last Frame End - %s, "
+                              "Current Time stamp - %s",
+                              self.client.last_frame_end, ts)
 
                 if self.client.last_frame_end:
                     idle_time = self.client.idle_time()
                     if round(ts - idle_time, 6) <= self.client.silent_interval:
                         _logger.debug("Waiting for 3.5 char before next "
-                                      "send - {} ms".format(
-                            self.client.silent_interval * 1000)
-                        )
+                                      "send - %s ms",
+                                      self.client.silent_interval * 1000)
                         time.sleep(self.client.silent_interval)
                 else:
                     # Recovering from last error ??
@@ -323,8 +325,7 @@ class ModbusRtuFramer(ModbusFramer):
         """
         Returns the complete buffer
         """
-        _logger.debug("Getting Raw Frame - "
-                      "{}".format(hexlify_packets(self._buffer)))
-        return self._buffer
+        _logger.debug("Getting Raw Frame - %s", LazyHexlify(self._buffer))
+        return self._buffer.tobytes()
 
 # __END__
@@ -1,8 +1,9 @@
 import struct
 from pymodbus.exceptions import ModbusIOException
 from pymodbus.exceptions import InvalidMessageReceivedException
-from pymodbus.utilities import hexlify_packets
-from pymodbus.framer import ModbusFramer, SOCKET_FRAME_HEADER
+from pymodbus.utilities import LazyHexlify, frame_history
+from pymodbus.framer import ModbusFramer, ModbusFrameBuffer
+from pymodbus.framer import SOCKET_FRAME_HEADER
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -10,6 +11,8 @@ from pymodbus.framer import ModbusFramer, SOCKET_FRAME_HEADER
 import logging
 _logger = logging.getLogger(__name__)
 
+_MBAP_HEADER = struct.Struct('>HHHB')
+
 # --------------------------------------------------------------------------- #
 # Modbus TCP Message
 # --------------------------------------------------------------------------- #
@@ -39,7 +42,7 @@ class ModbusSocketFramer(ModbusFramer):
 
         :param decoder: The decoder factory implementation to use
         """
-        self._buffer = b''
+        self._buffer = ModbusFrameBuffer()
         self._header = {'tid': 0, 'pid': 0, 'len': 0, 'uid': 0}
         self._hsize = 0x07
         self.decoder = decoder
@@ -54,8 +57,8 @@ class ModbusSocketFramer(ModbusFramer):
         """
         if self.isFrameReady():
             (self._header['tid'], self._header['pid'],
-             self._header['len'], self._header['uid']) = struct.unpack(
-                '>HHHB', self._buffer[0:self._hsize])
+             self._header['len'], self._header['uid']) = \
+                self._buffer.unpack_from(_MBAP_HEADER)
 
             # someone sent us an error? ignore it
             if self._header['len'] < 2:
@@ -73,7 +76,7 @@ class ModbusSocketFramer(ModbusFramer):
         current frame header handle
         """
         length = self._hsize + self._header['len'] - 1
-        self._buffer = self._buffer[length:]
+        self._buffer.advance(length)
         self._header = {'tid': 0, 'pid': 0, 'len': 0, 'uid': 0}
 
     def isFrameReady(self):
@@ -90,7 +93,7 @@ class ModbusSocketFramer(ModbusFramer):
 
         :param message: The most recent packet
         """
-        self._buffer += message
+        self._buffer.append(message)
 
     def getFrame(self):
         """ Return the next frame from the buffered data
@@ -144,7 +147,9 @@ class ModbusSocketFramer(ModbusFramer):
         if not isinstance(unit, (list, tuple)):
             unit = [unit]
         single = kwargs.get("single", False)
-        _logger.debug("Processing: " + hexlify_packets(data))
+        _logger.debug("Processing: %s", LazyHexlify(data))
+        if frame_history.enabled:
+            frame_history.record('recv', data)
         self.addToFrame(data)
         while True:
             if self.isFrameReady():
@@ -152,8 +157,8 @@ class ModbusSocketFramer(ModbusFramer):
                     if self._validate_unit_id(unit, single):
                         self._process(callback)
                     else:
-                        _logger.debug("Not a valid unit id - {}, "
-                                      "ignoring!!".format(self._header['uid']))
+                        _logger.debug("Not a valid unit id - %s, "
+                                      "ignoring!!", self._header['uid'])
                         self.resetFrame()
                 else:
                     _logger.debug("Frame check failed, ignoring!!")
@@ -189,14 +194,14 @@ class ModbusSocketFramer(ModbusFramer):
         end of the message (python just doesn't have the resolution to
         check for millisecond delays).
         """
-        self._buffer = b''
+        self._buffer.clear()
         self._header = {'tid': 0, 'pid': 0, 'len': 0, 'uid': 0}
 
     def getRawFrame(self):
         """
         Returns the complete buffer
         """
-        return self._buffer
+        return self._buffer.tobytes()
 
     def buildPacket(self, message):
         """ Creates a ready to send modbus packet
@@ -211,6 +216,8 @@ class ModbusSocketFramer(ModbusFramer):
                              message.unit_id,
                              message.function_code)
         packet += data
+        if frame_history.enabled:
+            frame_history.record('send', packet)
         return packet
 
 
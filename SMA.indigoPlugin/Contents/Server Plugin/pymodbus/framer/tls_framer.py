@@ -1,8 +1,9 @@
 import struct
 from pymodbus.exceptions import ModbusIOException
 from pymodbus.exceptions import InvalidMessageReceivedException
-from pymodbus.utilities import hexlify_packets
-from pymodbus.framer import ModbusFramer, TLS_FRAME_HEADER
+from pymodbus.utilities import LazyHexlify, frame_history
+from pymodbus.framer import ModbusFramer, ModbusFrameBuffer
+from pymodbus.framer import TLS_FRAME_HEADER
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -31,7 +32,7 @@ class ModbusTlsFramer(ModbusFramer):
 
         :param decoder: The decoder factory implementation to use
         """
-        self._buffer = b''
+        self._buffer = ModbusFrameBuffer()
         self._header = {}
         self._hsize = 0x0
         self.decoder = decoder
@@ -57,7 +58,7 @@ class ModbusTlsFramer(ModbusFramer):
         it or determined that it contains an error. It also has to reset the
         current frame header handle
         """
-        self._buffer = b''
+        self._buffer.clear()
         self._header = {}
 
     def isFrameReady(self):
@@ -74,7 +75,7 @@ class ModbusTlsFramer(ModbusFramer):
 
         :param message: The most recent packet
         """
-        self._buffer += message
+        self._buffer.append(message)
 
     def getFrame(self):
         """ Return the next frame from the buffered data
@@ -125,7 +126,9 @@ class ModbusTlsFramer(ModbusFramer):
             unit = [unit]
         # no unit id for Modbus Security Application Protocol
         single = kwargs.get("single", True)
-        _logger.debug("Processing: " + hexlify_packets(data))
+        _logger.debug("Processing: %s", LazyHexlify(data))
+        if frame_history.enabled:
+            frame_history.record('recv', data)
         self.addToFrame(data)
 
         if self.isFrameReady():
@@ -133,8 +136,8 @@ class ModbusTlsFramer(ModbusFramer):
                 if self._validate_unit_id(unit, single):
                     self._process(callback)
                 else:
-                    _logger.debug("Not in valid unit id - {}, "
-                                  "ignoring!!".format(unit))
+                    _logger.debug("Not in valid unit id - %s, "
+                                  "ignoring!!", unit)
                     self.resetFrame()
             else:
                 _logger.debug("Frame check failed, ignoring!!")
@@ -164,13 +167,13 @@ class ModbusTlsFramer(ModbusFramer):
         end of the message (python just doesn't have the resolution to
         check for millisecond delays).
         """
-        self._buffer = b''
+        self._buffer.clear()
 
     def getRawFrame(self):
         """
         Returns the complete buffer
         """
-        return self._buffer
+        return self._buffer.tobytes()
 
     def buildPacket(self, message):
         """ Creates a ready to send modbus packet
@@ -180,6 +183,8 @@ class ModbusTlsFramer(ModbusFramer):
         data = message.encode()
         packet = struct.pack(TLS_FRAME_HEADER, message.function_code)
         packet += data
+        if frame_history.enabled:
+            frame_history.record('send', packet)
         return packet
 
 # __END__
@@ -7,7 +7,11 @@ modbus messages payloads.
 
 
 """
-from struct import pack, unpack
+import re
+import sys
+from array import array
+from operator import itemgetter
+from struct import pack, calcsize, Struct
 from pymodbus.interfaces import IPayloadBuilder
 from pymodbus.constants import Endian
 from pymodbus.utilities import pack_bitstring
@@ -33,6 +37,85 @@ WC = {
     "d": 8
 }
 
+# A struct format code with its optional repeat count
+FIELD = re.compile(r'\s*(\d*)([xcbB?hHeiIlLqQfds])')
+
+NATIVE_ORDER = Endian.Little if sys.byteorder == 'little' else Endian.Big
+
+
+def _resolve_order(order):
+    """ Turns a struct byte order prefix into an explicit byte order
+
+    Like with struct, '!' is the network (big endian) order, and only
+    '@' (Endian.Auto) and '=' are the native order.
+
+    :param order: The byte order to resolve
+    :returns: Endian.Little or Endian.Big
+    """
+    if order in (Endian.Little, Endian.Big):
+        return order
+    if order == '!':
+        return Endian.Big
+    if order in (Endian.Auto, '='):
+        return NATIVE_ORDER
+    raise ParameterException('Invalid byte order %r' % (order,))
+
+
+_structs = {}
+_max_structs = 256
+
+
+def _get_struct(schema, byteorder, wordorder):
+    """
+    Returns the compiled struct for a schema and the byte reordering
+    it needs, caching both by (schema, byteorder, wordorder)
+
+    Values of two or more words are stored with the words in
+    `wordorder` and the bytes of each word in `byteorder`. When both
+    orders agree, the whole value simply is in that order. When they
+    differ, reversing the words of the value gives a value entirely
+    in `byteorder`, so the reordering is a permutation of the bytes
+    of every multi word field. The permutation is its own inverse, so
+    the same one is used to encode and to decode.
+
+    :param schema: The struct format of the fields (without byte order)
+    :param byteorder: The endianess of the bytes in the words
+    :param wordorder: The endianess of the words
+    :returns: A (struct, reorder) tuple, reorder is None when the
+              bytes can be used in place
+    """
+    key = (schema, byteorder, wordorder)
+    try:
+        return _structs[key]
+    except KeyError:
+        pass
+
+    order = _resolve_order(byteorder)
+    words = Endian.Little if wordorder == Endian.Little else Endian.Big
+    compiled = Struct(order + schema)
+    reorder = None
+    if order != words:
+        permutation = []
+        for count, code in FIELD.findall(schema):
+            count = int(count) if count else 1
+            if code in 'sx':  # a single run of bytes
+                size, count = count, 1
+            else:
+                size = calcsize(order + code)
+            for _ in range(count):
+                start = len(permutation)
+                if size < 4:
+                    permutation.extend(range(start, start + size))
+                    continue
+                for word in reversed(range(0, size, 2)):
+                    permutation.extend((start + word, start + word + 1))
+        if permutation != list(range(len(permutation))):
+            reorder = itemgetter(*permutation)
+    if len(_structs) >= _max_structs:
+        _structs.clear()
+    _structs[key] = (compiled, reorder)
+    return compiled, reorder
+
 
 class BinaryPayloadBuilder(IPayloadBuilder):
     """
@@ -62,34 +145,6 @@ class BinaryPayloadBuilder(IPayloadBuilder):
         self._wordorder = wordorder
         self._repack = repack
 
-    def _pack_words(self, fstring, value):
-        """
-        Packs Words based on the word order and byte order
-
-        # ---------------------------------------------- #
-        # pack in to network ordered value               #
-        # unpack in to network ordered  unsigned integer #
-        # Change Word order if little endian word order  #
-        # Pack values back based on correct byte order   #
-        # ---------------------------------------------- #
-
-        :param value: Value to be packed
-        :return:
-        """
-        value = pack("!{}".format(fstring), value)
-        wc = WC.get(fstring.lower())//2
-        up = "!{}H".format(wc)
-        payload = unpack(up, value)
-
-        if self._wordorder == Endian.Little:
-            payload = list(reversed(payload))
-
-        fstring = self._byteorder + "H"
-        payload = [pack(fstring, word) for word in payload]
-        payload = b''.join(payload)
-
-        return payload
-
     def to_string(self):
         """ Return the payload buffer as a string
 
@@ -113,17 +168,22 @@ class BinaryPayloadBuilder(IPayloadBuilder):
         """ Convert the payload buffer into a register
         layout that can be used as a context block.
 
-        :returns: The register layout to use as a block
+        :returns: The register layout to use as a block (an array('H'))
         """
-        # fstring = self._byteorder+'H'
-        fstring = '!H'
-        payload = self.build()
-        if self._repack:
-            payload = [unpack(self._byteorder+"H", value)[0] for value in payload]
+        payload = self.to_string()
+        if len(payload) % 2:
+            payload += b'\x00'
+        registers = array('H')
+        if IS_PYTHON3:
+            registers.frombytes(payload)
         else:
-            payload = [unpack(fstring, value)[0] for value in payload]
-        _logger.debug(payload)
-        return payload
+            registers.fromstring(payload)
+        # Registers are read in network order, or in the payload byte
+        # order when repacking
+        order = _resolve_order(self._byteorder) if self._repack else Endian.Big
+        if order != NATIVE_ORDER:
+            registers.byteswap()
+        return registers
 
     def to_coils(self):
         """Convert the payload buffer into a coil
@@ -149,6 +209,27 @@ class BinaryPayloadBuilder(IPayloadBuilder):
         string = string + (b'\x00' * (length % 2))
         return [string[i:i+2] for i in range(0, length, 2)]
 
+    def add_many(self, schema, values):
+        """ Adds several values at once to the buffer
+
+        The schema is a struct format without the byte order prefix, for
+        example 'IiHf' or '10H'. All the values are encoded by a single
+        pack call, using the byte and word order of the builder::
+
+            builder = BinaryPayloadBuilder(byteorder=Endian.Big)
+            builder.add_many('IiHf', (serial, power, status, frequency))
+            registers = builder.to_registers()
+
+        :param schema: The struct format of the values to encode
+        :param values: The values to add to the buffer
+        """
+        packer, reorder = _get_struct(schema, self._byteorder,
+                                      self._wordorder)
+        packed = packer.pack(*values)
+        if reorder is not None:
+            packed = bytes(bytearray(reorder(bytearray(packed))))
+        self._payload.append(packed)
+
     def add_bits(self, values):
         """ Adds a collection of bits to be encoded
 
@@ -166,69 +247,56 @@ class BinaryPayloadBuilder(IPayloadBuilder):
 
         :param value: The value to add to the buffer
         """
-        fstring = self._byteorder + 'B'
-        self._payload.append(pack(fstring, value))
+        self.add_many('B', (value,))
 
     def add_16bit_uint(self, value):
         """ Adds a 16 bit unsigned int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = self._byteorder + 'H'
-        self._payload.append(pack(fstring, value))
+        self.add_many('H', (value,))
 
     def add_32bit_uint(self, value):
         """ Adds a 32 bit unsigned int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = 'I'
-        # fstring = self._byteorder + 'I'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('I', (value,))
 
     def add_64bit_uint(self, value):
         """ Adds a 64 bit unsigned int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = 'Q'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('Q', (value,))
 
     def add_8bit_int(self, value):
         """ Adds a 8 bit signed int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = self._byteorder + 'b'
-        self._payload.append(pack(fstring, value))
+        self.add_many('b', (value,))
 
     def add_16bit_int(self, value):
         """ Adds a 16 bit signed int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = self._byteorder + 'h'
-        self._payload.append(pack(fstring, value))
+        self.add_many('h', (value,))
 
     def add_32bit_int(self, value):
         """ Adds a 32 bit signed int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = 'i'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('i', (value,))
 
     def add_64bit_int(self, value):
         """ Adds a 64 bit signed int to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = 'q'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('q', (value,))
 
     def add_16bit_float(self, value):
         """ Adds a 16 bit float to the buffer
@@ -236,9 +304,7 @@ class BinaryPayloadBuilder(IPayloadBuilder):
         :param value: The value to add to the buffer
         """
         if IS_PYTHON3 and PYTHON_VERSION.minor >= 6:
-            fstring = 'e'
-            p_string = self._pack_words(fstring, value)
-            self._payload.append(p_string)
+            self.add_many('e', (value,))
         else:
             _logger.warning("float16 only supported on python3.6 and above!!!")
 
@@ -247,18 +313,14 @@ class BinaryPayloadBuilder(IPayloadBuilder):
 
         :param value: The value to add to the buffer
         """
-        fstring = 'f'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('f', (value,))
 
     def add_64bit_float(self, value):
         """ Adds a 64 bit float(double) to the buffer
 
         :param value: The value to add to the buffer
         """
-        fstring = 'd'
-        p_string = self._pack_words(fstring, value)
-        self._payload.append(p_string)
+        self.add_many('d', (value,))
 
     def add_string(self, value):
         """ Adds a string to the buffer
@@ -285,11 +347,12 @@ class BinaryPayloadDecoder(object):
     def __init__(self, payload, byteorder=Endian.Little, wordorder=Endian.Big):
         """ Initialize a new payload decoder
 
-        :param payload: The payload to decode with
+        :param payload: The payload to decode with (bytes or a memoryview,
+                        such as the `payload` of a register read response)
         :param byteorder: The endianess of the payload
         :param wordorder: The endianess of the word (when wordcount is >= 2)
         """
-        self._payload = payload
+        self._payload = make_byte_string(payload)
         self._pointer = 0x00
         self._byteorder = byteorder
         self._wordorder = wordorder
@@ -305,14 +368,19 @@ class BinaryPayloadDecoder(object):
         been decoded by the rest of the library.
 
         :param registers: The register results to initialize with
+                          (a list or an array of registers)
         :param byteorder: The Byte order of each word
         :param wordorder: The endianess of the word (when wordcount is >= 2)
         :returns: An initialized PayloadDecoder
         """
-        _logger.debug(registers)
         if isinstance(registers, list):  # repack into flat binary
-            payload = b''.join(pack('!H', x) for x in registers)
+            payload = pack('!%dH' % len(registers), *registers)
             return klass(payload, byteorder, wordorder)
+        if isinstance(registers, array) and registers.itemsize == 2:
+            registers = array(registers.typecode, registers)
+            if NATIVE_ORDER == Endian.Little:
+                registers.byteswap()
+            return klass(registers.tobytes(), byteorder, wordorder)
         raise ParameterException('Invalid collection of registers supplied')
 
     @classmethod
@@ -343,31 +411,35 @@ class BinaryPayloadDecoder(object):
             return klass(payload, byteorder)
         raise ParameterException('Invalid collection of coils supplied')
 
-    def _unpack_words(self, fstring, handle):
-        """
-        Un Packs Words based on the word order and byte order
+    def decode_many(self, schema):
+        """ Decodes several values at once from the buffer
+
+        The schema is a struct format without the byte order prefix, for
+        example 'IiHf' or '10H'. All the values are decoded by a single
+        unpack call, using the byte and word order of the decoder::
+
+            decoder = BinaryPayloadDecoder.fromRegisters(registers)
+            serial, power, status, frequency = decoder.decode_many('IiHf')
 
-        # ---------------------------------------------- #
-        # Unpack in to network ordered unsigned integer  #
-        # Change Word order if little endian word order  #
-        # Pack values back based on correct byte order   #
-        # ---------------------------------------------- #
-        :param handle: Value to be unpacked
-        :return:
+        :param schema: The struct format of the values to decode
+        :returns: A tuple with the decoded values
         """
-        handle = make_byte_string(handle)
-        wc = WC.get(fstring.lower()) // 2
-        up = "!{}H".format(wc)
-        handle = unpack(up, handle)
-        if self._wordorder == Endian.Little:
-            handle = list(reversed(handle))
+        unpacker, reorder = _get_struct(schema, self._byteorder,
+                                        self._wordorder)
+        start = self._pointer
+        self._pointer += unpacker.size
+        if reorder is None:
+            return unpacker.unpack_from(self._payload, start)
+        handle = bytearray(self._payload[start:self._pointer])
+        return unpacker.unpack(bytes(bytearray(reorder(handle))))
 
-        # Repack as unsigned Integer
-        pk = self._byteorder + 'H'
-        handle = [pack(pk, p) for p in handle]
-        _logger.debug(handle)
-        handle = b''.join(handle)
-        return handle
+    def _decode(self, fstring):
+        """ Decodes a single value from the buffer
+
+        :param fstring: The struct format code of the value
+        :returns: The decoded value
+        """
+        return self.decode_many(fstring)[0]
 
     def reset(self):
         """ Reset the decoder pointer back to the start
@@ -377,114 +449,67 @@ class BinaryPayloadDecoder(object):
     def decode_8bit_uint(self):
         """ Decodes a 8 bit unsigned int from the buffer
         """
-        self._pointer += 1
-        fstring = self._byteorder + 'B'
-        handle = self._payload[self._pointer - 1:self._pointer]
-        handle = make_byte_string(handle)
-        return unpack(fstring, handle)[0]
+        return self._decode('B')
 
     def decode_bits(self):
         """ Decodes a byte worth of bits from the buffer
         """
         self._pointer += 1
-        # fstring = self._endian + 'B'
         handle = self._payload[self._pointer - 1:self._pointer]
-        handle = make_byte_string(handle)
         return unpack_bitstring(handle)
 
     def decode_16bit_uint(self):
         """ Decodes a 16 bit unsigned int from the buffer
         """
-        self._pointer += 2
-        fstring = self._byteorder + 'H'
-        handle = self._payload[self._pointer - 2:self._pointer]
-        handle = make_byte_string(handle)
-        return unpack(fstring, handle)[0]
+        return self._decode('H')
 
     def decode_32bit_uint(self):
         """ Decodes a 32 bit unsigned int from the buffer
         """
-        self._pointer += 4
-        fstring = 'I'
-        # fstring = 'I'
-        handle = self._payload[self._pointer - 4:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('I')
 
     def decode_64bit_uint(self):
         """ Decodes a 64 bit unsigned int from the buffer
         """
-        self._pointer += 8
-        fstring = 'Q'
-        handle = self._payload[self._pointer - 8:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('Q')
 
     def decode_8bit_int(self):
         """ Decodes a 8 bit signed int from the buffer
         """
-        self._pointer += 1
-        fstring = self._byteorder + 'b'
-        handle = self._payload[self._pointer - 1:self._pointer]
-        handle = make_byte_string(handle)
-        return unpack(fstring, handle)[0]
+        return self._decode('b')
 
     def decode_16bit_int(self):
         """ Decodes a 16 bit signed int from the buffer
         """
-        self._pointer += 2
-        fstring = self._byteorder + 'h'
-        handle = self._payload[self._pointer - 2:self._pointer]
-        handle = make_byte_string(handle)
-        return unpack(fstring, handle)[0]
+        return self._decode('h')
 
     def decode_32bit_int(self):
         """ Decodes a 32 bit signed int from the buffer
         """
-        self._pointer += 4
-        fstring = 'i'
-        handle = self._payload[self._pointer - 4:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('i')
 
     def decode_64bit_int(self):
         """ Decodes a 64 bit signed int from the buffer
         """
-        self._pointer += 8
-        fstring = 'q'
-        handle = self._payload[self._pointer - 8:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('q')
 
     def decode_16bit_float(self):
         """ Decodes a 16 bit float from the buffer
         """
         if IS_PYTHON3 and PYTHON_VERSION.minor >= 6:
-            self._pointer += 2
-            fstring = 'e'
-            handle = self._payload[self._pointer - 2:self._pointer]
-            handle = self._unpack_words(fstring, handle)
-            return unpack("!"+fstring, handle)[0]
+            return self._decode('e')
         else:
             _logger.warning("float16 only supported on python3.6 and above!!!")
 
     def decode_32bit_float(self):
         """ Decodes a 32 bit float from the buffer
         """
-        self._pointer += 4
-        fstring = 'f'
-        handle = self._payload[self._pointer - 4:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('f')
 
     def decode_64bit_float(self):
         """ Decodes a 64 bit float(double) from the buffer
         """
-        self._pointer += 8
-        fstring = 'd'
-        handle = self._payload[self._pointer - 8:self._pointer]
-        handle = self._unpack_words(fstring, handle)
-        return unpack("!"+fstring, handle)[0]
+        return self._decode('d')
 
     def decode_string(self, size=1):
         """ Decodes a string from the buffer
@@ -493,6 +518,8 @@ class BinaryPayloadDecoder(object):
         """
         self._pointer += size
         s = self._payload[self._pointer - size:self._pointer]
+        if isinstance(s, memoryview):
+            s = s.tobytes()
         return s
 
     def skip_bytes(self, nbytes):
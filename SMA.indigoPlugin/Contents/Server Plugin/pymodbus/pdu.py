@@ -50,7 +50,13 @@ class ModbusPDU(object):
        to create a complicated message. By setting this to True, the
        request will pass the currently encoded message through instead
        of encoding it again.
+
+    The common messages declare `__slots__`, so their instances carry no
+    per-instance dictionary. A subclass that adds attributes should list
+    them in its own `__slots__` to keep that benefit.
     """
+    __slots__ = ('transaction_id', 'protocol_id', 'unit_id', 'skip_encode',
+                 'check')
 
     def __init__(self, **kwargs):
         """ Initializes the base data for a modbus request """
@@ -92,6 +98,7 @@ class ModbusPDU(object):
 
 class ModbusRequest(ModbusPDU):
     """ Base class for a modbus request PDU """
+    __slots__ = ()
 
     def __init__(self, **kwargs):
         """ Proxy to the lower level initializer """
@@ -121,6 +128,7 @@ class ModbusResponse(ModbusPDU):
        Indicates the size of the modbus rtu response used for
        calculating how much to read.
     """
+    __slots__ = ()
 
     should_respond = True
 
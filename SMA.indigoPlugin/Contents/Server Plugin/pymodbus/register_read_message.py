@@ -3,16 +3,42 @@ Register Reading Request/Response
 ---------------------------------
 '''
 import struct
+import sys
+from array import array
 from pymodbus.pdu import ModbusRequest
 from pymodbus.pdu import ModbusResponse
 from pymodbus.pdu import ModbusExceptions as merror
-from pymodbus.compat import int2byte, byte2int
+from pymodbus.compat import int2byte, byte2int, IS_PYTHON3
+
+
+def _pack_registers(registers):
+    ''' Encodes registers as a byte count followed by the big endian values
+
+    Registers read from an array('H') data block (an array, or a
+    memoryview of one) are serialized straight from their buffer.
+
+    :param registers: The register values
+    :returns: The encoded registers
+    '''
+    count = len(registers)
+    if isinstance(registers, memoryview) and registers.format == 'H':
+        data = array('H')
+        data.frombytes(registers.cast('B'))
+    elif isinstance(registers, array) and registers.typecode == 'H':
+        data = array('H', registers)
+    else:
+        return struct.pack('>B%dH' % count, count * 2, *registers)
+    if sys.byteorder == 'little':
+        data.byteswap()
+    return int2byte(count * 2) + (data.tobytes() if IS_PYTHON3
+                                  else data.tostring())
 
 
 class ReadRegistersRequestBase(ModbusRequest):
     '''
     Base class for reading a modbus register
     '''
+    __slots__ = ('address', 'count')
     _rtu_frame_size = 8
 
     def __init__(self, address, count, **kwargs):
@@ -57,7 +83,14 @@ class ReadRegistersRequestBase(ModbusRequest):
 class ReadRegistersResponseBase(ModbusResponse):
     '''
     Base class for responsing to a modbus register read
+
+    A decoded response keeps the register bytes as received in `payload`
+    (a memoryview, big endian, two bytes per register). The `registers`
+    list is only unpacked from it when first used, so callers that decode
+    the payload themselves (e.g. with `BinaryPayloadDecoder(payload)`)
+    never build it.
     '''
+    __slots__ = ('_registers', 'payload')
 
     _rtu_byte_count_pos = 2
 
@@ -69,15 +102,27 @@ class ReadRegistersResponseBase(ModbusResponse):
         ModbusResponse.__init__(self, **kwargs)
         self.registers = values or []
 
+    @property
+    def registers(self):
+        ''' The register values of the response '''
+        if self._registers is None:
+            self._registers = list(struct.unpack_from(
+                '>%dH' % (len(self.payload) // 2), self.payload))
+        return self._registers
+
+    @registers.setter
+    def registers(self, values):
+        self._registers = values
+        self.payload = None
+
     def encode(self):
         ''' Encodes the response packet
 
         :returns: The encoded packet
         '''
-        result = int2byte(len(self.registers) * 2)
-        for register in self.registers:
-            result += struct.pack('>H', register)
-        return result
+        if self._registers is None:
+            return int2byte(len(self.payload)) + self.payload.tobytes()
+        return _pack_registers(self._registers)
 
     def decode(self, data):
         ''' Decode a register response packet
@@ -85,9 +130,10 @@ class ReadRegistersResponseBase(ModbusResponse):
         :param data: The request to decode
         '''
         byte_count = byte2int(data[0])
-        self.registers = []
-        for i in range(1, byte_count + 1, 2):
-            self.registers.append(struct.unpack('>H', data[i:i + 2])[0])
+        payload = memoryview(data)[1:byte_count + 1]
+        # Drop a trailing odd byte, like a partial register
+        self.payload = payload[:len(payload) & ~1]
+        self._registers = None
 
     def getRegister(self, index):
         ''' Get the requested register
@@ -113,6 +159,7 @@ class ReadHoldingRegistersRequest(ReadRegistersRequestBase):
     Registers are addressed starting at zero. Therefore registers numbered
     1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 3
 
     def __init__(self, address=None, count=None, **kwargs):
@@ -145,6 +192,7 @@ class ReadHoldingRegistersResponse(ReadRegistersResponseBase):
     Registers are addressed starting at zero. Therefore registers numbered
     1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 3
 
     def __init__(self, values=None, **kwargs):
@@ -163,6 +211,7 @@ class ReadInputRegistersRequest(ReadRegistersRequestBase):
     Registers are addressed starting at zero. Therefore input registers
     numbered 1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 4
 
     def __init__(self, address=None, count=None, **kwargs):
@@ -195,6 +244,7 @@ class ReadInputRegistersResponse(ReadRegistersResponseBase):
     Registers are addressed starting at zero. Therefore input registers
     numbered 1-16 are addressed as 0-15.
     '''
+    __slots__ = ()
     function_code = 4
 
     def __init__(self, values=None, **kwargs):
@@ -219,6 +269,8 @@ class ReadWriteMultipleRegistersRequest(ModbusRequest):
     registers, and the data to be written. The byte count specifies the
     number of bytes to follow in the write data field."
     '''
+    __slots__ = ('read_address', 'read_count', 'write_address',
+                 'write_registers', 'write_count', 'write_byte_count')
     function_code = 23
     _rtu_byte_count_pos = 10
 
@@ -245,12 +297,10 @@ class ReadWriteMultipleRegistersRequest(ModbusRequest):
 
         :returns: The encoded packet
         '''
-        result = struct.pack('>HHHHB',
+        return struct.pack('>HHHHB%dH' % len(self.write_registers),
                 self.read_address,  self.read_count, \
-                self.write_address, self.write_count, self.write_byte_count)
-        for register in self.write_registers:
-            result += struct.pack('>H', register)
-        return result
+                self.write_address, self.write_count, self.write_byte_count,
+                *self.write_registers)
 
     def decode(self, data):
         ''' Decode the register request packet
@@ -260,10 +310,9 @@ class ReadWriteMultipleRegistersRequest(ModbusRequest):
         self.read_address,  self.read_count,  \
         self.write_address, self.write_count, \
         self.write_byte_count = struct.unpack('>HHHHB', data[:9])
-        self.write_registers  = []
-        for i in range(9, self.write_byte_count + 9, 2):
-            register = struct.unpack('>H', data[i:i + 2])[0]
-            self.write_registers.append(register)
+        count = min(self.write_byte_count, len(data) - 9) // 2
+        self.write_registers  = list(struct.unpack_from('>%dH' % count,
+                                                        data, 9))
 
     def execute(self, context):
         ''' Run a write single register request against a datastore
@@ -312,6 +361,7 @@ class ReadWriteMultipleRegistersResponse(ModbusResponse):
     were read. The byte count field specifies the quantity of bytes to
     follow in the read data field.
     '''
+    __slots__ = ('registers',)
     function_code = 23
     _rtu_byte_count_pos = 2
 
@@ -328,10 +378,7 @@ class ReadWriteMultipleRegistersResponse(ModbusResponse):
 
         :returns: The encoded packet
         '''
-        result = int2byte(len(self.registers) * 2)
-        for register in self.registers:
-            result += struct.pack('>H', register)
-        return result
+        return _pack_registers(self.registers)
 
     def decode(self, data):
         ''' Decode the register response packet
@@ -339,8 +386,8 @@ class ReadWriteMultipleRegistersResponse(ModbusResponse):
         :param data: The response to decode
         '''
         bytecount = byte2int(data[0])
-        for i in range(1, bytecount, 2):
-            self.registers.append(struct.unpack('>H', data[i:i + 2])[0])
+        count = min(bytecount, len(data) - 1) // 2
+        self.registers.extend(struct.unpack_from('>%dH' % count, data, 1))
 
     def __str__(self):
         ''' Returns a string representation of the instance
@@ -17,6 +17,7 @@ class WriteSingleRegisterRequest(ModbusRequest):
     be written. Registers are addressed starting at zero. Therefore register
     numbered 1 is addressed as 0.
     '''
+    __slots__ = ('address', 'value')
     function_code = 6
     _rtu_frame_size = 8
     
@@ -84,6 +85,7 @@ class WriteSingleRegisterResponse(ModbusResponse):
     The normal response is an echo of the request, returned after the
     register contents have been written.
     '''
+    __slots__ = ('address', 'value')
     function_code = 6
     _rtu_frame_size = 8
 
@@ -131,6 +133,7 @@ class WriteMultipleRegistersRequest(ModbusRequest):
     The requested written values are specified in the request data field.
     Data is packed as two bytes per register.
     '''
+    __slots__ = ('address', 'values', 'count', 'byte_count')
     function_code = 16
     _rtu_byte_count_pos = 6
     _pdu_length = 5  #func + adress1 + adress2 + outputQuant1 + outputQuant2
@@ -156,14 +159,13 @@ class WriteMultipleRegistersRequest(ModbusRequest):
 
         :returns: The encoded packet
         '''
-        packet = struct.pack('>HHB', self.address, self.count, self.byte_count)
         if self.skip_encode:
+            packet = struct.pack('>HHB', self.address, self.count,
+                                 self.byte_count)
             return packet + b''.join(self.values)
-        
-        for value in self.values:
-            packet += struct.pack('>H', value)
 
-        return packet
+        return struct.pack('>HHB%dH' % len(self.values), self.address,
+                           self.count, self.byte_count, *self.values)
 
     def decode(self, data):
         ''' Decode a write single register packet packet request
@@ -172,9 +174,8 @@ class WriteMultipleRegistersRequest(ModbusRequest):
         '''
         self.address, self.count, \
         self.byte_count = struct.unpack('>HHB', data[:5])
-        self.values = []  # reset
-        for idx in range(5, (self.count * 2) + 5, 2):
-            self.values.append(struct.unpack('>H', data[idx:idx + 2])[0])
+        count = min(self.count * 2, len(data) - 5) // 2
+        self.values = list(struct.unpack_from('>%dH' % count, data, 5))
 
     def execute(self, context):
         ''' Run a write single register request against a datastore
@@ -213,6 +214,7 @@ class WriteMultipleRegistersResponse(ModbusResponse):
     "The normal response returns the function code, starting address, and
     quantity of registers written.
     '''
+    __slots__ = ('address', 'count')
     function_code = 16
     _rtu_frame_size = 8
 
@@ -255,6 +257,7 @@ class MaskWriteRegisterRequest(ModbusRequest):
     register's current contents. The function can be used to set or clear
     individual bits in the register.
     '''
+    __slots__ = ('address', 'and_mask', 'or_mask')
     function_code = 0x16
     _rtu_frame_size = 10
 
@@ -311,6 +314,7 @@ class MaskWriteRegisterResponse(ModbusResponse):
     The normal response is an echo of the request. The response is returned
     after the register has been written.
     '''
+    __slots__ = ('address', 'and_mask', 'or_mask')
     function_code = 0x16
     _rtu_frame_size = 10
 
@@ -3,7 +3,6 @@ Implementation of a Threaded Modbus Server
 ------------------------------------------
 
 """
-from binascii import b2a_hex
 import socket
 import ssl
 import traceback
@@ -11,7 +10,7 @@ import traceback
 import asyncio
 from pymodbus.compat import PYTHON_VERSION
 from pymodbus.constants import Defaults
-from pymodbus.utilities import hexlify_packets
+from pymodbus.utilities import LazyHexlify
 from pymodbus.factory import ServerDecoder
 from pymodbus.datastore import ModbusServerContext
 from pymodbus.device import ModbusControlBlock
@@ -139,8 +138,7 @@ class ModbusBaseRequestHandler(asyncio.BaseProtocol):
                     if 0 not in units:
                         units.append(0)
 
-                if _logger.isEnabledFor(logging.DEBUG):
-                    _logger.debug('Handling data: ' + hexlify_packets(data))
+                _logger.debug('Handling data: %s', LazyHexlify(data))
 
                 single = self.server.context.single
                 self.framer.processIncomingPacket(data=data,
@@ -205,8 +203,7 @@ class ModbusBaseRequestHandler(asyncio.BaseProtocol):
         if message.should_respond:
             # self.server.control.Counter.BusMessage += 1
             pdu = self.framer.buildPacket(message)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug('send: [%s]- %s' % (message, b2a_hex(pdu)))
+            _logger.debug('send: [%s]- %s', message, LazyHexlify(pdu))
             if addr == (None,):
                 self._send_(pdu)
             else:
@@ -3,13 +3,12 @@ Implementation of a Twisted Modbus Server
 ------------------------------------------
 
 """
-from binascii import b2a_hex
 from twisted.internet import protocol
 from twisted.internet.protocol import ServerFactory
 from twisted.internet import reactor
 
 from pymodbus.constants import Defaults
-from pymodbus.utilities import hexlify_packets
+from pymodbus.utilities import LazyHexlify
 from pymodbus.factory import ServerDecoder
 from pymodbus.datastore import ModbusServerContext
 from pymodbus.device import ModbusControlBlock
@@ -60,8 +59,7 @@ class ModbusTcpProtocol(protocol.Protocol):
 
         :param data: The data sent by the client
         """
-        if _logger.isEnabledFor(logging.DEBUG):
-            _logger.debug('Data Received: ' + hexlify_packets(data))
+        _logger.debug('Data Received: %s', LazyHexlify(data))
         if not self.factory.control.ListenOnly:
             units = self.factory.store.slaves()
             single = self.factory.store.single
@@ -98,8 +96,7 @@ class ModbusTcpProtocol(protocol.Protocol):
         if message.should_respond:
             self.factory.control.Counter.BusMessage += 1
             pdu = self.framer.buildPacket(message)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug('send: %s' % b2a_hex(pdu))
+            _logger.debug('send: %s', LazyHexlify(pdu))
             return self.transport.write(pdu)
 
 
@@ -171,8 +168,7 @@ class ModbusUdpProtocol(protocol.DatagramProtocol):
         :param data: The data sent by the client
         """
         _logger.debug("Client Connected [%s]" % addr)
-        if _logger.isEnabledFor(logging.DEBUG):
-            _logger.debug("Datagram Received: "+ hexlify_packets(data))
+        _logger.debug("Datagram Received: %s", LazyHexlify(data))
         if not self.control.ListenOnly:
             continuation = lambda request: self._execute(request, addr)
             self.framer.processIncomingPacket(data, continuation)
@@ -207,8 +203,7 @@ class ModbusUdpProtocol(protocol.DatagramProtocol):
         """
         self.control.Counter.BusMessage += 1
         pdu = self.framer.buildPacket(message)
-        if _logger.isEnabledFor(logging.DEBUG):
-            _logger.debug('send: %s' % b2a_hex(pdu))
+        _logger.debug('send: %s', LazyHexlify(pdu))
         return self.transport.write(pdu, addr)
 
 
@@ -3,14 +3,13 @@ Implementation of a Threaded Modbus Server
 ------------------------------------------
 
 """
-from binascii import b2a_hex
 import serial
 import socket
 import ssl
 import traceback
 
 from pymodbus.constants import Defaults
-from pymodbus.utilities import hexlify_packets
+from pymodbus.utilities import LazyHexlify
 from pymodbus.factory import ServerDecoder
 from pymodbus.datastore import ModbusServerContext
 from pymodbus.device import ModbusControlBlock
@@ -140,8 +139,7 @@ class ModbusSingleRequestHandler(ModbusBaseRequestHandler):
         if message.should_respond:
             # self.server.control.Counter.BusMessage += 1
             pdu = self.framer.buildPacket(message)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug('send: [%s]- %s' % (message, b2a_hex(pdu)))
+            _logger.debug('send: [%s]- %s', message, LazyHexlify(pdu))
             return self.request.send(pdu)
 
 
@@ -195,8 +193,7 @@ class ModbusConnectedRequestHandler(ModbusBaseRequestHandler):
                         if 0 not in units:
                             units.append(0)
 
-                if _logger.isEnabledFor(logging.DEBUG):
-                    _logger.debug('Handling data: ' + hexlify_packets(data))
+                _logger.debug('Handling data: %s', LazyHexlify(data))
                 single = self.server.context.single
                 self.framer.processIncomingPacket(data, self.execute, units,
                                                   single=single)
@@ -225,8 +222,7 @@ class ModbusConnectedRequestHandler(ModbusBaseRequestHandler):
         if message.should_respond:
             # self.server.control.Counter.BusMessage += 1
             pdu = self.framer.buildPacket(message)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug('send: [%s]- %s' % (message, b2a_hex(pdu)))
+            _logger.debug('send: [%s]- %s', message, LazyHexlify(pdu))
             return self.request.send(pdu)
 
 
@@ -250,8 +246,7 @@ class ModbusDisconnectedRequestHandler(ModbusBaseRequestHandler):
                 if not data:
                     self.running = False
                     data = b''
-                if _logger.isEnabledFor(logging.DEBUG):
-                    _logger.debug('Handling data: ' + hexlify_packets(data))
+                _logger.debug('Handling data: %s', LazyHexlify(data))
                 # if not self.server.control.ListenOnly:
                 units = self.server.context.slaves()
                 single = self.server.context.single
@@ -281,8 +276,7 @@ class ModbusDisconnectedRequestHandler(ModbusBaseRequestHandler):
         if message.should_respond:
             #self.server.control.Counter.BusMessage += 1
             pdu = self.framer.buildPacket(message)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug('send: [%s]- %s' % (message, b2a_hex(pdu)))
+            _logger.debug('send: [%s]- %s', message, LazyHexlify(pdu))
             return self.socket.sendto(pdu, self.client_address)
 
 
@@ -6,18 +6,20 @@ Collection of transaction based abstractions
 import struct
 import socket
 import time
-from threading import RLock
+from collections import OrderedDict, deque
 from functools import partial
+from threading import Lock, RLock
 
 from pymodbus.exceptions import ModbusIOException, NotImplementedException
 from pymodbus.exceptions import InvalidMessageReceivedException
+from pymodbus.exceptions import ParameterException
 from pymodbus.constants import Defaults
 from pymodbus.framer.ascii_framer import ModbusAsciiFramer
 from pymodbus.framer.rtu_framer import ModbusRtuFramer
 from pymodbus.framer.socket_framer import ModbusSocketFramer
 from pymodbus.framer.tls_framer import ModbusTlsFramer
 from pymodbus.framer.binary_framer import ModbusBinaryFramer
-from pymodbus.utilities import hexlify_packets, ModbusTransactionState
+from pymodbus.utilities import LazyHexlify, ModbusTransactionState
 from pymodbus.compat import iterkeys, byte2int
 
 
@@ -27,6 +29,9 @@ try:
 except NameError:
     TimeoutError = socket.timeout
 
+# Python 2 compatibility.
+_clock = getattr(time, 'monotonic', time.time)
+
 
 # --------------------------------------------------------------------------- #
 # Logging
@@ -35,6 +40,316 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
+# --------------------------------------------------------------------------- #
+# Framer specific transaction rules
+# --------------------------------------------------------------------------- #
+class TransactionStrategy(object):
+    """ Holds the framer specific rules the transaction manager applies to
+    every request of a client.
+
+    The rules only depend on the framer and the kind of client, so they are
+    worked out once when the transaction manager is created instead of on
+    every transaction.
+    """
+
+    def __init__(self, base_adu_size=-1, min_size=None, exception_length=None,
+                 socket=False, ascii=False, udp=False):
+        """ Initializes the strategy
+
+        :param base_adu_size: The size of the frame header and footer
+        :param min_size: The bytes to read before the function code is known
+        :param exception_length: The length of an exception response frame
+        :param socket: True if the frame length is taken from the MBAP header
+        :param ascii: True if the PDU is hex encoded (doubling its size)
+        :param udp: True if the whole response is read with a single recv
+        """
+        self.base_adu_size = base_adu_size
+        self.min_size = min_size
+        self.exception_length = exception_length
+        self.socket = socket
+        self.ascii = ascii
+        self.udp = udp
+
+    @classmethod
+    def fromClient(cls, client):
+        """ Builds the strategy matching a client and its framer
+
+        :param client: The client the transaction manager works for
+        :returns: The strategy for the client
+        """
+        framer = client.framer
+        # Checked on the class, the string form of some clients isn't
+        # available until their constructor has finished
+        udp = any(klass.__name__ == "ModbusUdpClient"
+                  for klass in type(client).__mro__)
+        if isinstance(framer, ModbusSocketFramer):
+            # tid(2), pid(2), length(2), uid(1)
+            return cls(7, 8, 7 + 2, socket=True, udp=udp)
+        elif isinstance(framer, ModbusRtuFramer):
+            # address(1), CRC(2)
+            return cls(3, 2, 3 + 2, udp=udp)
+        elif isinstance(framer, ModbusAsciiFramer):
+            # start(1)+ Address(2), LRC(2) + end(2), hex encoded Fcode and
+            # exception code
+            return cls(7, 5, 7 + 4, ascii=True, udp=udp)
+        elif isinstance(framer, ModbusBinaryFramer):
+            # start(1) + Address(1), CRC(2) + end(1)
+            return cls(5, 3, 5 + 2, udp=udp)
+        elif isinstance(framer, ModbusTlsFramer):
+            # no header and footer
+            return cls(0, None, 0 + 2, udp=udp)
+        return cls(udp=udp)
+
+    def responseLength(self, request):
+        """ Returns the expected length of the response to a request, or
+        None if it can't be known in advance
+
+        :param request: The request being sent
+        """
+        if self.socket or self.base_adu_size == -1:
+            return None
+        if not hasattr(request, "get_response_pdu_size"):
+            return None
+        response_pdu_size = request.get_response_pdu_size()
+        if self.ascii:
+            response_pdu_size = response_pdu_size * 2
+        if not response_pdu_size:
+            return None
+        return self.base_adu_size + response_pdu_size
+
+    def functionCode(self, read_min):
+        """ Returns the function code found in the first bytes of a response
+
+        :param read_min: The first min_size bytes of the response
+        """
+        if self.min_size is None:
+            return -1
+        if self.ascii:
+            return int(read_min[3:5], 16)
+        return byte2int(read_min[-1])
+
+
+# --------------------------------------------------------------------------- #
+# Retry scheduling
+# --------------------------------------------------------------------------- #
+class RetryState(object):
+    """ Tracks the retries left and the deadline of a single transaction
+    """
+
+    __slots__ = ('unit_id', 'retries', 'deadline')
+
+    def __init__(self, unit_id, retries, deadline):
+        """ Initializes a new instance
+
+        :param unit_id: The device the transaction is sent to
+        :param retries: The number of retries left
+        :param deadline: The clock value the transaction must be done by
+            (None for no deadline)
+        """
+        self.unit_id = unit_id
+        self.retries = retries
+        self.deadline = deadline
+
+
+class RetryPolicy(object):
+    """ Decides whether and when a failed transaction is tried again
+
+    Retries are spaced by an exponential backoff, and a retry is only
+    started if it can finish before the deadline of the transaction. The
+    transaction manager also cuts every try short at the deadline.
+    Each device (unit id) can also be given a retry budget: the number of
+    retries it may use per budget period. Once a device has used its
+    budget, its transactions fail on the first try until the budget
+    refills, so a flaky device can't monopolize a shared connection.
+    """
+
+    def __init__(self, retries=Defaults.Retries, backoff=Defaults.Backoff,
+                 timeout=None, budget=None, budget_period=60.0):
+        """ Initializes a new instance
+
+        :param retries: The number of retries per transaction
+        :param backoff: The delay before the second retry; the first
+            one waits half of it and every further one twice the last
+        :param timeout: The time budget of a transaction over every try,
+            in seconds (None for no limit)
+        :param budget: The number of retries each device may use per
+            budget period (None for no limit)
+        :param budget_period: The period in seconds over which the retry
+            budget of a device refills
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.budget = budget
+        self.budget_period = budget_period
+        self._budgets = {}
+        self._lock = Lock()
+
+    def start(self, unit_id, timeout=None):
+        """ Starts tracking a new transaction
+
+        :param unit_id: The device the transaction is sent to
+        :param timeout: The time budget of the transaction over every
+            try, in seconds (default: the one of the policy)
+        :returns: The retry state of the transaction
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = _clock() + timeout if timeout is not None else None
+        return RetryState(unit_id, self.retries, deadline)
+
+    def next_delay(self, state, attempt_time=0):
+        """ Schedules the next try of a failed transaction
+
+        :param state: The retry state of the transaction
+        :param attempt_time: The longest time a single try can take
+        :returns: The delay in seconds before the next try, or None if the
+            transaction must not be retried
+        """
+        if state.retries <= 0:
+            return None
+        delay = 2 ** (self.retries - state.retries - 1) * self.backoff
+        if (state.deadline is not None
+                and _clock() + delay + attempt_time > state.deadline):
+            return None
+        if not self._spend(state.unit_id):
+            _logger.debug("Retry budget of unit %s used up", state.unit_id)
+            return None
+        state.retries -= 1
+        return delay
+
+    def _spend(self, unit_id):
+        """ Takes a retry from the budget of a device
+
+        :param unit_id: The device to take the retry from
+        :returns: True if the device had a retry left, False otherwise
+        """
+        if self.budget is None:
+            return True
+        with self._lock:
+            now = _clock()
+            tokens, updated = self._budgets.get(unit_id, (self.budget, now))
+            tokens = min(self.budget, tokens + (now - updated) *
+                         self.budget / float(self.budget_period))
+            spent = tokens >= 1
+            self._budgets[unit_id] = (tokens - 1 if spent else tokens, now)
+            return spent
+
+
+# --------------------------------------------------------------------------- #
+# Transaction hooks
+# --------------------------------------------------------------------------- #
+class TransactionEvent(object):
+    """ Describes a step of a transaction, as passed to the hooks
+
+    .. attribute:: name
+
+       The step, one of the TransactionHooks event names
+
+    .. attribute:: timestamp
+
+       The monotonic clock value at which the step happened
+
+    .. attribute:: function_code, unit_id, transaction_id
+
+       The transaction the step belongs to
+
+    .. attribute:: size
+
+       The number of bytes sent or received at this step
+    """
+
+    __slots__ = ('name', 'timestamp', 'function_code', 'unit_id',
+                 'transaction_id', 'size')
+
+    def __init__(self, name, timestamp, function_code, unit_id,
+                 transaction_id, size):
+        self.name = name
+        self.timestamp = timestamp
+        self.function_code = function_code
+        self.unit_id = unit_id
+        self.transaction_id = transaction_id
+        self.size = size
+
+    def __repr__(self):
+        return "TransactionEvent(%s, %s, fc=%s, unit=%s, tid=%s, size=%s)" % (
+            self.name, self.timestamp, self.function_code, self.unit_id,
+            self.transaction_id, self.size)
+
+
+class TransactionHooks(object):
+    """ Callbacks run at each step of a transaction
+
+    Callbacks are registered per event and get a TransactionEvent. The
+    transaction managers and the asyncio client protocols only check
+    ``enabled`` before building an event, so hooks cost nothing until one
+    is registered::
+
+        hooks = client.transaction.hooks
+        hooks.add(TransactionHooks.RESPONSE_DECODED, record_latency)
+
+    A callback raising an exception is logged and otherwise ignored.
+    """
+
+    REQUEST_SENT = 'request_sent'
+    FIRST_BYTE = 'first_byte'
+    RESPONSE_DECODED = 'response_decoded'
+    RETRY = 'retry'
+    TIMEOUT = 'timeout'
+    EVENTS = (REQUEST_SENT, FIRST_BYTE, RESPONSE_DECODED, RETRY, TIMEOUT)
+
+    def __init__(self):
+        """ Initializes an empty set of hooks """
+        self._callbacks = {}
+        self.enabled = False
+
+    def add(self, event, callback):
+        """ Registers a callback for an event
+
+        :param event: One of the EVENTS
+        :param callback: The callable to run with each TransactionEvent
+        """
+        if event not in self.EVENTS:
+            raise ParameterException("Unknown transaction event %s" % event)
+        self._callbacks.setdefault(event, []).append(callback)
+        self.enabled = True
+
+    def remove(self, event, callback):
+        """ Unregisters a callback added with add()
+
+        :param event: The event the callback was registered for
+        :param callback: The callback to remove
+        """
+        callbacks = self._callbacks.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self._callbacks.pop(event, None)
+        self.enabled = bool(self._callbacks)
+
+    def emit(self, event, function_code, unit_id, transaction_id=0, size=0,
+             timestamp=None):
+        """ Runs the callbacks registered for an event
+
+        :param event: The event that happened
+        :param function_code: The function code of the transaction
+        :param unit_id: The unit id of the transaction
+        :param transaction_id: The transaction id
+        :param size: The number of bytes sent or received
+        :param timestamp: When the event happened (default: now)
+        """
+        callbacks = self._callbacks.get(event)
+        if not callbacks:
+            return
+        record = TransactionEvent(
+            event, timestamp if timestamp is not None else _clock(),
+            function_code, unit_id, transaction_id, size)
+        for callback in callbacks:
+            try:
+                callback(record)
+            except Exception:
+                _logger.exception("Transaction hook failed for %s", record)
+
+
 # --------------------------------------------------------------------------- #
 # The Global Transaction Manager
 # --------------------------------------------------------------------------- #
@@ -60,6 +375,13 @@ class ModbusTransactionManager(object):
         :param client: The client socket wrapper
         :param retry_on_empty: Should the client retry on empty
         :param retries: The number of retries to allow
+        :param retry_policy: The RetryPolicy scheduling the retries
+            (default: one built from retries and backoff)
+        :param request_timeout: The time budget of a request over every
+            try, in seconds (default: no limit)
+        :param retry_budget: The number of retries each device may use
+            per minute (default: no limit)
+        :param hooks: The TransactionHooks to run (default: none)
         """
         self.tid = Defaults.TransactionId
         self.client = client
@@ -67,151 +389,219 @@ class ModbusTransactionManager(object):
         self.retry_on_empty = kwargs.get('retry_on_empty', Defaults.RetryOnEmpty)
         self.retry_on_invalid = kwargs.get('retry_on_invalid', Defaults.RetryOnInvalid)
         self.retries = kwargs.get('retries', Defaults.Retries) or 1
+        self.retry_policy = kwargs.get('retry_policy', None) or RetryPolicy(
+            retries=self.retries, backoff=self.backoff,
+            timeout=kwargs.get('request_timeout', None),
+            budget=kwargs.get('retry_budget', None))
+        self.hooks = kwargs.get('hooks', None) or TransactionHooks()
         self._transaction_lock = RLock()
         self._no_response_devices = []
+        self._response_tid = None
         if client:
             self._set_adu_size()
 
     def _set_adu_size(self):
-        # base ADU size of modbus frame in bytes
-        if isinstance(self.client.framer, ModbusSocketFramer):
-            self.base_adu_size = 7  # tid(2), pid(2), length(2), uid(1)
-        elif isinstance(self.client.framer, ModbusRtuFramer):
-            self.base_adu_size = 3  # address(1), CRC(2)
-        elif isinstance(self.client.framer, ModbusAsciiFramer):
-            self.base_adu_size = 7  # start(1)+ Address(2), LRC(2) + end(2)
-        elif isinstance(self.client.framer, ModbusBinaryFramer):
-            self.base_adu_size = 5  # start(1) + Address(1), CRC(2) + end(1)
-        elif isinstance(self.client.framer, ModbusTlsFramer):
-            self.base_adu_size = 0  # no header and footer
-        else:
-            self.base_adu_size = -1
-
-    def _calculate_response_length(self, expected_pdu_size):
-        if self.base_adu_size == -1:
-            return None
-        else:
-            return self.base_adu_size + expected_pdu_size
+        # framer specific sizes, see TransactionStrategy.fromClient
+        self.strategy = TransactionStrategy.fromClient(self.client)
+        self.base_adu_size = self.strategy.base_adu_size
 
     def _calculate_exception_length(self):
         """ Returns the length of the Modbus Exception Response according to
         the type of Framer.
         """
-        if isinstance(self.client.framer, (ModbusSocketFramer,
-                                           ModbusTlsFramer)):
-            return self.base_adu_size + 2  # Fcode(1), ExcecptionCode(1)
-        elif isinstance(self.client.framer, ModbusAsciiFramer):
-            return self.base_adu_size + 4  # Fcode(2), ExcecptionCode(2)
-        elif isinstance(self.client.framer, (ModbusRtuFramer, 
-                                             ModbusBinaryFramer)):
-            return self.base_adu_size + 2  # Fcode(1), ExcecptionCode(1)
+        return self.strategy.exception_length
 
-        return None
+    def _addResponse(self, response):
+        """ Framer callback storing a decoded response under the transaction
+        id of the request being executed
+        """
+        self.addTransaction(response, tid=self._response_tid)
 
-    def execute(self, request):
+    def execute(self, request, timeout=None):
         """ Starts the producer to send the next request to
         consumer.write(Frame(request))
+
+        The transaction lock is only held while a try runs, so other
+        threads can use the client while this one waits to retry.
+
+        :param request: The request to process
+        :param timeout: The time budget of the request over every try, in
+            seconds (default: the one of the retry policy)
         """
         with self._transaction_lock:
             try:
-                _logger.debug("Current transaction state - {}".format(
-                    ModbusTransactionState.to_string(self.client.state))
-                )
-                retries = self.retries
+                debug = _logger.isEnabledFor(logging.DEBUG)
+                if debug:
+                    _logger.debug("Current transaction state - %s",
+                                  ModbusTransactionState.to_string(
+                                      self.client.state))
                 request.transaction_id = self.getNextTID()
-                _logger.debug("Running transaction "
-                              "{}".format(request.transaction_id))
-                _buffer = hexlify_packets(self.client.framer._buffer)
-                if _buffer:
-                    _logger.debug("Clearing current Frame "
-                                  ": - {}".format(_buffer))
+                if debug:
+                    _logger.debug("Running transaction %d",
+                                  request.transaction_id)
+                if self.client.framer._buffer:
+                    if debug:
+                        _logger.debug("Clearing current Frame : - %s",
+                                      LazyHexlify(self.client.framer._buffer))
                     self.client.framer.resetFrame()
                 broadcast = (self.client.broadcast_enable
                              and request.unit_id == 0)
                 if broadcast:
                     self._transact(request, None, broadcast=True)
-                    response = b'Broadcast write sent - no response expected'
-                else:
-                    expected_response_length = None
-                    if not isinstance(self.client.framer, ModbusSocketFramer):
-                        if hasattr(request, "get_response_pdu_size"):
-                            response_pdu_size = request.get_response_pdu_size()
-                            if isinstance(self.client.framer, ModbusAsciiFramer):
-                                response_pdu_size = response_pdu_size * 2
-                            if response_pdu_size:
-                                expected_response_length = self._calculate_response_length(response_pdu_size)
-                    if request.unit_id in self._no_response_devices:
-                        full = True
-                    else:
-                        full = False
-                    c_str = str(self.client)
-                    if "modbusudpclient" in c_str.lower().strip():
-                        full = True
-                        if not expected_response_length:
-                            expected_response_length = Defaults.ReadSize
-                    retries += 1
-                    while retries > 0:
+                    return b'Broadcast write sent - no response expected'
+            except ModbusIOException as ex:
+                return self._abort(ex)
+
+        strategy = self.strategy
+        expected_response_length = strategy.responseLength(request)
+        full = request.unit_id in self._no_response_devices
+        if strategy.udp:
+            full = True
+            if not expected_response_length:
+                expected_response_length = Defaults.ReadSize
+        attempt_time = getattr(self.client, 'timeout', None) or 0
+        retry = self.retry_policy.start(request.unit_id, timeout)
+        while True:
+            with self._transaction_lock:
+                try:
+                    remaining = (None if retry.deadline is None
+                                 else retry.deadline - _clock())
+                    if remaining is not None and remaining <= 0:
+                        return self._complete(
+                            request, b'', "Deadline of the transaction "
+                            "exceeded")
+                    # A try never waits past the deadline of the transaction
+                    limit = remaining is not None and (
+                        not attempt_time or remaining < attempt_time)
+                    if limit:
+                        previous = self._set_timeout(remaining)
+                    try:
                         response, last_exception = self._transact(
                             request,
                             expected_response_length,
-                            full=full,
-                            broadcast=broadcast
+                            full=full
                         )
-                        if not response and (
-                                request.unit_id not in self._no_response_devices):
-                            self._no_response_devices.append(request.unit_id)
-                        elif request.unit_id in self._no_response_devices and response:
-                            self._no_response_devices.remove(request.unit_id)
-                        if not response and self.retry_on_empty:
-                            _logger.debug("Retry on empty - {}".format(retries))
-                        elif not response:
-                            break
-                        if not self.retry_on_invalid:
-                            break
-                        mbap = self.client.framer.decode_data(response)
-                        if (mbap.get('unit') == request.unit_id):
-                            break
-                        if ('length' in mbap and expected_response_length and
-                            mbap.get('length') == expected_response_length):
-                            break
-                        _logger.debug("Retry on invalid - {}".format(retries))
-                        if hasattr(self.client, "state"):
-                            _logger.debug("RESETTING Transaction state to 'IDLE' for retry")
-                            self.client.state = ModbusTransactionState.IDLE
-                        if self.backoff:
-                            delay = 2 ** (self.retries - retries) * self.backoff
-                            time.sleep(delay)
-                            _logger.debug("Sleeping {}".format(delay))
-                        full = False
-                        broadcast = False
-                        retries -= 1
-                    addTransaction = partial(self.addTransaction,
-                                             tid=request.transaction_id)
-                    self.client.framer.processIncomingPacket(response,
-                                                             addTransaction,
-                                                             request.unit_id)
-                    response = self.getTransaction(request.transaction_id)
-                    if not response:
-                        if len(self.transactions):
-                            response = self.getTransaction(tid=0)
-                        else:
-                            last_exception = last_exception or (
-                                "No Response received from the remote unit"
-                                "/Unable to decode response")
-                            response = ModbusIOException(last_exception,
-                                                         request.function_code)
+                    finally:
+                        if limit:
+                            self._set_timeout(previous)
+                    if not response and (
+                            request.unit_id not in self._no_response_devices):
+                        self._no_response_devices.append(request.unit_id)
+                    elif request.unit_id in self._no_response_devices and response:
+                        self._no_response_devices.remove(request.unit_id)
+                    delay = None
+                    if self._should_retry(request, response,
+                                          expected_response_length):
+                        delay = self.retry_policy.next_delay(retry,
+                                                             attempt_time)
+                    if delay is None:
+                        return self._complete(request, response,
+                                              last_exception)
+                    if self.hooks.enabled:
+                        self.hooks.emit(TransactionHooks.RETRY,
+                                        request.function_code,
+                                        request.unit_id,
+                                        request.transaction_id,
+                                        len(response))
                     if hasattr(self.client, "state"):
-                        _logger.debug("Changing transaction state from "
-                                      "'PROCESSING REPLY' to "
-                                      "'TRANSACTION_COMPLETE'")
-                        self.client.state = (
-                            ModbusTransactionState.TRANSACTION_COMPLETE)
-                return response
-            except ModbusIOException as ex:
-                # Handle decode errors in processIncomingPacket method
-                _logger.exception(ex)
-                self.client.state = ModbusTransactionState.TRANSACTION_COMPLETE
-                return ex
+                        _logger.debug("RESETTING Transaction state to 'IDLE' for retry")
+                        self.client.state = ModbusTransactionState.IDLE
+                except ModbusIOException as ex:
+                    return self._abort(ex)
+            full = False
+            if delay:
+                _logger.debug("Sleeping %s", delay)
+                time.sleep(delay)
+
+    def _set_timeout(self, timeout):
+        """ Changes the timeout of the client and of its open connection
+
+        :param timeout: The new timeout in seconds
+        :returns: The previous timeout of the client
+        """
+        previous = self.client.timeout
+        self.client.timeout = timeout
+        sock = getattr(self.client, 'socket', None)
+        if sock is not None:
+            if hasattr(sock, 'settimeout'):
+                sock.settimeout(timeout)
+            else:
+                # A serial port
+                sock.timeout = timeout
+        if hasattr(self.client, '_socket_timeout'):
+            self.client._socket_timeout = timeout
+        return previous
+
+    def _should_retry(self, request, response, expected_response_length):
+        """ Checks whether a try got an empty or invalid response that
+        should be retried
+
+        :param request: The request that was sent
+        :param response: The raw response received
+        :param expected_response_length: The expected response length
+        :returns: True if the request should be sent again
+        """
+        if not response and self.retry_on_empty:
+            _logger.debug("Retry on empty")
+        elif not response:
+            return False
+        if not self.retry_on_invalid:
+            return False
+        mbap = self.client.framer.decode_data(response)
+        if (mbap.get('unit') == request.unit_id):
+            return False
+        if ('length' in mbap and expected_response_length and
+                mbap.get('length') == expected_response_length):
+            return False
+        _logger.debug("Retry on invalid")
+        return True
+
+    def _complete(self, request, response, last_exception):
+        """ Decodes the raw response of the last try
+
+        :param request: The request that was sent
+        :param response: The raw response received
+        :param last_exception: The error of the last try, if any
+        :returns: The decoded response, or a ModbusIOException
+        """
+        size = len(response)
+        self._response_tid = request.transaction_id
+        self.client.framer.processIncomingPacket(response,
+                                                 self._addResponse,
+                                                 request.unit_id)
+        response = self.getTransaction(request.transaction_id)
+        if not response:
+            if len(self.transactions):
+                response = self.getTransaction(tid=0)
+            else:
+                last_exception = last_exception or (
+                    "No Response received from the remote unit"
+                    "/Unable to decode response")
+                response = ModbusIOException(last_exception,
+                                             request.function_code)
+        if self.hooks.enabled:
+            event = (TransactionHooks.TIMEOUT
+                     if isinstance(response, ModbusIOException)
+                     else TransactionHooks.RESPONSE_DECODED)
+            self.hooks.emit(event, request.function_code, request.unit_id,
+                            request.transaction_id, size)
+        if hasattr(self.client, "state"):
+            _logger.debug("Changing transaction state from "
+                          "'PROCESSING REPLY' to "
+                          "'TRANSACTION_COMPLETE'")
+            self.client.state = (
+                ModbusTransactionState.TRANSACTION_COMPLETE)
+        return response
+
+    def _abort(self, ex):
+        """ Handles decode errors in processIncomingPacket method
+
+        :param ex: The error that ended the transaction
+        :returns: The error
+        """
+        _logger.exception(ex)
+        self.client.state = ModbusTransactionState.TRANSACTION_COMPLETE
+        return ex
 
     def _transact(self, packet, response_length, full=False, broadcast=False):
         """
@@ -223,12 +613,16 @@ class ModbusTransactionManager(object):
         :return: response
         """
         last_exception = None
+        request = packet
         try:
             self.client.connect()
             packet = self.client.framer.buildPacket(packet)
-            if _logger.isEnabledFor(logging.DEBUG):
-                _logger.debug("SEND: " + hexlify_packets(packet))
+            _logger.debug("SEND: %s", LazyHexlify(packet))
             size = self._send(packet)
+            if self.hooks.enabled:
+                self.hooks.emit(TransactionHooks.REQUEST_SENT,
+                                request.function_code, request.unit_id,
+                                request.transaction_id, size)
             if broadcast:
                 if size:
                     _logger.debug("Changing transaction state from 'SENDING' "
@@ -239,18 +633,17 @@ class ModbusTransactionManager(object):
                 _logger.debug("Changing transaction state from 'SENDING' "
                               "to 'WAITING FOR REPLY'")
                 self.client.state = ModbusTransactionState.WAITING_FOR_REPLY
-            if hasattr(self.client, "handle_local_echo") and self.client.handle_local_echo is True:
+            if getattr(self.client, "handle_local_echo", False) is True:
                 local_echo_packet = self._recv(size, full)
                 if local_echo_packet != packet:
                     return b'', "Wrong local echo"
-            result = self._recv(response_length, full)
-            if _logger.isEnabledFor(logging.DEBUG):
-                    _logger.debug("RECV: " + hexlify_packets(result))
+            result = self._recv(response_length, full, request)
+            _logger.debug("RECV: %s", LazyHexlify(result))
 
         except (socket.error, ModbusIOException,
                 InvalidMessageReceivedException) as msg:
             self.client.close()
-            _logger.debug("Transaction failed. (%s) " % msg)
+            _logger.debug("Transaction failed. (%s) ", msg)
             last_exception = msg
             result = b''
         return result, last_exception
@@ -258,41 +651,25 @@ class ModbusTransactionManager(object):
     def _send(self, packet):
         return self.client.framer.sendPacket(packet)
 
-    def _recv(self, expected_response_length, full):
+    def _recv(self, expected_response_length, full, request=None):
         total = None
+        hooks = self.hooks if request is not None and self.hooks.enabled else None
         if not full:
-            exception_length = self._calculate_exception_length()
-            if isinstance(self.client.framer, ModbusSocketFramer):
-                min_size = 8
-            elif isinstance(self.client.framer, ModbusRtuFramer):
-                min_size = 2
-            elif isinstance(self.client.framer, ModbusAsciiFramer):
-                min_size = 5
-            elif isinstance(self.client.framer, ModbusBinaryFramer):
-                min_size = 3
-            else:
+            strategy = self.strategy
+            min_size = strategy.min_size
+            if min_size is None:
                 min_size = expected_response_length
 
-            read_min = self.client.framer.recvPacket(min_size)
+            read_min = self._recv_first(min_size, hooks, request)
             if len(read_min) != min_size:
                 raise InvalidMessageReceivedException(
                     "Incomplete message received, expected at least %d bytes "
                     "(%d received)" % (min_size, len(read_min))
                 )
             if read_min:
-                if isinstance(self.client.framer, ModbusSocketFramer):
-                    func_code = byte2int(read_min[-1])
-                elif isinstance(self.client.framer, ModbusRtuFramer):
-                    func_code = byte2int(read_min[-1])
-                elif isinstance(self.client.framer, ModbusAsciiFramer):
-                    func_code = int(read_min[3:5], 16)
-                elif isinstance(self.client.framer, ModbusBinaryFramer):
-                    func_code = byte2int(read_min[-1])
-                else:
-                    func_code = -1
-
+                func_code = strategy.functionCode(read_min)
                 if func_code < 0x80:    # Not an error
-                    if isinstance(self.client.framer, ModbusSocketFramer):
+                    if strategy.socket:
                         # Ommit UID, which is included in header size
                         h_size = self.client.framer._hsize
                         length = struct.unpack(">H", read_min[4:6])[0] - 1
@@ -301,26 +678,57 @@ class ModbusTransactionManager(object):
                         expected_response_length -= min_size
                         total = expected_response_length + min_size
                 else:
-                    expected_response_length = exception_length - min_size
+                    expected_response_length = strategy.exception_length - min_size
                     total = expected_response_length + min_size
             else:
                 total = expected_response_length
         else:
             read_min = b''
             total = expected_response_length
-        result = self.client.framer.recvPacket(expected_response_length)
+        if read_min:
+            result = self.client.framer.recvPacket(expected_response_length)
+        else:
+            result = self._recv_first(expected_response_length, hooks,
+                                      request)
         result = read_min + result
         actual = len(result)
         if total is not None and actual != total:
             _logger.debug("Incomplete message received, "
-                          "Expected {} bytes Recieved "
-                          "{} bytes !!!!".format(total, actual))
+                          "Expected %s bytes Recieved "
+                          "%d bytes !!!!", total, actual)
         if self.client.state != ModbusTransactionState.PROCESSING_REPLY:
             _logger.debug("Changing transaction state from "
                           "'WAITING FOR REPLY' to 'PROCESSING REPLY'")
             self.client.state = ModbusTransactionState.PROCESSING_REPLY
         return result
 
+    def _recv_first(self, size, hooks, request):
+        """ Reads the start of a response, reporting its first byte
+
+        The hooks get the first byte as soon as it arrives with the
+        clients that can tell (see the client's first_chunk_callback),
+        and once the read is done with the others.
+
+        :param size: The number of bytes to read
+        :param hooks: The enabled hooks (None if there are none)
+        :param request: The request the response belongs to
+        :returns: The bytes read
+        """
+        if hooks is None:
+            return self.client.framer.recvPacket(size)
+        first_byte = partial(hooks.emit, TransactionHooks.FIRST_BYTE,
+                             request.function_code, request.unit_id,
+                             request.transaction_id)
+        self.client.first_chunk_callback = first_byte
+        try:
+            result = self.client.framer.recvPacket(size)
+        finally:
+            reported = self.client.first_chunk_callback is not first_byte
+            self.client.first_chunk_callback = None
+        if result and not reported:
+            first_byte(len(result))
+        return result
+
     def addTransaction(self, request, tid=None):
         """ Adds a transaction to the handler
 
@@ -368,15 +776,30 @@ class ModbusTransactionManager(object):
 class DictTransactionManager(ModbusTransactionManager):
     """ Impelements a transaction for a manager where the
     results are keyed based on the supplied transaction id.
+
+    The table is bounded: it never holds more than ``max_transactions``
+    entries and drops the ones older than ``transaction_timeout`` seconds,
+    so requests whose responses are lost do not pile up. Entries are kept
+    in insertion order, which makes both checks O(1) per transaction.
     """
 
     def __init__(self, client, **kwargs):
         """ Initializes an instance of the ModbusTransactionManager
 
         :param client: The client socket wrapper
+        :param max_transactions: The maximum number of transactions held
+        :param transaction_timeout: The time in seconds after which an
+            unanswered transaction is dropped (default: the client timeout
+            for every try)
         """
-        self.transactions = {}
+        self.transactions = OrderedDict()
         super(DictTransactionManager, self).__init__(client, **kwargs)
+        self.max_transactions = kwargs.get('max_transactions',
+                                           Defaults.MaxTransactions)
+        self.transaction_timeout = kwargs.get('transaction_timeout', None)
+        if self.transaction_timeout is None:
+            timeout = kwargs.get('timeout', None) or Defaults.Timeout
+            self.transaction_timeout = timeout * (self.retries + 1)
 
     def __iter__(self):
         """ Iterater over the current managed transactions
@@ -395,8 +818,11 @@ class DictTransactionManager(ModbusTransactionManager):
         :param tid: The overloaded transaction id to use
         """
         tid = tid if tid != None else request.transaction_id
-        _logger.debug("Adding transaction %d" % tid)
-        self.transactions[tid] = request
+        _logger.debug("Adding transaction %d", tid)
+        now = _clock()
+        self._expire(now)
+        self.transactions.pop(tid, None)
+        self.transactions[tid] = (request, now)
 
     def getTransaction(self, tid):
         """ Returns a transaction matching the referenced tid
@@ -406,19 +832,71 @@ class DictTransactionManager(ModbusTransactionManager):
         :param tid: The transaction to retrieve
 
         """
-        _logger.debug("Getting transaction %d" % tid)
-
-        return self.transactions.pop(tid, None)
+        _logger.debug("Getting transaction %d", tid)
+        entry = self.transactions.pop(tid, None)
+        return entry[0] if entry is not None else None
 
     def delTransaction(self, tid):
         """ Removes a transaction matching the referenced tid
 
         :param tid: The transaction to remove
         """
-        _logger.debug("deleting transaction %d" % tid)
+        _logger.debug("deleting transaction %d", tid)
 
         self.transactions.pop(tid, None)
 
+    def getNextTID(self):
+        """ Retrieve the next unique transaction identifier
+
+        Identifiers wrap within 1..0xffff and skip the ones still
+        waiting for a response, so a late response can never be
+        matched to a newer request.
+
+        :returns: The next unique transaction identifier
+        """
+        tid = self.tid
+        for _ in range(0xffff):
+            tid = tid + 1 if tid < 0xffff else 1
+            if tid not in self.transactions:
+                break
+        else:
+            raise ModbusIOException("No free transaction identifier")
+        self.tid = tid
+        return tid
+
+    def _expire(self, now):
+        """ Drops the transactions that are too old and, once the table
+        is full, the oldest ones to make room for a new transaction
+
+        :param now: The current clock value
+        """
+        transactions = self.transactions
+        deadline = now - self.transaction_timeout
+        while transactions:
+            tid = next(iter(transactions))
+            request, added = transactions[tid]
+            if added > deadline and len(transactions) < self.max_transactions:
+                break
+            del transactions[tid]
+            _logger.debug("Dropping stale transaction %d", tid)
+            self._fail(request, ModbusIOException(
+                "No response received for transaction %d" % tid))
+
+    @staticmethod
+    def _fail(handler, exception):
+        """ Fails a pending deferred or future with the given exception,
+        so whoever waits on a dropped transaction is not left hanging
+
+        :param handler: The dropped transaction
+        :param exception: The exception to fail it with
+        """
+        if hasattr(handler, 'errback'):
+            if not getattr(handler, 'called', False):
+                handler.errback(exception)
+        elif hasattr(handler, 'set_exception'):
+            if not handler.done():
+                handler.set_exception(exception)
+
 
 class FifoTransactionManager(ModbusTransactionManager):
     """ Impelements a transaction for a manager where the
@@ -431,7 +909,7 @@ class FifoTransactionManager(ModbusTransactionManager):
         :param client: The client socket wrapper
         """
         super(FifoTransactionManager, self).__init__(client, **kwargs)
-        self.transactions = []
+        self.transactions = deque()
 
     def __iter__(self):
         """ Iterater over the current managed transactions
@@ -450,7 +928,7 @@ class FifoTransactionManager(ModbusTransactionManager):
         :param tid: The overloaded transaction id to use
         """
         tid = tid if tid is not None else request.transaction_id
-        _logger.debug("Adding transaction %d" % tid)
+        _logger.debug("Adding transaction %d", tid)
 
         self.transactions.append(request)
 
@@ -461,21 +939,22 @@ class FifoTransactionManager(ModbusTransactionManager):
 
         :param tid: The transaction to retrieve
         """
-        return self.transactions.pop(0) if self.transactions else None
+        return self.transactions.popleft() if self.transactions else None
 
     def delTransaction(self, tid):
         """ Removes a transaction matching the referenced tid
 
         :param tid: The transaction to remove
         """
-        _logger.debug("Deleting transaction %d" % tid)
-        if self.transactions: self.transactions.pop(0)
+        _logger.debug("Deleting transaction %d", tid)
+        if self.transactions: self.transactions.popleft()
 
 # --------------------------------------------------------------------------- #
 # Exported symbols
 # --------------------------------------------------------------------------- #
 
 __all__ = [
+    "RetryPolicy", "TransactionHooks", "TransactionEvent",
     "FifoTransactionManager",
     "DictTransactionManager",
     "ModbusSocketFramer", "ModbusTlsFramer", "ModbusRtuFramer",
@@ -5,7 +5,13 @@ Modbus Utilities
 A collection of utilities for packing data, unpacking
 data computing checksums, and decode checksums.
 """
-from pymodbus.compat import int2byte, byte2int, IS_PYTHON3
+import struct
+import sys
+import time
+from collections import deque
+from itertools import chain
+
+from pymodbus.compat import byte2int, IS_PYTHON3
 from six import string_types
 
 
@@ -76,54 +82,77 @@ def dict_property(store, index):
 # --------------------------------------------------------------------------- #
 # Bit packing functions
 # --------------------------------------------------------------------------- #
+# Bits of every byte value, least significant bit first
+__byte_bits = [tuple(bool(value & (1 << bit)) for bit in range(8))
+               for value in range(256)]
+__byte_bit_bytes = [bytes(bytearray(bits)) for bits in __byte_bits]
+
+# Maps a byte holding a single bit (0 or anything else) to b'0' or b'1'
+__bit_digits = b'0' + b'1' * 255
+
+
 def pack_bitstring(bits):
     """ Creates a string out of an array of bits
 
-    :param bits: A bit array
+    :param bits: A bit array (a sequence of booleans, or a bytearray /
+                 memoryview holding one bit per byte as returned by
+                 `unpack_bitstring(..., as_bytes=True)`)
 
     example::
 
         bits   = [False, True, False, True]
         result = pack_bitstring(bits)
     """
-    ret = b''
-    i = packed = 0
+    if IS_PYTHON3:
+        if isinstance(bits, memoryview) and bits.itemsize != 1:
+            # e.g. a view of the array('H') of a register data block
+            bits = bits.tolist()
+        elif not isinstance(bits, (list, tuple, bytes, bytearray, memoryview)):
+            bits = list(bits)
+        try:
+            digits = bytes(bits)
+        except (TypeError, ValueError):
+            # Not a sequence of small integers (e.g. 0xFF00 coil values)
+            digits = bytes(map(bool, bits))
+        # The first bit is the least significant one of the first byte
+        value = int(digits[::-1].translate(__bit_digits) or b'0', 2)
+        return value.to_bytes((len(digits) + 7) // 8, 'little')
+
+    packed = bytearray()
+    i = value = 0
     for bit in bits:
         if bit:
-            packed += 128
+            value += 128
         i += 1
         if i == 8:
-            ret += int2byte(packed)
-            i = packed = 0
+            packed.append(value)
+            i = value = 0
         else:
-            packed >>= 1
+            value >>= 1
     if 0 < i < 8:
-        packed >>= (7 - i)
-        ret += int2byte(packed)
-    return ret
+        value >>= (7 - i)
+        packed.append(value)
+    return bytes(packed)
 
 
-def unpack_bitstring(string):
+def unpack_bitstring(string, as_bytes=False):
     """ Creates bit array out of a string
 
     :param string: The modbus data packet to decode
+    :param as_bytes: Return a bytearray holding one bit (0 or 1) per byte
+                     instead of a list of booleans
+    :returns: The list of bits (or the bytearray of bits)
 
     example::
 
         bytes  = 'bytes to decode'
         result = unpack_bitstring(bytes)
     """
-    byte_count = len(string)
-    bits = []
-    for byte in range(byte_count):
-        if IS_PYTHON3:
-            value = byte2int(int(string[byte]))
-        else:
-            value = byte2int(string[byte])
-        for _ in range(8):
-            bits.append((value & 1) == 1)
-            value >>= 1
-    return bits
+    if as_bytes:
+        return bytearray(b''.join(
+            [__byte_bit_bytes[value] for value in bytearray(string)]))
+    return list(chain.from_iterable(
+        [__byte_bits[value] for value in bytearray(string)]))
 
 
 def make_byte_string(s):
@@ -154,7 +183,67 @@ def __generate_crc16_table():
         result.append(crc)
     return result
 
+
+def __generate_crc16_word_table(table):
+    """ Generates a crc16 lookup table that consumes two bytes at once
+
+    The crc register is 16 bits wide, so after two bytes every bit of it
+    has been shifted out. The next register value therefore only depends
+    on the register xor'ed with the two bytes (read as a little endian
+    word), which is what this table is indexed with.
+
+    .. note:: This will only be generated once
+    """
+    result = [0] * 0x10000
+    for word in range(0x10000):
+        crc = table[word & 0xff] ^ (word >> 8)
+        result[word] = table[crc & 0xff] ^ (crc >> 8)
+    return result
+
 __crc16_table = __generate_crc16_table()
+__crc16_word_table = __generate_crc16_word_table(__crc16_table)
+
+
+if IS_PYTHON3 and sys.byteorder == 'little':
+    def __crc16_words(data, count):
+        return memoryview(data)[:count << 1].cast('H')
+else:
+    def __crc16_words(data, count):
+        return struct.unpack_from('<%dH' % count, data)
+
+
+def updateCRC(crc, data):
+    """ Feeds more data to a running crc16 computation. This allows
+    the crc of a frame to be computed while it is being received::
+
+        crc = updateCRC(0xffff, first_chunk)
+        crc = updateCRC(crc, second_chunk)
+        check = finalizeCRC(crc)
+
+    The data is consumed two bytes per table lookup.
+
+    :param crc: The current crc register (0xffff to start a new crc)
+    :param data: The next chunk of data (bytes, bytearray or memoryview)
+    :returns: The updated crc register
+    """
+    count = len(data) >> 1
+    if count:
+        table = __crc16_word_table
+        for word in __crc16_words(data, count):
+            crc = table[crc ^ word]
+    if len(data) & 1:
+        crc = (crc >> 8) ^ __crc16_table[(crc ^ bytearray(data[-1:])[0]) & 0xff]
+    return crc
+
+
+def finalizeCRC(crc):
+    """ Turns a crc register returned by `updateCRC` into the crc16
+    value sent on the wire
+
+    :param crc: The crc register
+    :returns: The calculated CRC
+    """
+    return ((crc << 8) & 0xff00) | ((crc >> 8) & 0x00ff)
 
 
 def computeCRC(data):
@@ -168,12 +257,7 @@ def computeCRC(data):
     :param data: The data to create a crc16 of
     :returns: The calculated CRC
     """
-    crc = 0xffff
-    for a in data:
-        idx = __crc16_table[(crc ^ byte2int(a)) & 0xff]
-        crc = ((crc >> 8) & 0xff) ^ idx
-    swapped = ((crc << 8) & 0xff00) | ((crc >> 8) & 0x00ff)
-    return swapped
+    return finalizeCRC(updateCRC(0xffff, data))
 
 
 def checkCRC(data, check):
@@ -196,7 +280,7 @@ def computeLRC(data):
     :returns: The calculated LRC
 
     """
-    lrc = sum(byte2int(a) for a in data) & 0xff
+    lrc = sum(bytearray(data)) & 0xff
     lrc = (lrc ^ 0xff) + 1
     return lrc & 0xff
 
@@ -242,11 +326,95 @@ def hexlify_packets(packet):
     """
     if not packet:
         return ''
-    return " ".join([hex(byte2int(x)) for x in packet])
+    return " ".join(map(hex, bytearray(packet)))
+
+
+# --------------------------------------------------------------------------- #
+# Lazy logging helpers
+# --------------------------------------------------------------------------- #
+# Python 2 compatibility.
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class LazyHexlify(object):
+    """ Defers hexlify_packets until the log record is formatted
+
+    Pass it as a logging argument, so a packet is only hexlified when the
+    message is actually emitted::
+
+        _logger.debug("SEND: %s", LazyHexlify(packet))
+    """
+
+    __slots__ = ('packet',)
+
+    def __init__(self, packet):
+        self.packet = packet
+
+    def __str__(self):
+        return hexlify_packets(self.packet)
+
+
+class FrameHistory(object):
+    """ An optional in-memory ring buffer of the most recent raw frames
+
+    The framers record every frame they build or receive while the history
+    is enabled, which is meant for post-mortem analysis of a failing
+    device. It is disabled by default and then costs a single attribute
+    check per frame::
+
+        from pymodbus.utilities import frame_history
+        frame_history.enable(200)
+        ...
+        for timestamp, direction, frame in frame_history.frames():
+            print(timestamp, direction, hexlify_packets(frame))
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._frames = deque(maxlen=1)
+
+    def enable(self, size=100):
+        """ Starts recording frames
+
+        :param size: The number of frames to keep
+        """
+        self._frames = deque(self._frames, maxlen=size)
+        self.enabled = True
+
+    def disable(self):
+        """ Stops recording frames, keeping the ones already recorded """
+        self.enabled = False
+
+    def clear(self):
+        """ Drops the recorded frames """
+        self._frames.clear()
+
+    def record(self, direction, frame):
+        """ Records a frame
+
+        :param direction: 'send' or 'recv'
+        :param frame: The raw frame
+        """
+        self._frames.append((_clock(), direction, bytes(frame)))
+
+    def frames(self):
+        """ Returns the recorded frames, oldest first
+
+        :returns: A list of (monotonic timestamp, direction, frame) tuples
+        """
+        return list(self._frames)
+
+
+#: The frame history shared by all the framers
+frame_history = FrameHistory()
+
+
 # --------------------------------------------------------------------------- #
 # Exported symbols
 # --------------------------------------------------------------------------- #
 __all__ = [
     'pack_bitstring', 'unpack_bitstring', 'default',
-    'computeCRC', 'checkCRC', 'computeLRC', 'checkLRC', 'rtuFrameSize'
+    'computeCRC', 'checkCRC', 'updateCRC', 'finalizeCRC',
+    'computeLRC', 'checkLRC', 'rtuFrameSize',
+    'hexlify_packets', 'LazyHexlify', 'FrameHistory', 'frame_history'
 ]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The plugin modules (and the pymodbus copy they use) live in the Indigo plugin bundle
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'SMA.indigoPlugin', 'Contents', 'Server Plugin'))
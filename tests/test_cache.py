@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cache import DeviceCache
+from comms import InverterClient, ModbusConnectionPool
+from objects import Inverter, HomeManager, ReadBlock, BlacklistEntry
+
+
+class DeviceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.json')
+        self.blacklists = dict(InverterClient.MODEL_BLACKLISTS)
+        InverterClient.MODEL_BLACKLISTS.clear()
+
+    def tearDown(self):
+        InverterClient.MODEL_BLACKLISTS.clear()
+        InverterClient.MODEL_BLACKLISTS.update(self.blacklists)
+        shutil.rmtree(self.directory)
+
+    def client(self) -> InverterClient:
+        return InverterClient('127.0.0.1', 502, ModbusConnectionPool())
+
+    def write(self, data):
+        with open(self.path, 'w') as file:
+            json.dump(data, file)
+
+    def test_inverter_round_trip(self):
+        client = self.client()
+        client.model = 9074
+        client.supported_registers = {30053, 30057}
+        client.read_plan = [ReadBlock(30053, 6)]
+        inverter = Inverter(serialNumber=1234, model=9074, acPower=1500, operatingState='producing')
+
+        cache = DeviceCache(self.path)
+        cache.update_inverter(client, inverter)
+        InverterClient.MODEL_BLACKLISTS[9074] = {30775: BlacklistEntry(2, 100.0)}
+        cache.save()
+        InverterClient.MODEL_BLACKLISTS.clear()
+
+        loaded = DeviceCache(self.path)
+        loaded.load()
+        restored_client = self.client()
+        self.assertEqual(loaded.restore_inverter('1234', restored_client), inverter)
+        self.assertEqual(restored_client.model, 9074)
+        self.assertEqual(restored_client.supported_registers, {30053, 30057})
+        self.assertEqual(restored_client.read_plan, [ReadBlock(30053, 6)])
+        self.assertEqual(InverterClient.MODEL_BLACKLISTS, {9074: {30775: BlacklistEntry(2, 100.0)}})
+        self.assertIsNone(loaded.restore_inverter('999', restored_client))
+
+    def test_stale_inverter_entry_is_dropped(self):
+        self.write({'inverters': {
+            # Written by a version of the plugin with another Inverter layout
+            '1234': {'model': 9074, 'supportedRegisters': [30053], 'readPlan': [[30053, 2]],
+                     'readings': {'serialNumber': 1234, 'acPowerWatts': 1500}},
+            # Missing its read plan
+            '5678': {'model': 9074, 'supportedRegisters': [30053], 'readings': {}},
+        }})
+        cache = DeviceCache(self.path)
+        cache.load()
+
+        for serial_number in ('1234', '5678'):
+            client = self.client()
+            self.assertIsNone(cache.restore_inverter(serial_number, client))
+            self.assertIsNone(client.model)
+            self.assertIsNone(client.read_plan)
+            self.assertNotIn(serial_number, cache.inverters)
+
+        cache.save()
+        with open(self.path) as file:
+            self.assertEqual(json.load(file)['inverters'], dict())
+
+    def test_stale_home_manager_entry_is_dropped(self):
+        self.write({'homeManagers': {'42': {'layout': {'totalPowerFromGrid': 32}, 'readings': {'serialNumber': 42}}}})
+        cache = DeviceCache(self.path)
+        cache.load()
+
+        self.assertIsNone(cache.restore_home_manager('42'))
+        self.assertNotIn('42', cache.home_managers)
+
+    def test_home_manager_round_trip(self):
+        home_manager = HomeManager(1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, serialNumber=42)
+        cache = DeviceCache(self.path)
+        cache.update_home_manager(home_manager, {'totalPowerFromGrid': 32})
+        cache.save()
+
+        loaded = DeviceCache(self.path)
+        loaded.load()
+        self.assertEqual(loaded.restore_home_manager('42'),
+                         {'layout': {'totalPowerFromGrid': 32}, 'homeManager': home_manager})
+
+    def test_unreadable_files_are_ignored(self):
+        for content in ('{not json', '[1, 2]'):
+            with open(self.path, 'w') as file:
+                file.write(content)
+            cache = DeviceCache(self.path)
+            cache.load()
+            self.assertEqual(cache.inverters, dict())
+
+        DeviceCache(os.path.join(self.directory, 'missing.json')).load()
+
+    def test_old_and_bad_blacklists(self):
+        self.write({'modelBlacklists': {'9074': [30775], '9075': {'30775': {'failures': 1}}}})
+        DeviceCache(self.path).load()
+        self.assertEqual(InverterClient.MODEL_BLACKLISTS, {9074: {30775: BlacklistEntry(1, 0.0)}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+import socket
+import threading
+import time
+import unittest
+
+from pymodbus.client.sync import ModbusTcpClient
+from pymodbus.constants import Defaults
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class ModbusTcpClientReceiveTest(unittest.TestCase):
+    '''
+    This is the unittest for the buffered receive of the tcp client
+    '''
+
+    def setUp(self):
+        ''' Connects a client to a socket standing in for the server '''
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        self.client = ModbusTcpClient('127.0.0.1', listener.getsockname()[1], timeout=0.2)
+        self.assertTrue(self.client.connect())
+        self.server, _ = listener.accept()
+        listener.close()
+
+    def tearDown(self):
+        ''' Cleans up the sockets '''
+        self.client.close()
+        self.server.close()
+
+    def sendLater(self, *chunks):
+        ''' Sends each chunk after a short pause '''
+        def send():
+            for chunk in chunks:
+                time.sleep(0.02)
+                self.server.sendall(chunk)
+        thread = threading.Thread(target=send)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def testReceiveFragmentedResponse(self):
+        ''' Test that the chunks of a response are joined '''
+        self.sendLater(b'\x00\x01\x00', b'\x00\x00\x05\x01\x03')
+        self.assertEqual(self.client._recv(8), b'\x00\x01\x00\x00\x00\x05\x01\x03')
+        # The timeout shortened for the second chunk is restored
+        self.assertEqual(self.client.socket.gettimeout(), self.client.timeout)
+
+    def testBufferIsReused(self):
+        ''' Test that reads share the buffer but not their results '''
+        buffer = self.client._recv_buffer
+        self.server.sendall(b'\x01\x02\x03\x04')
+        first = self.client._recv(2)
+        second = self.client._recv(2)
+        self.assertEqual((first, second), (b'\x01\x02', b'\x03\x04'))
+        self.assertIs(self.client._recv_buffer, buffer)
+
+    def testBufferGrowsForLargeReads(self):
+        ''' Test a read larger than the buffer '''
+        data = bytes(range(256)) * 5
+        self.server.sendall(data)
+        self.assertEqual(self.client._recv(len(data)), data)
+        self.assertGreaterEqual(len(self.client._recv_buffer), len(data))
+
+    def testReceiveUntilTimeout(self):
+        ''' Test that a read without size returns all the data sent before the timeout '''
+        data = b'\xff' * (Defaults.ReadSize + 100)
+        self.server.sendall(data)
+        self.assertEqual(self.client._recv(None), data)
+
+    def testShortReads(self):
+        ''' Test that the data received so far is returned on timeout or close '''
+        self.server.sendall(b'\x00\x01')
+        self.assertEqual(self.client._recv(8), b'\x00\x01')
+        self.server.sendall(b'\x00\x02')
+        self.server.close()
+        self.assertEqual(self.client._recv(8), b'\x00\x02')
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,497 @@
+import resource
+import socket
+import struct
+import threading
+import time
+import unittest
+from typing import Dict
+from unittest import mock
+
+from comms import DnsCache, KeepAliveModbusClient, ModbusConnectionPool, InverterScanner, InverterClient, GatewayPoller
+from objects import BlacklistEntry, Inverter, OperatingState
+from pymodbus.client.sync import ModbusTcpClient
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext, ModbusSparseDataBlock
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.factory import ServerDecoder
+from pymodbus.framer.socket_framer import ModbusSocketFramer
+from pymodbus.register_read_message import ReadInputRegistersRequest
+from pymodbus.server.sync import ModbusTcpServer
+
+
+def listening_socket() -> socket.socket:
+    """Returns a TCP socket listening on a free localhost port, which accepts connections without answering."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    return server
+
+
+def registers_32bit(values: Dict[int, int]) -> Dict[int, int]:
+    """Splits 32 bit values, keyed by register address, into their two big-endian registers."""
+    registers = dict()
+    for address, value in values.items():
+        registers[address] = value >> 16
+        registers[address + 1] = value & 0xFFFF
+    return registers
+
+
+class FakeModbusServer:
+    """A Modbus/TCP server on a free localhost port, serving input registers for each unit ID."""
+
+    def __init__(self, units: Dict[int, Dict[int, int]]):
+        self.blocks = {unit: ModbusSparseDataBlock(registers) for unit, registers in units.items()}
+        slaves = {unit: ModbusSlaveContext(ir=block, zero_mode=True) for unit, block in self.blocks.items()}
+        self.server = ModbusTcpServer(ModbusServerContext(slaves=slaves, single=False), address=('127.0.0.1', 0))
+        self.port = self.server.socket.getsockname()[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class DnsCacheTest(unittest.TestCase):
+
+    def test_resolution_is_cached_until_ttl(self):
+        cache = DnsCache(ttl=60)
+        with mock.patch('socket.getaddrinfo', return_value=[(None, None, None, '', ('10.0.0.7', 502))]) as lookup:
+            self.assertEqual(cache.resolve('inverter.local', 502), '10.0.0.7')
+            self.assertEqual(cache.resolve('inverter.local', 502), '10.0.0.7')
+            self.assertEqual(lookup.call_count, 1)
+
+            cache.ttl = 0
+            cache.invalidate('inverter.local', 502)
+            cache.resolve('inverter.local', 502)
+            cache.resolve('inverter.local', 502)
+            self.assertEqual(lookup.call_count, 3)
+
+    def test_invalidate_forces_a_new_lookup(self):
+        cache = DnsCache()
+        with mock.patch('socket.getaddrinfo', return_value=[(None, None, None, '', ('10.0.0.7', 502))]) as lookup:
+            cache.resolve('inverter.local', 502)
+            cache.invalidate('inverter.local', 502)
+            cache.resolve('inverter.local', 502)
+            self.assertEqual(lookup.call_count, 2)
+
+    def test_unresolvable_host_is_returned_as_is(self):
+        cache = DnsCache()
+        with mock.patch('socket.getaddrinfo', side_effect=socket.gaierror):
+            self.assertEqual(cache.resolve('nowhere.invalid', 502), 'nowhere.invalid')
+        self.assertEqual(cache._entries, dict())
+
+
+class ModbusConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = listening_socket()
+        self.port = self.server.getsockname()[1]
+        self.pool = ModbusConnectionPool()
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.server.close()
+
+    def test_same_endpoint_shares_one_client(self):
+        first = self.pool.acquire('127.0.0.1', self.port)
+        second = self.pool.acquire('127.0.0.1', self.port)
+        other = self.pool.acquire('127.0.0.1', self.port + 1)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    def test_connection_is_closed_by_last_release(self):
+        client = self.pool.acquire('127.0.0.1', self.port)
+        self.pool.acquire('127.0.0.1', self.port)
+        self.assertTrue(client.connect())
+
+        self.pool.release('127.0.0.1', self.port)
+        self.assertTrue(client.is_socket_open())
+
+        self.pool.release('127.0.0.1', self.port)
+        self.assertFalse(client.is_socket_open())
+        self.assertIsNot(self.pool.acquire('127.0.0.1', self.port), client)
+
+    def test_release_of_unknown_endpoint_is_ignored(self):
+        self.pool.release('127.0.0.1', self.port)
+
+    def test_close_all(self):
+        client = self.pool.acquire('127.0.0.1', self.port)
+        client.connect()
+        self.pool.close_all()
+        self.assertFalse(client.is_socket_open())
+
+
+class KeepAliveModbusClientTest(unittest.TestCase):
+
+    def test_connect_enables_keepalive(self):
+        server = listening_socket()
+        client = KeepAliveModbusClient('127.0.0.1', server.getsockname()[1], DnsCache())
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.socket.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE))
+            self.assertTrue(client.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+        finally:
+            client.close()
+            server.close()
+
+    def test_failed_connection_invalidates_the_address(self):
+        server = listening_socket()
+        port = server.getsockname()[1]
+        server.close()
+
+        dns_cache = DnsCache()
+        dns_cache._entries[('inverter.local', port)] = ('127.0.0.1', time.monotonic() + 60)
+        client = KeepAliveModbusClient('inverter.local', port, dns_cache, timeout=1)
+
+        self.assertFalse(client.connect())
+        self.assertNotIn(('inverter.local', port), dns_cache._entries)
+        self.assertFalse(client.is_socket_open())
+
+
+class InverterScannerTest(unittest.TestCase):
+
+    NAMEPLATE = registers_32bit({30051: 8001, 30053: 9074, 30055: 0, 30057: 1234567890})
+
+    def test_default_concurrency_leaves_file_descriptors(self):
+        with mock.patch('resource.getrlimit', return_value=(256, 1024)):
+            self.assertEqual(InverterScanner().concurrency, 64)
+        with mock.patch('resource.getrlimit', return_value=(40, 1024)):
+            self.assertEqual(InverterScanner().concurrency, 20)
+        with mock.patch('resource.getrlimit', return_value=(resource.RLIM_INFINITY, resource.RLIM_INFINITY)):
+            self.assertEqual(InverterScanner().concurrency, InverterScanner.MAX_CONCURRENCY)
+        self.assertEqual(InverterScanner(concurrency=8).concurrency, 8)
+
+    def test_scan_finds_and_caches_sma_devices(self):
+        server = FakeModbusServer({3: self.NAMEPLATE})
+        try:
+            scanner = InverterScanner(port=server.port)
+            found = scanner.scan(['127.0.0.1/32'])
+        finally:
+            server.stop()
+
+        self.assertEqual(len(found), 1)
+        inverter = found[0]
+        self.assertEqual((inverter.address, inverter.port, inverter.unitId), ('127.0.0.1', server.port, 3))
+        self.assertEqual((inverter.deviceClass, inverter.model, inverter.serialNumber), (8001, 9074, 1234567890))
+        self.assertIs(scanner.cache[('127.0.0.1', server.port)], inverter)
+
+    def test_scan_skips_other_modbus_devices(self):
+        # Answers Modbus, but not on the nameplate registers
+        server = FakeModbusServer({3: {0: 1}})
+        try:
+            self.assertEqual(InverterScanner(port=server.port).scan(['127.0.0.1/32']), [])
+        finally:
+            server.stop()
+
+    def test_scan_skips_closed_ports(self):
+        server = listening_socket()
+        port = server.getsockname()[1]
+        server.close()
+        self.assertEqual(InverterScanner(port=port).scan(['127.0.0.1/32']), [])
+
+    def test_scan_rejects_invalid_subnets(self):
+        self.assertRaises(ValueError, InverterScanner().scan, ['192.168.1.300/24'])
+
+
+class FakeGateway:
+    """A Modbus/TCP gateway on a free localhost port that answers pipelined requests in batches.
+
+    All the requests received together are answered together, and the answers can be mangled to test error handling:
+    `drop` is the set of indexes (in the order the requests of the first batch were received) of the responses that
+    are never sent, `close_after` closes the first connection after sending that many responses, and `reverse`
+    sends the responses of every batch in reverse order.
+    """
+
+    def __init__(self, units: Dict[int, Dict[int, int]], drop=(), close_after=None, reverse=False):
+        slaves = {unit: ModbusSlaveContext(ir=ModbusSparseDataBlock(registers), zero_mode=True)
+                  for unit, registers in units.items()}
+        self.context = ModbusServerContext(slaves=slaves, single=False)
+        self.drop = set(drop)
+        self.close_after = close_after
+        self.reverse = reverse
+        self.batches = list()
+        self.server = listening_socket()
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        self.server.close()
+
+    def _serve(self):
+        first = True
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection, first), daemon=True).start()
+            first = False
+
+    def _handle(self, connection: socket.socket, first: bool):
+        decoder, framer = ServerDecoder(), ModbusSocketFramer(ServerDecoder())
+        buffer = b''
+        with connection:
+            while True:
+                data = connection.recv(4096)
+                if not data:
+                    return
+                buffer += data
+                time.sleep(0.05)  # Let the whole batch arrive
+
+                responses = list()
+                while len(buffer) >= 6 and len(buffer) >= 6 + struct.unpack('>H', buffer[4:6])[0]:
+                    size = 6 + struct.unpack('>H', buffer[4:6])[0]
+                    frame, buffer = buffer[:size], buffer[size:]
+                    request = decoder.decode(frame[7:])
+                    request.transaction_id, request.unit_id = struct.unpack('>H', frame[:2])[0], frame[6]
+                    response = request.execute(self.context[request.unit_id])
+                    response.transaction_id, response.unit_id = request.transaction_id, request.unit_id
+                    responses.append(framer.buildPacket(response))
+                self.batches.append(len(responses))
+
+                if first:
+                    responses = [response for index, response in enumerate(responses) if index not in self.drop]
+                    if self.close_after is not None:
+                        connection.sendall(b''.join(responses[:self.close_after]))
+                        return
+                if self.reverse:
+                    responses.reverse()
+                connection.sendall(b''.join(responses))
+
+
+def inverter_registers(**values: int) -> Dict[int, int]:
+    """Returns the registers of an inverter of model 9074 that implements every register in InverterClient.REGISTERS,
+    holding the given raw values (by register name) and zero otherwise."""
+    registers = dict()
+    for register in InverterClient.REGISTERS:
+        value = values.get(register.name, 9074 if register.name == 'model' else 0)
+        for offset in range(register.size):
+            registers[register.address + offset] = (value >> (16 * (register.size - offset - 1))) & 0xFFFF
+    return registers
+
+
+class InverterClientReadPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.blacklists = dict(InverterClient.MODEL_BLACKLISTS)
+        InverterClient.MODEL_BLACKLISTS.clear()
+        self.pool = ModbusConnectionPool()
+
+    def tearDown(self):
+        self.pool.close_all()
+        InverterClient.MODEL_BLACKLISTS.clear()
+        InverterClient.MODEL_BLACKLISTS.update(self.blacklists)
+
+    def poll(self, server: FakeModbusServer, client: InverterClient = None):
+        if client is None:
+            client = InverterClient('127.0.0.1', server.port, self.pool)
+            client.connect()
+        return client, GatewayPoller(client.client).poll({1: client})[1]
+
+    def test_read_plan_joins_close_registers(self):
+        plan = InverterClient.build_read_plan(InverterClient.REGISTERS)
+        self.assertTrue(all(block.size <= InverterClient.MAX_BLOCK_SIZE for block in plan))
+        self.assertTrue(all(any(block.contains(register) for block in plan) for register in InverterClient.REGISTERS))
+        self.assertLess(len(plan), len(InverterClient.REGISTERS))
+
+    def test_poll_reads_every_register(self):
+        server = FakeModbusServer({3: inverter_registers(acPower=1500, serialNumber=1234)})
+        try:
+            client, inverter = self.poll(server)
+        finally:
+            server.stop()
+
+        self.assertEqual((inverter.acPower, inverter.serialNumber, inverter.model), (1500, 1234, 9074))
+        self.assertEqual(client.supported_registers, {register.address for register in InverterClient.REGISTERS})
+        self.assertEqual(InverterClient.MODEL_BLACKLISTS, {9074: dict()})
+
+    def test_rejected_register_is_bisected_and_blacklisted(self):
+        registers = inverter_registers(acPower=1500)
+        del registers[30783], registers[30784]
+        server = FakeModbusServer({3: registers})
+        try:
+            client, inverter = self.poll(server)
+        finally:
+            server.stop()
+
+        self.assertEqual(inverter.acPower, 1500)
+        self.assertIsNone(inverter.acVoltage)
+        self.assertNotIn(30783, client.supported_registers)
+        self.assertFalse(any(block.address <= 30783 < block.address + block.size for block in client.read_plan))
+        self.assertEqual(list(InverterClient.MODEL_BLACKLISTS[9074]), [30783])
+        self.assertEqual(InverterClient.MODEL_BLACKLISTS[9074][30783].failures, 1)
+        self.assertEqual(InverterClient.blacklisted_registers(9074), {30783})
+
+    def test_blacklist_entry_expires_and_register_is_read_again(self):
+        registers = inverter_registers(acVoltage=23012)
+        missing = {address: registers.pop(address) for address in (30783, 30784)}
+        server = FakeModbusServer({3: registers})
+        try:
+            client, _ = self.poll(server)
+            self.assertEqual(InverterClient.blacklisted_registers(9074), {30783})
+
+            # Still blacklisted within the TTL, even once the register is back
+            server.blocks[3].setValues(30783, list(missing.values()))
+            _, inverter = self.poll(server, client)
+            self.assertIsNone(inverter.acVoltage)
+
+            entry = InverterClient.MODEL_BLACKLISTS[9074][30783]
+            entry.lastFailure -= InverterClient.BLACKLIST_TTL
+            self.assertEqual(InverterClient.blacklisted_registers(9074), set())
+            _, inverter = self.poll(server, client)
+        finally:
+            server.stop()
+
+        self.assertEqual(inverter.acVoltage, 230.12)
+        self.assertIn(30783, client.supported_registers)
+        self.assertEqual(InverterClient.MODEL_BLACKLISTS[9074], dict())
+
+    def test_register_failing_repeatedly_is_blacklisted_for_good(self):
+        registers = inverter_registers()
+        del registers[30783], registers[30784]
+        server = FakeModbusServer({3: registers})
+        try:
+            client, _ = self.poll(server)
+            for _ in range(InverterClient.BLACKLIST_FAILURES - 1):
+                InverterClient.MODEL_BLACKLISTS[9074][30783].lastFailure -= InverterClient.BLACKLIST_TTL
+                self.poll(server, client)
+        finally:
+            server.stop()
+
+        entry = InverterClient.MODEL_BLACKLISTS[9074][30783]
+        self.assertEqual(entry.failures, InverterClient.BLACKLIST_FAILURES)
+        self.assertEqual(InverterClient.blacklisted_registers(9074, now=entry.lastFailure + 10 * InverterClient.BLACKLIST_TTL),
+                         {30783})
+        self.assertFalse(client._reprobe_due())
+
+    def test_other_inverters_of_the_model_skip_blacklisted_registers(self):
+        InverterClient.MODEL_BLACKLISTS[9074] = {30783: BlacklistEntry(1, time.time())}
+        client = InverterClient('127.0.0.1', 502, self.pool)
+        client.model = 9074
+        requested = [(request.address, request.count) for request in client.build_requests()]
+        self.assertFalse(any(address <= 30783 < address + count for address, count in requested))
+
+
+class OperatingStateTest(unittest.TestCase):
+
+    def test_nan_registers_read_as_none(self):
+        server = FakeModbusServer({3: inverter_registers(
+            acPower=0x80000000, acVoltage=0x80000000, gridFreq=0xFFFFFFFF, dailyYield=0xFFFFFFFFFFFFFFFF, totalYield=42)})
+        pool = ModbusConnectionPool()
+        try:
+            client = InverterClient('127.0.0.1', server.port, pool)
+            client.connect()
+            inverter = GatewayPoller(client.client).poll({1: client})[1]
+        finally:
+            pool.close_all()
+            server.stop()
+
+        self.assertIsNone(inverter.acPower)
+        self.assertIsNone(inverter.acVoltage)
+        self.assertIsNone(inverter.gridFreq)
+        self.assertIsNone(inverter.dailyYield)
+        self.assertEqual(inverter.totalYield, 42)
+        self.assertEqual(inverter.operatingState, OperatingState.ASLEEP)
+
+    def test_operating_state_inference(self):
+        self.assertEqual(InverterClient.infer_operating_state(None), OperatingState.ASLEEP)
+        self.assertEqual(InverterClient.infer_operating_state(Inverter()), OperatingState.ASLEEP)
+        self.assertEqual(InverterClient.infer_operating_state(Inverter(acPower=0, acVoltage=230.1, gridFreq=50.0)),
+                         OperatingState.STANDBY)
+        self.assertEqual(InverterClient.infer_operating_state(Inverter(acVoltage=230.1)), OperatingState.STANDBY)
+        self.assertEqual(InverterClient.infer_operating_state(Inverter(acPower=1500, acVoltage=230.1)),
+                         OperatingState.PRODUCING)
+
+
+class PipelinedPollTest(unittest.TestCase):
+
+    @staticmethod
+    def unit_registers(unit: int) -> Dict[int, int]:
+        # Every address in the read blocks is implemented, so no block is bisected
+        registers = {address: 0 for address in range(30000, 31000)}
+        registers.update(inverter_registers(acPower=unit * 100, serialNumber=unit))
+        return registers
+
+    def setUp(self):
+        self.blacklists = dict(InverterClient.MODEL_BLACKLISTS)
+        InverterClient.MODEL_BLACKLISTS.clear()
+        self.pool = ModbusConnectionPool()
+        self.units = {unit: self.unit_registers(unit) for unit in (3, 4, 5)}
+        self.blocks = len(InverterClient.build_read_plan(InverterClient.REGISTERS))
+
+    def tearDown(self):
+        self.pool.close_all()
+        InverterClient.MODEL_BLACKLISTS.clear()
+        InverterClient.MODEL_BLACKLISTS.update(self.blacklists)
+
+    def poll(self, gateway: FakeGateway):
+        inverters = {unit: InverterClient('127.0.0.1', gateway.port, self.pool, unit, pipelining=True)
+                     for unit in self.units}
+        for inverter in inverters.values():
+            inverter.connect()
+        client = inverters[3].client
+        client.timeout = 0.5
+        try:
+            return GatewayPoller(client, pipelining=True).poll(inverters)
+        finally:
+            gateway.stop()
+
+    def assert_all_read(self, results):
+        for unit, inverter in results.items():
+            self.assertNotIsInstance(inverter, Exception)
+            self.assertEqual(inverter.serialNumber, unit)
+            self.assertEqual(inverter.acPower, unit * 100)
+
+    def test_all_units_in_one_batch(self):
+        gateway = FakeGateway(self.units)
+        self.assert_all_read(self.poll(gateway))
+        self.assertEqual(gateway.batches, [3 * self.blocks])
+
+    def test_dropped_frame_only_rereads_its_unit(self):
+        # The second request of the batch is the second block of unit 3
+        gateway = FakeGateway(self.units, drop={1})
+        self.assert_all_read(self.poll(gateway))
+        self.assertEqual(gateway.batches, [3 * self.blocks] + [1] * self.blocks)
+
+    def test_connection_lost_mid_batch(self):
+        # Only the responses for unit 3 make it before the connection is closed
+        gateway = FakeGateway(self.units, close_after=self.blocks)
+        self.assert_all_read(self.poll(gateway))
+        self.assertEqual(gateway.batches, [3 * self.blocks] + [1] * 2 * self.blocks)
+
+
+class ExecuteManyTest(unittest.TestCase):
+
+    def execute_many(self, gateway: FakeGateway, requests):
+        client = ModbusTcpClient('127.0.0.1', gateway.port, timeout=0.5)
+        try:
+            return client, client.execute_many(requests)
+        finally:
+            gateway.stop()
+
+    def test_responses_are_matched_by_transaction_id(self):
+        gateway = FakeGateway({3: {0: 1, 1: 2}, 4: {0: 3, 1: 4}}, reverse=True)
+        client, responses = self.execute_many(gateway, [
+            ReadInputRegistersRequest(0, 2, unit=3),
+            ReadInputRegistersRequest(0, 2, unit=4),
+            ReadInputRegistersRequest(1, 1, unit=3),
+        ])
+        self.assertEqual([response.registers for response in responses], [[1, 2], [3, 4], [2]])
+        self.assertTrue(client.is_socket_open())
+        client.close()
+
+    def test_missing_response_closes_the_connection(self):
+        gateway = FakeGateway({3: {0: 1, 1: 2}}, drop={0})
+        client, responses = self.execute_many(gateway, [
+            ReadInputRegistersRequest(0, 1, unit=3),
+            ReadInputRegistersRequest(1, 1, unit=3),
+        ])
+        self.assertIsInstance(responses[0], ModbusIOException)
+        self.assertEqual(responses[1].registers, [2])
+        self.assertFalse(client.is_socket_open())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+import unittest
+
+from pymodbus.bit_read_message import ReadCoilsRequest, ReadCoilsResponse
+from pymodbus.bit_read_message import ReadDiscreteInputsRequest
+from pymodbus.datastore import ModbusSlaveContext
+from pymodbus.datastore import ModbusSequentialDataBlock
+from pymodbus.datastore import ModbusSequentialBitDataBlock
+from pymodbus.datastore import ModbusSparseDataBlock
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+
+
+class ModbusDataStoreTest(unittest.TestCase):
+    '''
+    This is the unittest for the pymodbus.datastore module
+    '''
+
+    def testReadCoilsFromSequentialDataBlock(self):
+        ''' Test coils served from a register backed block '''
+        bits = [1, 0, 1, 1, 0, 0, 0, 0, 1, 1]
+        context = ModbusSlaveContext(co=ModbusSequentialDataBlock(0, bits),
+                                     zero_mode=True)
+        response = ReadCoilsRequest(0, len(bits)).execute(context)
+        self.assertEqual(response.encode(), b'\x02\x0d\x03')
+        decoded = ReadCoilsResponse()
+        decoded.decode(response.encode())
+        self.assertEqual(decoded.bits[:len(bits)], [bool(b) for b in bits])
+
+    def testReadCoilsFromSequentialBitDataBlock(self):
+        ''' Test coils served from a packed bit block '''
+        bits = [True, False, True, True, False, False, False, False, True, True]
+        context = ModbusSlaveContext(di=ModbusSequentialBitDataBlock(0, bits),
+                                     zero_mode=True)
+        response = ReadDiscreteInputsRequest(3, 7).execute(context)
+        self.assertEqual(response.bits[:7], bits[3:])
+
+    def testReadRegistersFromSequentialDataBlock(self):
+        ''' Test registers served from an array backed block '''
+        context = ModbusSlaveContext(hr=ModbusSequentialDataBlock(0, [1, 0x1234, 3]),
+                                     zero_mode=True)
+        response = ReadHoldingRegistersRequest(1, 2).execute(context)
+        self.assertEqual(response.encode(), b'\x04\x12\x34\x00\x03')
+
+    def testSequentialBitDataBlockValues(self):
+        ''' Test the values of a bit block write through '''
+        block = ModbusSequentialBitDataBlock(0x00, [False] * 10)
+        block.values[3] = True
+        block.values[-1] = True
+        self.assertEqual(block.getValues(0, 10), [False] * 3 + [True] + [False] * 5 + [True])
+        self.assertEqual(block.values, block.getValues(0, 10))
+        self.assertEqual(len(block.values), 10)
+        block.values[0:2] = [True, True]
+        self.assertEqual(block.values[:4], [True, True, False, True])
+        self.assertRaises(IndexError, block.values.__setitem__, 10, True)
+        self.assertRaises(ValueError, block.values.__setitem__, slice(0, 2), [True])
+        block.values = [True] * 3
+        self.assertEqual(list(block), [(0, True), (1, True), (2, True)])
+
+    def testSparseDataBlockValues(self):
+        ''' Test the values of a sparse block write through '''
+        block = ModbusSparseDataBlock({10: 1, 11: 2, 20: 3})
+        self.assertEqual(block.values, {10: 1, 11: 2, 20: 3})
+        block.values[12] = 4
+        block.values[20] = 5
+        self.assertEqual(list(block.getValues(10, 3)), [1, 2, 4])
+        self.assertEqual(block.values[20], 5)
+        self.assertTrue(block.validate(10, 3))
+        del block.values[11]
+        self.assertFalse(block.validate(10, 3))
+        self.assertRaises(KeyError, block.getValues, 10, 3)
+        self.assertEqual(dict(block.values), {10: 1, 12: 4, 20: 5})
+        self.assertEqual(len(block.values), 3)
+        self.assertTrue(12 in block.values)
+        self.assertFalse(11 in block.values)
+        self.assertRaises(KeyError, block.values.__delitem__, 11)
+        block.values.update({11: 7, 13: 8})
+        self.assertEqual(list(block.getValues(10, 4)), [1, 7, 4, 8])
+        block.values = block.values
+        self.assertEqual(list(block), [(10, 1), (11, 7), (12, 4), (13, 8), (20, 5)])
+
+    def testSparseDataBlockRanges(self):
+        ''' Test reads and writes over the ranges of a sparse block '''
+        block = ModbusSparseDataBlock([0] * 4)
+        block.setValues(6, [1, 2])
+        self.assertFalse(block.validate(3, 4))
+        block.setValues(4, [9, 9])
+        self.assertTrue(block.validate(0, 8))
+        self.assertEqual(list(block.getValues(3, 5)), [0, 9, 9, 1, 2])
+        block.setValues(7, [70000])
+        self.assertEqual(list(block.getValues(6, 2)), [1, 70000])
+        block.reset()
+        self.assertEqual(list(block.getValues(0, 8)), [0] * 8)
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
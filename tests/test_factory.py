@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+import unittest
+
+from pymodbus.diag_message import ReturnQueryDataRequest, ReturnQueryDataResponse
+from pymodbus.factory import ServerDecoder, ClientDecoder
+from pymodbus.mei_message import ReadDeviceInformationRequest
+from pymodbus.pdu import ModbusRequest, ModbusResponse
+from pymodbus.pdu import ExceptionResponse, IllegalFunctionRequest
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+
+
+class CustomRequest(ModbusRequest):
+    function_code = 0x55
+
+    def decode(self, data):
+        self.data = data
+
+
+class CustomResponse(ModbusResponse):
+    function_code = 0x55
+
+    def decode(self, data):
+        self.data = data
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class SimpleFactoryTest(unittest.TestCase):
+    '''
+    This is the unittest for the pymod.factory module
+    '''
+
+    def setUp(self):
+        ''' Initializes the test environment '''
+        self.server = ServerDecoder()
+        self.client = ClientDecoder()
+
+    def testLookupPduClass(self):
+        ''' Test the lookup of every function code '''
+        for decoder in (self.server, self.client):
+            for function_code in range(-1, 257):
+                pdu_class = decoder.lookupPduClass(function_code)
+                if pdu_class is not ExceptionResponse:
+                    self.assertEqual(pdu_class.function_code, function_code)
+        self.assertEqual(self.server.lookupPduClass(3), ReadHoldingRegistersRequest)
+        self.assertEqual(self.client.lookupPduClass(3), ReadHoldingRegistersResponse)
+        self.assertEqual(self.client.lookupPduClass(0x55), ExceptionResponse)
+
+    def testServerDecode(self):
+        ''' Test decoding requests, with and without sub functions '''
+        request = self.server.decode(b'\x03\x00\x01\x00\x02')
+        self.assertIsInstance(request, ReadHoldingRegistersRequest)
+        self.assertEqual((request.address, request.count), (1, 2))
+        self.assertIsInstance(self.server.decode(b'\x08\x00\x00\x12\x34'), ReturnQueryDataRequest)
+        self.assertIsInstance(self.server.decode(b'\x2b\x0e\x01\x00'), ReadDeviceInformationRequest)
+        request = self.server.decode(b'\x55\x01')
+        self.assertIsInstance(request, IllegalFunctionRequest)
+        self.assertEqual(request.function_code, 0x55)
+
+    def testClientDecode(self):
+        ''' Test decoding responses, exceptions and unknown functions '''
+        response = self.client.decode(b'\x03\x02\x00\x07')
+        self.assertIsInstance(response, ReadHoldingRegistersResponse)
+        self.assertEqual(response.registers, [7])
+        self.assertIsInstance(self.client.decode(b'\x08\x00\x00\x12\x34'), ReturnQueryDataResponse)
+        response = self.client.decode(b'\x83\x02')
+        self.assertIsInstance(response, ExceptionResponse)
+        self.assertEqual(response.original_code, 3)
+        self.assertEqual(self.client.decode(b'\x55\x01'), None)
+
+    def testTablesAreReadOnly(self):
+        ''' Test that the shared lookup tables can't be changed in place '''
+        lookup = self.server._ServerDecoder__lookup
+        sub_lookup = self.server._ServerDecoder__sub_lookup
+        self.assertIsInstance(lookup, tuple)
+        self.assertEqual(len(lookup), 256)
+        with self.assertRaises(TypeError):
+            sub_lookup[0x08] = {}
+        with self.assertRaises(TypeError):
+            sub_lookup[0x08][0x1234] = CustomRequest
+        self.assertIs(ServerDecoder()._ServerDecoder__lookup, lookup)
+
+    def testRegisterIsPerInstance(self):
+        ''' Test that registering a function only changes that decoder '''
+        self.server.register(CustomRequest)
+        self.client.register(CustomResponse)
+        self.assertEqual(self.server.decode(b'\x55\x01').data, b'\x01')
+        self.assertEqual(self.client.decode(b'\x55\x01').data, b'\x01')
+        self.assertEqual(ServerDecoder().lookupPduClass(0x55), ExceptionResponse)
+        self.assertEqual(ClientDecoder().lookupPduClass(0x55), ExceptionResponse)
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import struct
+import unittest
+
+from pymodbus.factory import ClientDecoder
+from pymodbus.framer import ModbusFrameBuffer
+from pymodbus.framer.socket_framer import ModbusSocketFramer
+from pymodbus.register_read_message import ReadInputRegistersResponse
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class ModbusFrameBufferTest(unittest.TestCase):
+    '''
+    This is the unittest for the framer receive buffer
+    '''
+
+    def setUp(self):
+        ''' Initializes a buffer holding some consumed data '''
+        self.buffer = ModbusFrameBuffer()
+        self.buffer.append(b'\x00\x01\x02\x03')
+        self.buffer.append(b'\x04\x05\x06\x07')
+        self.buffer.advance(2)
+
+    def testCursorRelativeAccess(self):
+        ''' Test that indexing, slicing and searching skip the consumed data '''
+        self.assertEqual(len(self.buffer), 6)
+        self.assertEqual(self.buffer[0], 2)
+        self.assertEqual(self.buffer[-1], 7)
+        self.assertEqual(self.buffer[1:3], b'\x03\x04')
+        self.assertEqual(self.buffer[4:2], b'')
+        self.assertEqual(self.buffer[::2], b'\x02\x04\x06')
+        self.assertEqual(self.buffer.find(b'\x04'), 2)
+        self.assertEqual(self.buffer.find(b'\x00'), -1)
+        self.assertEqual(self.buffer.unpack_from('>H', 1), (0x0304,))
+        self.assertEqual(self.buffer.unpack_from(struct.Struct('>B')), (2,))
+        self.assertEqual(self.buffer.view(4).tobytes(), b'\x06\x07')
+        self.assertEqual(self.buffer.tobytes(), b'\x02\x03\x04\x05\x06\x07')
+        self.assertRaises(IndexError, lambda: self.buffer[6])
+
+    def testSlicesAreCopies(self):
+        ''' Test that a slice outlives the data it was taken from '''
+        frame = self.buffer[0:2]
+        self.buffer.advance(6)
+        self.buffer.append(b'\xff\xff')
+        self.assertEqual(frame, b'\x02\x03')
+
+    def testConsumingEverythingClears(self):
+        ''' Test that the storage is emptied once all the data is consumed '''
+        self.buffer.advance(6)
+        self.assertFalse(self.buffer)
+        self.assertEqual((len(self.buffer._data), self.buffer._start), (0, 0))
+
+    def testCompaction(self):
+        ''' Test that consumed data is dropped past the threshold '''
+        self.buffer.compact_threshold = 4
+        # Below half of the storage, only the cursor moves
+        self.buffer.advance(1)
+        self.assertEqual((len(self.buffer._data), self.buffer._start), (8, 3))
+        self.buffer.advance(1)
+        self.assertEqual((len(self.buffer._data), self.buffer._start), (4, 0))
+        self.assertEqual(self.buffer.tobytes(), b'\x04\x05\x06\x07')
+
+
+class ModbusSocketFramerTest(unittest.TestCase):
+    '''
+    This is the unittest for framing a stream of tcp responses
+    '''
+
+    def setUp(self):
+        ''' Initializes the framer and the received responses '''
+        self.framer = ModbusSocketFramer(ClientDecoder())
+        self.results = []
+
+    def frame(self, tid, registers):
+        ''' Builds the frame of a read input registers response '''
+        response = ReadInputRegistersResponse(registers, transaction=tid, unit=1)
+        return self.framer.buildPacket(response)
+
+    def process(self, data):
+        ''' Feeds data to the framer '''
+        self.framer.processIncomingPacket(data, self.results.append, unit=1)
+
+    def testFramesInOneChunk(self):
+        ''' Test several frames received at once '''
+        self.process(self.frame(1, [1, 2]) + self.frame(2, [3]))
+        self.assertEqual([r.transaction_id for r in self.results], [1, 2])
+        self.assertEqual([r.registers for r in self.results], [[1, 2], [3]])
+        self.assertFalse(self.framer._buffer)
+
+    def testPayloadOutlivesBuffer(self):
+        ''' Test that a decoded payload survives the buffer being reused '''
+        self.framer._buffer.compact_threshold = 1
+        self.process(self.frame(1, [0x0102]) + self.frame(2, [0x0304]))
+        self.process(self.frame(3, [0x0506]))
+        self.assertEqual([r.payload.tobytes() for r in self.results],
+                         [b'\x01\x02', b'\x03\x04', b'\x05\x06'])
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+import struct
+import unittest
+from array import array
+
+from pymodbus.constants import Endian
+from pymodbus.exceptions import ParameterException
+from pymodbus.payload import BinaryPayloadBuilder, BinaryPayloadDecoder
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class ModbusPayloadUtilityTests(unittest.TestCase):
+    '''
+    This is the unittest for the pymod.payload module
+    '''
+
+    def setUp(self):
+        ''' Initializes the test environment '''
+        self.fields = [('H', 0x1234), ('i', -2), ('Q', 0x0102030405060708), ('d', 1.5)]
+
+    def wordOrder(self, prefix):
+        ''' Returns the word order matching the byte order of a prefix '''
+        return Endian.Little if struct.pack(prefix + 'H', 1)[0:1] == b'\x01' else Endian.Big
+
+    def testBuilderMatchesStruct(self):
+        ''' Test that every byte order prefix encodes like struct.pack '''
+        for prefix in '<>!@=':
+            builder = BinaryPayloadBuilder(byteorder=prefix, wordorder=self.wordOrder(prefix))
+            builder.add_16bit_uint(0x1234)
+            builder.add_32bit_int(-2)
+            builder.add_64bit_uint(0x0102030405060708)
+            builder.add_64bit_float(1.5)
+            expected = b''.join(struct.pack(prefix + code, value) for code, value in self.fields)
+            self.assertEqual(builder.to_string(), expected, prefix)
+
+    def testDecoderMatchesStruct(self):
+        ''' Test that every byte order prefix decodes like struct.unpack '''
+        for prefix in '<>!@=':
+            payload = b''.join(struct.pack(prefix + code, value) for code, value in self.fields)
+            decoder = BinaryPayloadDecoder(payload, byteorder=prefix, wordorder=self.wordOrder(prefix))
+            self.assertEqual(decoder.decode_16bit_uint(), 0x1234, prefix)
+            self.assertEqual(decoder.decode_32bit_int(), -2, prefix)
+            self.assertEqual(decoder.decode_64bit_uint(), 0x0102030405060708, prefix)
+            self.assertEqual(decoder.decode_64bit_float(), 1.5, prefix)
+
+    def testNetworkOrderIsBigEndian(self):
+        ''' Test that '!' is big endian whatever the native order '''
+        builder = BinaryPayloadBuilder(byteorder='!')
+        builder.add_32bit_uint(0x01020304)
+        self.assertEqual(builder.to_string(), b'\x01\x02\x03\x04')
+        decoder = BinaryPayloadDecoder(b'\x01\x02', byteorder='!')
+        self.assertEqual(decoder.decode_16bit_uint(), 0x0102)
+
+    def testInvalidByteOrder(self):
+        ''' Test that an unknown byte order is rejected '''
+        builder = BinaryPayloadBuilder(byteorder='?')
+        self.assertRaises(ParameterException, builder.add_16bit_uint, 1)
+
+    def testManyRoundTrip(self):
+        ''' Test that add_many and decode_many round trip in every order '''
+        values = (0x01020304, -5, 0x0a0b, 0x0102030405060708, 3)
+        for prefix in '<>!@=':
+            for wordorder in (Endian.Little, Endian.Big):
+                builder = BinaryPayloadBuilder(byteorder=prefix, wordorder=wordorder)
+                builder.add_many('IiHQ', values[:4])
+                builder.add_many('h', values[4:])
+                self.assertEqual(len(builder.to_registers()), 10)
+                decoder = BinaryPayloadDecoder(builder.to_string(), byteorder=prefix, wordorder=wordorder)
+                self.assertEqual(decoder.decode_many('IiHQh'), values, (prefix, wordorder))
+
+    def testManyMatchesSingleValues(self):
+        ''' Test that add_many encodes like the single value methods '''
+        single = BinaryPayloadBuilder(byteorder=Endian.Big, wordorder=Endian.Little)
+        single.add_32bit_uint(0x01020304)
+        single.add_16bit_int(-2)
+        many = BinaryPayloadBuilder(byteorder=Endian.Big, wordorder=Endian.Little)
+        many.add_many('Ih', (0x01020304, -2))
+        self.assertEqual(many.to_string(), b'\x03\x04\x01\x02\xff\xfe')
+        self.assertEqual(many.to_string(), single.to_string())
+
+    def testToRegisters(self):
+        ''' Test that the registers are an array read in network order '''
+        builder = BinaryPayloadBuilder(byteorder=Endian.Big, wordorder=Endian.Little)
+        builder.add_32bit_uint(0x01020304)
+        builder.add_8bit_uint(5)
+        registers = builder.to_registers()
+        self.assertIsInstance(registers, array)
+        self.assertEqual(registers.typecode, 'H')
+        self.assertEqual(registers.tolist(), [0x0304, 0x0102, 0x0500])
+        # Repacking reads the registers in the payload byte order
+        for prefix, expected in (('<', [0x0304, 0x0102]), ('>', [0x0304, 0x0102]), ('!', [0x0304, 0x0102])):
+            builder = BinaryPayloadBuilder(byteorder=prefix, wordorder=Endian.Little, repack=True)
+            builder.add_32bit_uint(0x01020304)
+            self.assertEqual(builder.to_registers().tolist(), expected, prefix)
+
+    def testFromRegisters(self):
+        ''' Test that the decoder reads a list or an array of registers alike '''
+        registers = [0x0304, 0x0102, 0xfffe]
+        for source in (registers, array('H', registers)):
+            decoder = BinaryPayloadDecoder.fromRegisters(source, byteorder=Endian.Big, wordorder=Endian.Little)
+            self.assertEqual(decoder.decode_many('Ih'), (0x01020304, -2))
+        # The array is left untouched
+        source = array('H', registers)
+        BinaryPayloadDecoder.fromRegisters(source)
+        self.assertEqual(source.tolist(), registers)
+        self.assertRaises(ParameterException, BinaryPayloadDecoder.fromRegisters, array('B', [1, 2]))
+        self.assertRaises(ParameterException, BinaryPayloadDecoder.fromRegisters, (1, 2))
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
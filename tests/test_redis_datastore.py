@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+import unittest
+
+try:
+    import fakeredis
+    from pymodbus.datastore.database.redis_datastore import RedisSlaveContext
+except ImportError:  # redis and fakeredis are optional
+    fakeredis = None
+
+
+@unittest.skipIf(fakeredis is None, "needs redis and fakeredis")
+class RedisDataStoreTest(unittest.TestCase):
+    '''
+    This is the unittest for the pymodbus.datastore.database.redis_datastore
+    module, against an in-process fake redis server
+    '''
+
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.slave = RedisSlaveContext(client=self.client)
+
+    def testStr(self):
+        self.assertTrue(str(self.slave).startswith("Redis Slave Context"))
+
+    def testRegisterRoundTrip(self):
+        ''' Test setting and getting holding and input registers '''
+        for fx in (3, 4):
+            self.slave.setValues(fx, 10, [1, 0xFFFF, 0x1234])
+            self.assertEqual(self.slave.getValues(fx, 10, 3), [1, 0xFFFF, 0x1234])
+            self.assertEqual(self.slave.getValues(fx, 11, 1), [0xFFFF])
+
+    def testRegisterMasking(self):
+        ''' Test registers keep 16 bits, like on the wire '''
+        self.slave.setValues(3, 0, [-1, 0x12345])
+        self.assertEqual(self.slave.getValues(3, 0, 2), [0xFFFF, 0x2345])
+
+    def testBitRoundTrip(self):
+        ''' Test setting and getting coils and discrete inputs '''
+        for fx in (1, 2):
+            self.slave.setValues(fx, 3, [True, False, True])
+            self.assertEqual(self.slave.getValues(fx, 3, 3), [True, False, True])
+            self.assertEqual(self.slave.getValues(fx, 4, 2), [False, True])
+
+    def testValidate(self):
+        ''' Test only the set addresses are valid '''
+        self.slave.setValues(3, 5, [1, 2])
+        self.slave.setValues(1, 5, [False])
+        self.assertTrue(self.slave.validate(3, 5, 2))
+        self.assertFalse(self.slave.validate(3, 4, 2))
+        self.assertFalse(self.slave.validate(3, 6, 2))
+        self.assertFalse(self.slave.validate(4, 5, 1))
+        self.assertTrue(self.slave.validate(1, 5, 1))
+        self.assertFalse(self.slave.validate(1, 5, 2))
+        self.assertEqual(self.slave.getValues(3, 4, 4), [0, 1, 2, 0])
+
+    def testSingleCommandPerRequest(self):
+        ''' Test each request costs a single redis command '''
+        commands = []
+        execute = self.client.execute_command
+
+        def counting(*args, **kwargs):
+            commands.append(args[0])
+            return execute(*args, **kwargs)
+
+        self.client.execute_command = counting
+        self.slave.setValues(3, 0, list(range(100)))
+        self.slave.validate(3, 0, 100)
+        self.slave.getValues(3, 0, 100)
+        self.assertEqual(commands, ['SETRANGE', 'GETRANGE', 'GETRANGE'])
+
+    def testReset(self):
+        ''' Test reset only drops the keys of the context '''
+        self.client.set('other', b'kept')
+        self.slave.setValues(3, 0, [1])
+        self.slave.setValues(1, 0, [True])
+        self.slave.reset()
+        self.assertFalse(self.slave.validate(3, 0, 1))
+        self.assertFalse(self.slave.validate(1, 0, 1))
+        self.assertEqual(self.client.get('other'), b'kept')
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
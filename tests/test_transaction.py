@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+import asyncio
+import socket
+import struct
+import threading
+import time
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+from pymodbus.client.sync import ModbusTcpClient, ModbusUdpClient
+from pymodbus.client.sync import ModbusSerialClient
+from pymodbus.register_read_message import ReadHoldingRegistersRequest
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+from pymodbus.exceptions import ModbusIOException, ParameterException
+from pymodbus.framer.socket_framer import ModbusSocketFramer
+from pymodbus.transaction import TransactionStrategy, RetryPolicy
+from pymodbus.transaction import DictTransactionManager, FifoTransactionManager
+from pymodbus.transaction import TransactionHooks
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class TransactionStrategyTest(unittest.TestCase):
+    '''
+    This is the unittest for the framer specific transaction rules
+    '''
+
+    def testSocketStrategy(self):
+        ''' Test the rules of a tcp client '''
+        strategy = ModbusTcpClient('127.0.0.1').transaction.strategy
+        self.assertTrue(strategy.socket)
+        self.assertFalse(strategy.udp)
+        self.assertEqual(strategy.min_size, 8)
+        self.assertEqual(strategy.exception_length, 9)
+        # The length comes from the MBAP header
+        self.assertEqual(strategy.responseLength(ReadHoldingRegistersRequest(0, 2)), None)
+        self.assertEqual(strategy.functionCode(b'\x00\x01\x00\x00\x00\x05\x01\x03'), 3)
+
+    def testUdpStrategy(self):
+        ''' Test the rules of a udp client '''
+        strategy = ModbusUdpClient('127.0.0.1').transaction.strategy
+        self.assertTrue(strategy.socket)
+        self.assertTrue(strategy.udp)
+
+    def testRtuStrategy(self):
+        ''' Test the rules of a rtu client '''
+        strategy = ModbusSerialClient(method='rtu', port='/dev/null').transaction.strategy
+        self.assertEqual((strategy.base_adu_size, strategy.min_size, strategy.exception_length), (3, 2, 5))
+        # address(1), function code(1), byte count(1), two registers(4), crc(2)
+        self.assertEqual(strategy.responseLength(ReadHoldingRegistersRequest(0, 2)), 9)
+        self.assertEqual(strategy.functionCode(b'\x01\x03'), 3)
+
+    def testAsciiStrategy(self):
+        ''' Test the rules of an ascii client '''
+        strategy = ModbusSerialClient(method='ascii', port='/dev/null').transaction.strategy
+        self.assertTrue(strategy.ascii)
+        # The hex encoded pdu takes twice its size
+        self.assertEqual(strategy.responseLength(ReadHoldingRegistersRequest(0, 2)), 7 + 2 * 6)
+        self.assertEqual(strategy.functionCode(b':0103'), 3)
+
+    def testBinaryStrategy(self):
+        ''' Test the rules of a binary client '''
+        strategy = ModbusSerialClient(method='binary', port='/dev/null').transaction.strategy
+        self.assertEqual(strategy.responseLength(ReadHoldingRegistersRequest(0, 2)), 5 + 6)
+        self.assertEqual(strategy.functionCode(b'{\x01\x03'), 3)
+
+    def testUnknownFramer(self):
+        ''' Test a strategy without framer specific rules '''
+        strategy = TransactionStrategy()
+        self.assertEqual(strategy.responseLength(ReadHoldingRegistersRequest(0, 2)), None)
+        self.assertEqual(strategy.functionCode(b'\x01\x03'), -1)
+
+
+class TransactionManagerTest(unittest.TestCase):
+    '''
+    This is the unittest for the transaction tables
+    '''
+
+    def setUp(self):
+        ''' Initializes the managers and a fake clock '''
+        self.now = 0
+        patcher = mock.patch('pymodbus.transaction._clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dict = DictTransactionManager(None, max_transactions=3, transaction_timeout=10)
+        self.fifo = FifoTransactionManager(None)
+
+    def testDictTransactionTimeoutDefault(self):
+        ''' Test that transactions live as long as every try of a request '''
+        manager = DictTransactionManager(None, timeout=2, retries=3)
+        self.assertEqual(manager.transaction_timeout, 8)
+
+    def testDictTransactionLookup(self):
+        ''' Test that transactions are matched by tid and removed once matched '''
+        self.dict.addTransaction('first', 1)
+        self.dict.addTransaction('second', 2)
+        self.assertEqual(self.dict.getTransaction(2), 'second')
+        self.assertEqual(self.dict.getTransaction(2), None)
+        self.dict.delTransaction(1)
+        self.dict.delTransaction(7)
+        self.assertEqual(list(self.dict), [])
+
+    def testDictTransactionExpiry(self):
+        ''' Test that unanswered transactions are dropped and failed '''
+        deferred = mock.Mock(spec=['errback', 'called'], called=False)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        future = loop.create_future()
+        self.dict.addTransaction(deferred, 1)
+        self.dict.addTransaction(future, 2)
+        self.now = 5
+        self.dict.addTransaction('third', 3)
+        self.now = 10
+        self.dict.addTransaction('fourth', 4)
+        self.assertEqual(list(self.dict), [3, 4])
+        self.assertIsInstance(deferred.errback.call_args[0][0], ModbusIOException)
+        self.assertIsInstance(future.exception(), ModbusIOException)
+
+    def testDictTransactionLimit(self):
+        ''' Test that the oldest transactions make room for new ones '''
+        for tid in (1, 2, 3):
+            self.dict.addTransaction('request %d' % tid, tid)
+        # Adding a tid again refreshes it
+        self.dict.addTransaction('request 1', 1)
+        self.dict.addTransaction('request 4', 4)
+        self.assertEqual(list(self.dict), [3, 1, 4])
+
+    def testDictTransactionTIDWraps(self):
+        ''' Test that tids wrap within 1..0xffff and skip pending ones '''
+        self.dict.tid = 0xfffe
+        self.assertEqual(self.dict.getNextTID(), 0xffff)
+        self.dict.addTransaction('pending', 1)
+        self.dict.addTransaction('pending', 2)
+        self.assertEqual(self.dict.getNextTID(), 3)
+        self.dict.transactions = OrderedDict((tid, (None, 0)) for tid in range(1, 0x10000))
+        self.assertRaises(ModbusIOException, self.dict.getNextTID)
+
+    def testFifoTransactions(self):
+        ''' Test that fifo transactions are returned in order whatever the tid '''
+        self.assertEqual(self.fifo.getTransaction(1), None)
+        for tid in (1, 2, 3):
+            self.fifo.addTransaction('request %d' % tid, tid)
+        self.assertEqual(list(self.fifo), ['request 1', 'request 2', 'request 3'])
+        self.assertEqual(self.fifo.getTransaction(3), 'request 1')
+        self.fifo.delTransaction(3)
+        self.assertEqual(list(self.fifo), ['request 3'])
+        self.fifo.delTransaction(1)
+        self.fifo.delTransaction(1)
+        self.assertEqual(list(self.fifo), [])
+
+
+class RetryPolicyTest(unittest.TestCase):
+    '''
+    This is the unittest for the retry scheduling
+    '''
+
+    def setUp(self):
+        ''' Initializes a fake clock '''
+        self.now = 0
+        patcher = mock.patch('pymodbus.transaction._clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testBackoff(self):
+        ''' Test that the delay doubles until the retries are used up '''
+        policy = RetryPolicy(retries=3, backoff=0.2)
+        state = policy.start(1)
+        self.assertEqual(state.deadline, None)
+        delays = [policy.next_delay(state) for _ in range(4)]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, None])
+        self.assertEqual(state.retries, 0)
+
+    def testDeadline(self):
+        ''' Test that a retry is only started if it can finish in time '''
+        policy = RetryPolicy(retries=3, backoff=0.2, timeout=1)
+        state = policy.start(1)
+        self.assertEqual(state.deadline, 1)
+        self.now = 0.5
+        self.assertEqual(policy.next_delay(state, attempt_time=0.3), 0.1)
+        self.now = 0.8
+        self.assertEqual(policy.next_delay(state, attempt_time=0.3), None)
+        self.assertEqual(state.retries, 2)
+        # A transaction can have its own time budget
+        self.assertEqual(policy.start(1, timeout=5).deadline, 5.8)
+
+    def testBudget(self):
+        ''' Test that each device has its own refilling retry budget '''
+        policy = RetryPolicy(retries=5, backoff=0, budget=2, budget_period=60)
+        first, second = policy.start(1), policy.start(2)
+        self.assertEqual([policy.next_delay(first) for _ in range(3)], [0, 0, None])
+        self.assertEqual(policy.next_delay(second), 0)
+        self.now = 30
+        self.assertEqual([policy.next_delay(first) for _ in range(2)], [0, None])
+        self.assertEqual(first.retries, 2)
+
+
+class RetryDeadlineTest(unittest.TestCase):
+    '''
+    This is the unittest for the time budget of a request
+    '''
+
+    def testTryIsCutShortAtDeadline(self):
+        ''' Test that a try doesn't wait past the deadline of the request '''
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        self.addCleanup(listener.close)
+        client = ModbusTcpClient('127.0.0.1', listener.getsockname()[1],
+                                 timeout=2, retries=3, request_timeout=0.3)
+        self.addCleanup(client.close)
+        client.connect()
+        server, _ = listener.accept()
+        self.addCleanup(server.close)
+
+        start = time.time()
+        response = client.read_holding_registers(0, 1, unit=1)
+        self.assertIsInstance(response, ModbusIOException)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(client.timeout, 2)
+
+
+class TransactionHooksTest(unittest.TestCase):
+    '''
+    This is the unittest for the transaction hooks
+    '''
+
+    def setUp(self):
+        ''' Initializes the hooks and the recorded events '''
+        self.hooks = TransactionHooks()
+        self.events = []
+        self.first_byte = threading.Event()
+
+    def record(self, event):
+        ''' Records an event, noting when the first byte is reported '''
+        self.events.append(event)
+        if event.name == TransactionHooks.FIRST_BYTE:
+            self.first_byte.set()
+
+    def recordAll(self):
+        ''' Records every event '''
+        for event in TransactionHooks.EVENTS:
+            self.hooks.add(event, self.record)
+
+    def serve(self, split, pause=None):
+        ''' Starts a server answering each request in two parts
+
+        The rest of a response is sent after `pause` seconds or, by default,
+        once the first byte of it has been reported to the hooks (or after a
+        second).
+        '''
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        self.addCleanup(listener.close)
+
+        def answer():
+            connection, _ = listener.accept()
+            with connection:
+                data = connection.recv(1024)
+                responses = []
+                while data:
+                    tid, _, length = struct.unpack('>HHH', data[:6])
+                    response = ReadHoldingRegistersResponse([tid], transaction=tid, unit=data[6])
+                    responses.append(ModbusSocketFramer(None).buildPacket(response))
+                    data = data[6 + length:]
+                packet = b''.join(responses)
+                connection.sendall(packet[:split])
+                if pause is None:
+                    self.first_byte.wait(1)
+                else:
+                    time.sleep(pause)
+                connection.sendall(packet[split:])
+                time.sleep(0.1)
+        thread = threading.Thread(target=answer)
+        thread.start()
+        self.addCleanup(thread.join)
+        return listener.getsockname()[1]
+
+    def testAddRemove(self):
+        ''' Test that hooks are only enabled while a callback is registered '''
+        self.assertFalse(self.hooks.enabled)
+        self.hooks.add(TransactionHooks.RETRY, self.record)
+        self.assertTrue(self.hooks.enabled)
+        self.hooks.remove(TransactionHooks.RETRY, self.record)
+        self.hooks.remove(TransactionHooks.RETRY, self.record)
+        self.assertFalse(self.hooks.enabled)
+        self.assertRaises(ParameterException, self.hooks.add, 'unknown', self.record)
+
+    def testEmit(self):
+        ''' Test that callbacks get the event and failing ones are ignored '''
+        def fail(event):
+            raise ValueError(event)
+        self.hooks.add(TransactionHooks.RETRY, fail)
+        self.hooks.add(TransactionHooks.RETRY, self.record)
+        self.hooks.emit(TransactionHooks.RETRY, 3, 1, 7, 12, timestamp=5)
+        self.hooks.emit(TransactionHooks.TIMEOUT, 3, 1, 7)
+        event, = self.events
+        self.assertEqual((event.name, event.timestamp, event.function_code, event.unit_id,
+                          event.transaction_id, event.size), ('retry', 5, 3, 1, 7, 12))
+
+    def testTransactionEvents(self):
+        ''' Test that the first byte is reported as soon as it arrives '''
+        self.recordAll()
+        client = ModbusTcpClient('127.0.0.1', self.serve(1), timeout=0.5, hooks=self.hooks)
+        self.addCleanup(client.close)
+        response = client.read_holding_registers(0, 1, unit=1)
+        self.assertFalse(response.isError())
+        tid = response.transaction_id
+        self.assertEqual([(event.name, event.transaction_id, event.size) for event in self.events], [
+            (TransactionHooks.REQUEST_SENT, tid, 12),
+            (TransactionHooks.FIRST_BYTE, tid, 1),
+            (TransactionHooks.RESPONSE_DECODED, tid, 11),
+        ])
+
+    def testPipelinedEvents(self):
+        ''' Test that pipelined responses report when their first byte arrived '''
+        self.recordAll()
+        client = ModbusTcpClient('127.0.0.1', self.serve(1, pause=0.2), timeout=0.5, hooks=self.hooks)
+        self.addCleanup(client.close)
+        requests = [ReadHoldingRegistersRequest(0, 1, unit=1), ReadHoldingRegistersRequest(0, 1, unit=2)]
+        responses = client.execute_many(requests)
+        self.assertEqual([response.registers for response in responses],
+                         [[request.transaction_id] for request in requests])
+        events = dict(((event.name, event.transaction_id), event) for event in self.events)
+        self.assertEqual(len(events), 6)
+        first, second = [events[TransactionHooks.FIRST_BYTE, request.transaction_id] for request in requests]
+        decoded = events[TransactionHooks.RESPONSE_DECODED, requests[0].transaction_id]
+        # The first response started arriving before the pause, the second one after it
+        self.assertGreater(decoded.timestamp - first.timestamp, 0.15)
+        self.assertLessEqual(second.timestamp, decoded.timestamp)
+        self.assertEqual(client.first_chunk_callback, None)
+
+    def testFirstByteFallback(self):
+        ''' Test that clients that can't tell report the first byte after the read '''
+        self.recordAll()
+        manager = DictTransactionManager(None, hooks=self.hooks)
+        manager.client = mock.Mock(first_chunk_callback=None)
+        manager.client.framer.recvPacket.return_value = b'\x00\x01\x00'
+        request = ReadHoldingRegistersRequest(0, 1, unit=1)
+        self.assertEqual(manager._recv_first(3, self.hooks, request), b'\x00\x01\x00')
+        self.assertEqual([(event.name, event.size) for event in self.events], [(TransactionHooks.FIRST_BYTE, 3)])
+        self.assertEqual(manager.client.first_chunk_callback, None)
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+import unittest
+from array import array
+
+from pymodbus.utilities import computeCRC, checkCRC, updateCRC, finalizeCRC
+from pymodbus.utilities import pack_bitstring, unpack_bitstring
+
+
+def bitwiseCRC(data):
+    ''' The modbus crc16, computed one bit at a time '''
+    crc = 0xffff
+    for byte in bytearray(data):
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xa001 if crc & 1 else crc >> 1
+    return ((crc << 8) & 0xff00) | (crc >> 8)
+
+
+#---------------------------------------------------------------------------#
+# Fixture
+#---------------------------------------------------------------------------#
+class SimpleUtilityTest(unittest.TestCase):
+    '''
+    This is the unittest for the pymod.utilities module
+    '''
+
+    def setUp(self):
+        ''' Initializes the test environment '''
+        self.data = bytes(bytearray(range(256))) + b'\x01\x03\x00\x00\x00\x0a'
+        self.bits = [True, False, False, False, True, False, False, False] * 2
+        self.bits += [False, True, True]
+        self.string = b'\x11\x11\x06'
+
+    def testComputeCRC(self):
+        ''' Test the crc of known frames and of every length '''
+        self.assertEqual(computeCRC(b'\x01\x03\x00\x00\x00\x0a'), 0xc5cd)
+        self.assertTrue(checkCRC(b'\x01\x03\x00\x00\x00\x0a', 0xc5cd))
+        self.assertEqual(computeCRC(b''), 0xffff)
+        for size in range(len(self.data)):
+            self.assertEqual(computeCRC(self.data[:size]), bitwiseCRC(self.data[:size]))
+
+    def testIncrementalCRC(self):
+        ''' Test that the crc can be fed in chunks of any size '''
+        expected = computeCRC(self.data)
+        for size in (1, 2, 3, 7, 64):
+            crc = 0xffff
+            for start in range(0, len(self.data), size):
+                crc = updateCRC(crc, self.data[start:start + size])
+            self.assertEqual(finalizeCRC(crc), expected)
+
+    def testIncrementalCRCBufferTypes(self):
+        ''' Test feeding the crc from a bytearray and a memoryview '''
+        expected = computeCRC(self.data)
+        view = memoryview(bytearray(self.data))
+        crc = updateCRC(0xffff, view[:101])
+        crc = updateCRC(crc, bytearray(self.data[101:]))
+        self.assertEqual(finalizeCRC(crc), expected)
+        self.assertEqual(finalizeCRC(updateCRC(0xffff, b'')), computeCRC(b''))
+
+    def testPackBitstring(self):
+        ''' Test packing bits, least significant bit first '''
+        self.assertEqual(pack_bitstring(self.bits), self.string)
+        self.assertEqual(pack_bitstring([]), b'')
+        self.assertEqual(pack_bitstring([True] * 9), b'\xff\x01')
+
+    def testPackBitstringSequenceTypes(self):
+        ''' Test packing every kind of bit sequence the datastores hold '''
+        ints = [int(bit) for bit in self.bits]
+        self.assertEqual(pack_bitstring(tuple(self.bits)), self.string)
+        self.assertEqual(pack_bitstring(iter(self.bits)), self.string)
+        self.assertEqual(pack_bitstring(bytearray(ints)), self.string)
+        self.assertEqual(pack_bitstring(memoryview(bytearray(ints))), self.string)
+        # Coil values written as 0xff00 and views of register arrays
+        self.assertEqual(pack_bitstring([0xff00 * bit for bit in ints]), self.string)
+        self.assertEqual(pack_bitstring(memoryview(array('H', ints))), self.string)
+
+    def testUnpackBitstring(self):
+        ''' Test unpacking to booleans and to a bytearray of bits '''
+        self.assertEqual(unpack_bitstring(self.string), self.bits + [False] * 5)
+        self.assertEqual(unpack_bitstring(self.string, as_bytes=True),
+                         bytearray(int(bit) for bit in self.bits + [False] * 5))
+        self.assertEqual(unpack_bitstring(b''), [])
+        self.assertEqual(unpack_bitstring(memoryview(self.string)[1:2]), self.bits[8:16])
+
+    def testBitstringRoundTrip(self):
+        ''' Test that every byte value packs back to itself '''
+        string = bytes(bytearray(range(256)))
+        self.assertEqual(pack_bitstring(unpack_bitstring(string)), string)
+        self.assertEqual(pack_bitstring(unpack_bitstring(string, as_bytes=True)), string)
+
+
+#---------------------------------------------------------------------------#
+# Main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()